@@ -11,10 +11,12 @@ import { Sale } from 'src/productSales/entities/sale.entity';
 import {PurchaseOrder} from '../productPurchase/entities/purchase-order.entity'
 import { Shelf } from 'src/products/locality/shelves/entities/shelf.entity';
 import { ProductStockService } from '../products/product-stock/product-stock.service';
+import { PredictionModule } from '../prediction/prediction.module';
 
 @Module({
   imports: [
     TypeOrmModule.forFeature([InventoryMovement, Product,Locality , ProductStock,Sale,PurchaseOrder, Shelf  ]),
+    PredictionModule,
   ],
   controllers: [InventoryController],
   providers: [InventoryService,ProductPurchase, ProductStockService],
@@ -3,10 +3,12 @@ import { TypeOrmModule } from '@nestjs/typeorm';
 import { PredictionService } from './prediction.service';
 import { PredictionController } from './prediction.controller';
 import { Prediction } from './entities/prediction.entity';
+import { PredictiveCacheService } from './predictive-cache.service';
 
 @Module({
   imports: [TypeOrmModule.forFeature([Prediction])],
   controllers: [PredictionController],
-  providers: [PredictionService],
+  providers: [PredictionService, PredictiveCacheService],
+  exports: [PredictiveCacheService],
 })
 export class PredictionModule {}
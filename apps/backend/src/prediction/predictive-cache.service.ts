@@ -0,0 +1,64 @@
+import { Injectable, Logger } from '@nestjs/common';
+import { ConfigService } from '@nestjs/config';
+
+export type PredictiveCacheScope = 'stock' | 'sales' | 'all';
+
+export interface PredictiveCacheKey {
+  product_name: string;
+  brand?: string | null;
+  unit?: string | null;
+}
+
+// El servicio de predicción (predictive-service) cachea por unos minutos el stock y las
+// ventas del último mes de cada producto. Tras registrar una venta o un movimiento de
+// inventario se le avisa para que no responda con datos viejos hasta que venza el TTL.
+@Injectable()
+export class PredictiveCacheService {
+  private readonly logger = new Logger(PredictiveCacheService.name);
+  private readonly baseUrl?: string;
+  private readonly apiKey?: string;
+
+  constructor(private configService: ConfigService) {
+    this.baseUrl = this.configService.get<string>('PREDICTIVE_API_URL');
+    this.apiKey = this.configService.get<string>('PREDICTIVE_API_KEY');
+  }
+
+  /**
+   * Invalida el cache del servicio de predicción para un producto, o toda la capa sin key.
+   * No espera la respuesta ni lanza errores: si falla, el cache vence solo por TTL.
+   */
+  invalidate(scope: PredictiveCacheScope, key?: PredictiveCacheKey): void {
+    if (!this.baseUrl) return;
+
+    const body = key
+      ? {
+          scope,
+          product_name: key.product_name,
+          brand: key.brand || 'Sin marca',
+          unit: key.unit || 'Sin unidad',
+        }
+      : { scope };
+
+    fetch(`${this.baseUrl.replace(/\/$/, '')}/cache/invalidate`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(this.apiKey ? { 'X-API-Key': this.apiKey } : {}),
+      },
+      body: JSON.stringify(body),
+      signal: AbortSignal.timeout(3000),
+    })
+      .then((response) => {
+        if (!response.ok) {
+          this.logger.warn(
+            `No se pudo invalidar el cache de predicción (${scope}): HTTP ${response.status}`,
+          );
+        }
+      })
+      .catch((error: Error) => {
+        this.logger.warn(
+          `No se pudo invalidar el cache de predicción (${scope}): ${error.message}`,
+        );
+      });
+  }
+}
@@ -10,10 +10,12 @@ import { User } from '../users/user.entity';
 import { OrderNumberCounter } from './entities/order-number-counter.entity';
 import { Brand } from 'src/products/entities/brand.entity';
 import { UnitOfMeasure } from 'src/products/entities/unit-of-measure.entity';
+import { PredictionModule } from '../prediction/prediction.module';
 
 @Module({
   imports: [
     TypeOrmModule.forFeature([Sale, ProductSale, Product, Customer, User, OrderNumberCounter ,Brand,UnitOfMeasure  ]),
+    PredictionModule,
   ],
   controllers: [SalesController],
   providers: [SalesService],
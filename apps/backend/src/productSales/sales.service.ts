@@ -15,6 +15,7 @@ import { User } from '../users/user.entity';
 import { OrderNumberCounter } from './entities/order-number-counter.entity';
 import * as XLSX from 'xlsx';
 import { DataSource } from 'typeorm';
+import { PredictiveCacheService } from '../prediction/predictive-cache.service';
 
 @Injectable()
 export class SalesService {
@@ -30,8 +31,27 @@ export class SalesService {
     @InjectRepository(OrderNumberCounter)
     private readonly orderNumberCounterRepository: Repository<OrderNumberCounter>,
     private readonly dataSource: DataSource,
+    private readonly predictiveCache: PredictiveCacheService,
   ) {}
 
+  // El servicio de predicción cachea las ventas del último mes de cada producto
+  private invalidatePredictiveSales(productSales: ProductSale[]) {
+    const keys = new Map<string, ProductSale>();
+    for (const ps of productSales) {
+      keys.set(
+        `${ps.product_name}|${ps.brand_name}|${ps.unit_of_measure_name}`,
+        ps,
+      );
+    }
+    for (const ps of keys.values()) {
+      this.predictiveCache.invalidate('sales', {
+        product_name: ps.product_name,
+        brand: ps.brand_name,
+        unit: ps.unit_of_measure_name,
+      });
+    }
+  }
+
   private parseDateDMY(dateStr: any): Date | null {
     if (!dateStr) return null;
 
@@ -125,6 +145,7 @@ export class SalesService {
 
     // Guardar todas las productSales
     await this.productSaleRepository.save(productSales);
+    this.invalidatePredictiveSales(productSales);
 
     // Actualizar total en la venta
     savedSale.total_amount = parseFloat(total.toFixed(2));
@@ -497,6 +518,7 @@ export class SalesService {
 
     // Luego eliminar la venta
     await this.saleRepository.remove(sale);
+    this.invalidatePredictiveSales(sale.productSales);
   }
 
   async removeAll(): Promise<void> {
@@ -510,5 +532,6 @@ export class SalesService {
 
     // Luego eliminar todas las ventas
     await this.saleRepository.remove(sales);
+    this.predictiveCache.invalidate('sales');
   }
 }
@@ -7,9 +7,10 @@ import { ProductStock } from './product-stock.entity';
 import { Product } from '../entities/product.entity';
 import { Locality } from '../locality/entities/locality.entity';
 import { Shelf } from '../locality/shelves/entities/shelf.entity';
+import { PredictionModule } from '../../prediction/prediction.module';
 
 @Module({
-  imports: [TypeOrmModule.forFeature([ProductStock, Product, Locality,ProductStock, Shelf ])],
+  imports: [TypeOrmModule.forFeature([ProductStock, Product, Locality,ProductStock, Shelf ]), PredictionModule],
   controllers: [ProductStockController],
   providers: [ProductStockService],
 })
@@ -12,6 +12,7 @@ import { UpdateProductStockDto } from './dto/update-product-stock.dto';
 import { Product } from '../entities/product.entity';
 import { Locality } from '../locality/entities/locality.entity';
 import { Shelf } from '../locality/shelves/entities/shelf.entity'; // Asegúrate de la ruta
+import { PredictiveCacheService } from '../../prediction/predictive-cache.service';
 
 @Injectable()
 export class ProductStockService {
@@ -27,6 +28,8 @@ export class ProductStockService {
 
     @InjectRepository(Shelf)
     private readonly shelfRepo: Repository<Shelf>, // <== NUEVO
+
+    private readonly predictiveCache: PredictiveCacheService,
   ) {}
 
   async create(dto: CreateProductStockDto): Promise<ProductStock> {
@@ -129,6 +132,19 @@ export class ProductStockService {
     await this.productRepo.update(productId, {
       current_quantity: total,
     });
+
+    // El servicio de predicción cachea el stock de cada producto por unos minutos
+    const product = await this.productRepo.findOne({
+      where: { id: productId },
+      relations: ['brand', 'unit_of_measure'],
+    });
+    if (product) {
+      this.predictiveCache.invalidate('stock', {
+        product_name: product.name,
+        brand: product.brand?.name,
+        unit: product.unit_of_measure?.name,
+      });
+    }
   }
 
 async getProductStockTotals(): Promise<
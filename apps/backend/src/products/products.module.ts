@@ -16,6 +16,7 @@ import { PricingService } from 'src/pricing/pricing.service';
 import { MarginConfig } from '../pricing/entities/margin-config.entity';
 import { Tax } from 'src/pricing/entities/tax.entity';
 import { CloudinaryModule } from '../cloudinary/cloudinary.module';
+import { PredictionModule } from '../prediction/prediction.module';
 
 @Module({
   imports: [
@@ -33,6 +34,7 @@ import { CloudinaryModule } from '../cloudinary/cloudinary.module';
       Tax
     ]),
      CloudinaryModule,
+     PredictionModule,
   ],
   controllers: [ProductsController],
 
@@ -64,16 +64,16 @@ export const getAllModelPredictions = async (
 export const exportAllForecasts = async (
   data: MultiModelPredictionResponse
 ): Promise<void> => {
-  const response = await axios.post(
-    `${PYTHON_API_BASE}/predict/export-all`,
-    {
-      product: data.product,
-      brand: data.brand,
-      unit: data.unit,
-      days: data.days,
-      forecasts: data.forecasts,
-    },
+  // El servidor recalcula (o toma del cache) las predicciones: solo se envían los filtros
+  const response = await axios.get(
+    `${PYTHON_API_BASE}/predict/export`,
     {
+      params: {
+        product_name: data.product,
+        brand: data.brand,
+        unit: data.unit,
+        days: data.days,
+      },
       responseType: "blob", // Necesario para manejar archivos
       headers: {
         "x-api-key": API_KEY || "",
@@ -71,6 +71,7 @@ export interface MultiModelPredictionResponse {
     prophet?: ModelForecastWithMetrics;
     linear?: ModelForecastWithMetrics;
     arima?: ModelForecastWithMetrics;
+    baseline?: ModelForecastWithMetrics;
   };
 }
 
@@ -21,3 +21,80 @@ else:
     "password": os.getenv("DB_PASSWORD"),
     "port": int(os.getenv("DB_PORT")),
 }
+
+# Entrenamiento de modelos
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", os.cpu_count() or 1))
+MODEL_TIMEOUT_SECONDS = int(os.getenv("MODEL_TIMEOUT_SECONDS", 300))
+
+# Ventanas de reentrenamiento del scheduler (ver app/models/training_schedule.py)
+TRAINING_WINDOW_DAYS = os.getenv("TRAINING_WINDOW_DAYS", "mon")  # day_of_week del cron; lo pendiente sigue la noche siguiente
+TRAINING_WINDOW_HOUR = int(os.getenv("TRAINING_WINDOW_HOUR", 3))
+TRAINING_BUDGET_SECONDS = float(os.getenv("TRAINING_BUDGET_SECONDS", 7200))  # 0 = sin límite
+TRAINING_WINDOW_WORKERS = int(os.getenv("TRAINING_WINDOW_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+TRAINING_NICE = int(os.getenv("TRAINING_NICE", 10))  # prioridad de los procesos de entrenamiento frente a uvicorn
+TRAINING_PRIORITY_DAYS = int(os.getenv("TRAINING_PRIORITY_DAYS", 28))  # días de ventas recientes que pesan en la prioridad
+
+# Almacén de modelos en disco
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", "model_store")
+MODEL_STORE_KEEP = int(os.getenv("MODEL_STORE_KEEP", 3))
+
+# Pool de conexiones a PostgreSQL
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # segundos esperando una conexión libre
+DB_POOL_CHECK_AFTER = float(os.getenv("DB_POOL_CHECK_AFTER", 30))  # segundos ociosa antes de verificarla
+
+# Comparación de productos: keys por consulta agrupada a la BD
+COMPARE_BATCH_SIZE = int(os.getenv("COMPARE_BATCH_SIZE", 200))
+
+# Guardado de predicciones en NestJS (cola en segundo plano)
+NEST_API_URL = os.getenv("NEST_API_URL")
+NEST_API_BATCH_URL = os.getenv("NEST_API_BATCH_URL")  # opcional: endpoint que recibe una lista de predicciones
+NEST_QUEUE_MAX = int(os.getenv("NEST_QUEUE_MAX", 1000))
+NEST_BATCH_SIZE = int(os.getenv("NEST_BATCH_SIZE", 20))
+NEST_FLUSH_INTERVAL = float(os.getenv("NEST_FLUSH_INTERVAL", 2))  # segundos esperando nuevas predicciones
+NEST_MAX_RETRIES = int(os.getenv("NEST_MAX_RETRIES", 4))
+NEST_BACKOFF_BASE = float(os.getenv("NEST_BACKOFF_BASE", 0.5))  # segundos antes del primer reintento
+NEST_TIMEOUT = float(os.getenv("NEST_TIMEOUT", 5))
+NEST_DEAD_LETTER_PATH = os.getenv("NEST_DEAD_LETTER_PATH", "logs/nest_dead_letter.jsonl")
+
+# Ejecutores para las rutas async (inferencia y consultas pesadas fuera del event loop)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 4))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", 64))  # peticiones en espera antes de responder 503
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", 2))  # /compare y exportaciones
+BULK_MAX_PENDING = int(os.getenv("BULK_MAX_PENDING", 8))
+COMPARE_STREAM_BATCH_SIZE = int(os.getenv("COMPARE_STREAM_BATCH_SIZE", 50))  # lotes más chicos: el primer registro llega antes
+
+# Varios workers (uvicorn --workers N): cada cuánto revisan si hay una versión nueva de modelos
+MODEL_RELOAD_SECONDS = int(os.getenv("MODEL_RELOAD_SECONDS", 30))
+
+# ARIMA: reutilizar los órdenes de la generación anterior en vez de repetir auto_arima
+ARIMA_WARM_START = os.getenv("ARIMA_WARM_START", "true").lower() in ("1", "true", "yes")
+ARIMA_REFIT_TOLERANCE = float(os.getenv("ARIMA_REFIT_TOLERANCE", 0.2))  # RMSE hasta 20% peor que en la última búsqueda
+ARIMA_FULL_SEARCH_EVERY = int(os.getenv("ARIMA_FULL_SEARCH_EVERY", 4))  # reajustes antes de buscar de nuevo
+
+# Selección de modelos por serie: Prophet y ARIMA solo para las series que los aprovechan
+MODEL_TIERING = os.getenv("MODEL_TIERING", "true").lower() in ("1", "true", "yes")
+TIER_MIN_DAYS = int(os.getenv("TIER_MIN_DAYS", 60))  # días de historial por debajo de los cuales la serie es "short"
+TIER_MIN_POINTS = int(os.getenv("TIER_MIN_POINTS", 30))  # días con ventas mínimos para los modelos completos
+TIER_MAX_ADI = float(os.getenv("TIER_MAX_ADI", 1.32))  # intervalo medio entre ventas; más alto es "intermittent"
+TIER_MIN_CV = float(os.getenv("TIER_MIN_CV", 0.05))  # variación diaria mínima; por debajo la serie es "flat"
+
+# Cache de /predict: salida de modelos por generación y agregados de BD con TTL corto
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 1000))
+STOCK_CACHE_TTL = float(os.getenv("STOCK_CACHE_TTL", 30))  # segundos; el stock cambia con cada venta
+SALES_CACHE_TTL = float(os.getenv("SALES_CACHE_TTL", 300))  # ventas del mes pasado e historial para métricas
+AGGREGATE_CACHE_SIZE = int(os.getenv("AGGREGATE_CACHE_SIZE", 5000))
+
+# Exportaciones a Excel
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 200))  # keys por consulta agrupada en los reportes de catálogo
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # archivos generados en memoria
+EXPORT_CACHE_TTL = float(os.getenv("EXPORT_CACHE_TTL", 3600))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 1))  # reportes de catálogo en segundo plano a la vez
+EXPORT_MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", 4))
+EXPORT_JOBS_DIR = os.getenv("EXPORT_JOBS_DIR", "exports")  # compartido por los workers de uvicorn
+EXPORT_JOB_TTL = float(os.getenv("EXPORT_JOB_TTL", 3600))  # segundos que se conserva un reporte terminado
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", 1024))  # bytes; respuestas más chicas van sin comprimir
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))  # 9 cuesta varias veces más CPU y comprime apenas mejor
+PREDICT_BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", 500))  # elementos por llamada a /predict/batch
+PREDICT_BATCH_CHUNK_SIZE = int(os.getenv("PREDICT_BATCH_CHUNK_SIZE", 50))  # elementos por trabajo del pool de inferencia
@@ -0,0 +1,93 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import (
+    INFERENCE_WORKERS,
+    INFERENCE_MAX_PENDING,
+    BULK_WORKERS,
+    BULK_MAX_PENDING,
+    EXPORT_WORKERS,
+    EXPORT_MAX_PENDING,
+)
+
+
+class ExecutorBusyError(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor con un límite de trabajos pendientes, para llamar código
+    bloqueante (Prophet/ARIMA, psycopg2, openpyxl) desde rutas async.
+
+    Si ya hay `max_pending` trabajos en cola o ejecutándose, run() y submit() lanzan
+    ExecutorBusyError en lugar de encolar sin límite.
+    """
+
+    def __init__(self, name, workers, max_pending):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        # submit() los libera desde el hilo del trabajo, así que van con lock
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorBusyError(f"Ejecutor {self.name} saturado ({self._pending} trabajos pendientes)")
+            self._pending += 1
+
+    def _release(self, *_):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Encola un trabajo en segundo plano sin esperarlo (p. ej. exportaciones grandes).
+
+        Returns:
+            concurrent.futures.Future
+        """
+        self._acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Separados para que unas pocas /compare lentas no dejen sin hilos a /predict
+inference_executor = BoundedExecutor("inference", INFERENCE_WORKERS, INFERENCE_MAX_PENDING)
+bulk_executor = BoundedExecutor("bulk", BULK_WORKERS, BULK_MAX_PENDING)
+# Reportes de catálogo en segundo plano: pueden tardar minutos y no deben ocupar los de /compare
+export_executor = BoundedExecutor("export", EXPORT_WORKERS, EXPORT_MAX_PENDING)
@@ -1,7 +1,170 @@
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from app.core.config import DB_PARAMS
+from app.core.config import (
+    DB_PARAMS,
+    DB_POOL_MIN,
+    DB_POOL_MAX,
+    DB_POOL_TIMEOUT,
+    DB_POOL_CHECK_AFTER,
+)
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe.
+
+    A diferencia de psycopg2.pool.ThreadedConnectionPool, espera (hasta `timeout`)
+    cuando todas las conexiones están en uso y mantiene abiertas hasta `maxconn`
+    conexiones ociosas en vez de cerrar todo lo que pase de `minconn`.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, check_after, **connect_kwargs):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_after = check_after
+        self.connect_kwargs = connect_kwargs
+        self._idle = []  # [(conn, time.monotonic() de la devolución)], LIFO
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        return psycopg2.connect(cursor_factory=RealDictCursor, **self.connect_kwargs)
+
+    def _is_healthy(self, conn, returned_at) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_after:
+            return True
+        # Conexión ociosa mucho tiempo: verificar que el servidor no la haya cerrado
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        if self._closed:
+            raise psycopg2.InterfaceError("El pool de conexiones está cerrado")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(f"Pool de conexiones agotado tras {self.timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    idle = self._idle.pop() if self._idle else None
+                if idle is None:
+                    return self._connect()
+                conn, returned_at = idle
+                if self._is_healthy(conn, returned_at):
+                    return conn
+                conn.close()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        try:
+            if close or conn.closed or self._closed:
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = len(self._idle)
+        return {"idle": idle, "max": self.maxconn}
+
+
+# Pool compartido por todos los hilos del proceso. Se crea en el primer uso.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    DB_POOL_TIMEOUT,
+                    DB_POOL_CHECK_AFTER,
+                    **DB_PARAMS,
+                )
+    return _pool
+
+
+@contextmanager
+def db_connection():
+    """
+    Presta una conexión del pool y la devuelve al salir.
+    Hace commit si el bloque termina bien y rollback si lanza una excepción;
+    las conexiones rotas se descartan en lugar de volver al pool.
+    """
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn, close=broken)
+
+
+@contextmanager
+def db_cursor(cursor_factory=None):
+    """
+    Atajo para `with db_connection() as conn: conn.cursor()`.
+    Por defecto los cursores devuelven dicts (RealDictCursor).
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=cursor_factory) if cursor_factory else conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+
+def pool_stats() -> dict:
+    # Sin abrir el pool si todavía no se usó
+    db_pool = _pool
+    return db_pool.stats() if db_pool is not None else {"idle": 0, "max": DB_POOL_MAX}
+
 
-def get_connection():
-    print("Connecting to DB with params:", DB_PARAMS)
-    return psycopg2.connect(**DB_PARAMS, cursor_factory=RealDictCursor)
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
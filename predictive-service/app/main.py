@@ -3,29 +3,70 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.routes.predict_route import router as predict_router
 from app.routes.compare_route import router as compare_router
-from app.models.prophet_models import train_models_from_db, models
-from app.scheduler import scheduler, retrain_models_job
+from app.routes.export_route import router as export_router
+from app.models.prophet_models import load_models_from_store
+from app.models.generation import get_generation
+from app.scheduler import scheduler, claim_training
 from contextlib import asynccontextmanager
 from app.middleware.api_key import APIKeyMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.db.connection import close_pool, pool_stats
+from app.services.nest_client import prediction_outbox
+from app.core.executors import inference_executor, bulk_executor, export_executor, ExecutorBusyError
+from app.utils.runtime_metrics import Gauge
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        train_models_from_db()
-        print("✅ Modelos Prophet entrenados correctamente")
+        version = load_models_from_store()
     except Exception as e:
-        print(f"❌ Error entrenando modelos Prophet: {e}")
+        version = None
+        print(f"❌ Error cargando modelos guardados: {e}")
+
+    if version:
+        print(f"✅ Modelos cargados desde disco (versión {version})")
+
+    # Solo un worker entrena; los demás recargan lo que él publica (ver app/scheduler.py)
+    if not claim_training():
+        print("👀 Otro worker entrena los modelos, este solo los recarga")
 
     scheduler.start()
-    retrain_models_job()
-    print(f"Modelos cargados: {list(models.keys())[:5]}")
+    prediction_outbox.start()
+    print(f"Modelos cargados: {list(get_generation().models.keys())[:5]}")
 
     yield
     print("🛑 Apagando scheduler...")
     scheduler.shutdown()
+    print("📤 Enviando predicciones pendientes a NestJS...")
+    prediction_outbox.stop()
+    inference_executor.shutdown()
+    bulk_executor.shutdown()
+    export_executor.shutdown()
+    close_pool()
 
 app = FastAPI(lifespan=lifespan)
 
+# 📈 Estado del proceso para /metrics/runtime (se lee en cada scrape)
+Gauge(
+    "predictive_executor_jobs", "Trabajos de los ejecutores de rutas por estado",
+    lambda: {
+        (executor.name, state): executor.stats()[state]
+        for executor in (inference_executor, bulk_executor, export_executor)
+        for state in ("pending", "completed", "rejected")
+    },
+    ("executor", "state"),
+)
+Gauge(
+    "predictive_nest_outbox", "Predicciones de la cola hacia NestJS por estado",
+    lambda: {**{(k,): v for k, v in prediction_outbox.stats().items()}, ("queued",): prediction_outbox.queued()},
+    ("state",),
+)
+Gauge(
+    "predictive_db_pool_idle_connections", "Conexiones ociosas en el pool de PostgreSQL",
+    lambda: pool_stats()["idle"],
+)
+Gauge("predictive_generation_keys", "Series con modelos en la generación publicada", lambda: len(get_generation().models))
+
 # ⚠️ ¡CORS debe ir antes del APIKeyMiddleware!
 app.add_middleware(
     CORSMiddleware,
@@ -41,9 +82,17 @@ app.add_middleware(
 # 🛡️ Este debe ir después del CORS
 app.add_middleware(APIKeyMiddleware)
 
+# 🗜️ gzip para respuestas grandes (/compare de todo el catálogo)
+app.add_middleware(CompressionMiddleware)
+
+@app.exception_handler(ExecutorBusyError)
+async def executor_busy_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Servicio ocupado, intenta de nuevo en unos segundos."})
+
 # 📦 Rutas
 app.include_router(predict_router)
 app.include_router(compare_router)
+app.include_router(export_router)
 
 @app.get("/")
 def root():
@@ -1,25 +1,41 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.responses import JSONResponse
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 API_KEY = os.getenv("API_KEY")
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
-       async def dispatch(self, request: Request, call_next):
+class APIKeyMiddleware:
+    """
+    Middleware ASGI puro: revisa el header X-API-Key sin envolver la petición
+    como hace BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
         # Permitir preflight automáticamente (ya lo hace CORSMiddleware, pero igual se valida)
-        if request.method == "OPTIONS":
-            return await call_next(request)
+        if scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
 
         # Permitir acceso a documentación
-        if request.url.path.startswith("/docs") or request.url.path.startswith("/openapi.json"):
-            return await call_next(request)
+        path = scope["path"]
+        if path.startswith("/docs") or path.startswith("/openapi.json"):
+            return await self.app(scope, receive, send)
 
         # Verificación de API Key
-        api_key = request.headers.get("X-API-Key")
+        api_key = None
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                api_key = value.decode("latin-1")
+                break
+
         if api_key != API_KEY:
-            raise HTTPException(status_code=401, detail="API key inválida o ausente")
+            response = JSONResponse({"detail": "API key inválida o ausente"}, status_code=401)
+            return await response(scope, receive, send)
 
-        return await call_next(request)
+        return await self.app(scope, receive, send)
@@ -0,0 +1,52 @@
+import gzip
+import io
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+
+from app.core.config import GZIP_MIN_SIZE, GZIP_LEVEL
+
+# Ya vienen comprimidos (un .xlsx es un zip): gzip solo gastaría CPU
+UNCOMPRESSED_TYPES = ("application/vnd.openxmlformats-officedocument",)
+
+
+class _FlushingGzipFile(gzip.GzipFile):
+    # Flush tras cada escritura: en /compare/stream cada lote sale apenas se calcula en
+    # lugar de quedarse en el buffer de zlib hasta juntar suficientes bytes
+    def write(self, data):
+        written = super().write(data)
+        self.flush()
+        return written
+
+
+class _Responder(GZipResponder):
+    def __init__(self, app, minimum_size, compresslevel):
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        # Buffer nuevo: el GzipFile del padre ya escribió su cabecera en el anterior
+        self.gzip_buffer = io.BytesIO()
+        self.gzip_file = _FlushingGzipFile(mode="wb", fileobj=self.gzip_buffer, compresslevel=compresslevel)
+
+    async def send_with_gzip(self, message):
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(UNCOMPRESSED_TYPES):
+                # Se trata como si ya tuviera Content-Encoding: pasa sin tocar
+                self.content_encoding_set = True
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware de Starlette con nivel configurable, sin recomprimir archivos ya
+    comprimidos y sin retener las respuestas en streaming.
+    """
+
+    def __init__(self, app, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _Responder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
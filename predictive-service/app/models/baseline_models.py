@@ -0,0 +1,249 @@
+import numpy as np
+
+# Modelos base de todo el catálogo en una sola pasada de NumPy sobre una matriz
+# (SKU x día) con relleno NaN, en vez de un ajuste de sklearn por serie.
+#
+# Todos los métodos se reducen a la misma fórmula, con t = días desde `origin`:
+#   yhat(t) = level + slope * t + season[t % 7]
+#   "trend":          recta por mínimos cuadrados (level, slope)
+#   "seasonal_naive": la última semana se repite (season)
+#   "moving_average": promedio de los últimos MOVING_AVERAGE_WINDOW días (level)
+#   "croston":        tamaño de venta / intervalo entre ventas suavizados (level), para demanda intermitente
+# Por serie se guarda el método con menor RMSE en la misma partición 80/20 que los demás modelos.
+
+BASELINE_METHODS = ("trend", "seasonal_naive", "moving_average", "croston")
+MOVING_AVERAGE_WINDOW = 28
+CROSTON_ALPHA = 0.1
+SEASON_LENGTH = 7
+
+
+def evaluate_baseline(origin, level, slope, season, dates) -> np.ndarray:
+    """
+    yhat de un modelo base en las fechas indicadas (datetime64[D]).
+    """
+    t = (np.asarray(dates, dtype="datetime64[D]") - np.datetime64(origin, "D")).astype(np.int64)
+    return level + slope * t + np.asarray(season, dtype=np.float64)[t % SEASON_LENGTH]
+
+
+class BaselineForecaster:
+    """
+    Modelo base ajustado de una serie. Solo guarda parámetros, así que es barato de
+    serializar y de evaluar para cualquier fecha.
+    """
+
+    __slots__ = ("method", "origin", "level", "slope", "season")
+
+    def __init__(self, method, origin, level, slope, season):
+        self.method = method
+        self.origin = str(np.datetime64(origin, "D"))
+        self.level = float(level)
+        self.slope = float(slope)
+        self.season = [float(v) for v in season]
+
+    def __getstate__(self):
+        return self.to_params()
+
+    def __setstate__(self, state):
+        for name in self.__slots__:
+            setattr(self, name, state[name])
+
+    def to_params(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def predict(self, dates) -> np.ndarray:
+        return evaluate_baseline(self.origin, self.level, self.slope, self.season, dates)
+
+
+def build_daily_matrix(series: dict):
+    """
+    Arma la matriz (SKU x día) de las series de load_daily_series.
+
+    Returns:
+        (keys, starts datetime64[D], matriz float64 con NaN en los días sin ventas y el relleno)
+    """
+    keys = list(series)
+    starts = np.empty(len(keys), dtype="datetime64[D]")
+    offsets = []
+    values = []
+    for i, key in enumerate(keys):
+        ds = np.asarray(series[key]["ds"], dtype="datetime64[D]")
+        starts[i] = ds[0]
+        offsets.append((ds - ds[0]).astype(np.int64))
+        values.append(np.asarray(series[key]["y"], dtype=np.float64))
+
+    width = max((int(o[-1]) + 1 for o in offsets), default=0)
+    matrix = np.full((len(keys), width), np.nan)
+    if keys:
+        rows = np.repeat(np.arange(len(keys)), [len(o) for o in offsets])
+        matrix[rows, np.concatenate(offsets)] = np.concatenate(values)
+    return keys, starts, matrix
+
+
+def _row_quantile(matrix, counts, q):
+    # Cuantil con interpolación lineal (como pandas) de los valores no NaN de cada fila;
+    # np.nanquantile recorre las filas una a una
+    ordered = np.sort(matrix, axis=1)  # los NaN quedan al final
+    position = q * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    low = np.take_along_axis(ordered, lower[:, None], axis=1)[:, 0]
+    high = np.take_along_axis(ordered, upper[:, None], axis=1)[:, 0]
+    return low + (high - low) * (position - lower)
+
+
+def _prepare(matrix):
+    """
+    Misma limpieza que train_series/train_arima, por filas: quita outliers (IQR sobre los
+    días con ventas), recorta al primer y último día que quedan y rellena con 0 los huecos.
+
+    Returns:
+        (valores densos alineados a la izquierda, largo por fila, desplazamiento del inicio)
+    """
+    observed = ~np.isnan(matrix)
+    counts = observed.sum(axis=1)
+    q1, q3 = _row_quantile(matrix, counts, 0.25), _row_quantile(matrix, counts, 0.75)
+    iqr = q3 - q1
+    with np.errstate(invalid="ignore"):
+        keep = observed & (matrix >= (q1 - 1.5 * iqr)[:, None]) & (matrix <= (q3 + 1.5 * iqr)[:, None])
+
+    kept = keep.sum(axis=1)
+    width = matrix.shape[1]
+    first = np.where(kept > 0, keep.argmax(axis=1), 0)
+    last = np.where(kept > 0, width - 1 - keep[:, ::-1].argmax(axis=1), -1)
+    lengths = np.where(kept >= 2, last - first + 1, 0)
+
+    columns = np.arange(width)
+    shifted = np.minimum(columns[None, :] + first[:, None], width - 1)
+    dense = np.take_along_axis(np.where(keep, matrix, 0.0), shifted, axis=1)
+    dense[columns[None, :] >= lengths[:, None]] = np.nan
+    return dense, lengths, first
+
+
+def _fit_params(values, n):
+    """
+    Parámetros (level, slope, season) de cada método usando los primeros `n` días de cada fila.
+
+    Returns:
+        dict método -> (level, slope, season), cada uno con una fila por serie.
+    """
+    rows, width = values.shape
+    t = np.arange(width, dtype=np.float64)
+    mask = t[None, :] < n[:, None]
+    y = np.where(mask, values, 0.0)
+    n_float = n.astype(np.float64)
+    zeros = np.zeros(rows)
+    no_season = np.zeros((rows, SEASON_LENGTH))
+
+    # Recta por mínimos cuadrados con sumas enmascaradas
+    sum_t = np.where(mask, t, 0.0).sum(axis=1)
+    sum_tt = np.where(mask, t * t, 0.0).sum(axis=1)
+    sum_y = y.sum(axis=1)
+    sum_ty = (y * t).sum(axis=1)
+    denominator = n_float * sum_tt - sum_t ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denominator > 0, (n_float * sum_ty - sum_t * sum_y) / denominator, 0.0)
+        level = np.where(n > 0, (sum_y - slope * sum_t) / n_float, 0.0)
+
+    # Promedio móvil de los últimos días con sumas acumuladas
+    cumulative = np.concatenate([zeros[:, None], np.cumsum(y, axis=1)], axis=1)
+    window = np.minimum(n, MOVING_AVERAGE_WINDOW)
+    window_sum = (
+        np.take_along_axis(cumulative, n[:, None], axis=1)[:, 0]
+        - np.take_along_axis(cumulative, (n - window)[:, None], axis=1)[:, 0]
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = np.where(window > 0, window_sum / window, 0.0)
+
+    # Última semana completa, indexada por t % 7 para que el día de la semana coincida
+    lags = np.clip(n[:, None] - SEASON_LENGTH + np.arange(SEASON_LENGTH)[None, :], 0, max(width - 1, 0))
+    last_week = np.take_along_axis(y, lags, axis=1) if width else no_season
+    season = np.empty_like(no_season)
+    np.put_along_axis(season, lags % SEASON_LENGTH, last_week, axis=1)
+
+    return {
+        "trend": (level, slope, no_season),
+        "seasonal_naive": (zeros, zeros, season),
+        "moving_average": (average, zeros, no_season),
+        "croston": (_croston_level(y, n), zeros, no_season),
+    }
+
+
+def _croston_level(y, n):
+    # Croston con la corrección de Syntetos-Boylan. Se recorre por día (columna) con todas
+    # las series a la vez; `y` ya viene en 0 desde el día `n` de cada fila
+    size = np.full(len(y), np.nan)  # tamaño de venta suavizado
+    interval = np.full(len(y), np.nan)  # días entre ventas suavizado
+    since = np.zeros(len(y))  # días desde la última venta
+    for day in range(int(n.max(initial=0))):
+        since += 1
+        sold = y[:, day] > 0
+        first = sold & np.isnan(size)
+        update = sold & ~first
+        size[first] = y[first, day]
+        interval[first] = since[first]
+        size[update] += CROSTON_ALPHA * (y[update, day] - size[update])
+        interval[update] += CROSTON_ALPHA * (since[update] - interval[update])
+        since[sold] = 0
+    with np.errstate(invalid="ignore"):
+        level = size / interval * (1 - CROSTON_ALPHA / 2)
+    return np.nan_to_num(level, nan=0.0)
+
+
+def _fit_chunk(matrix):
+    dense, lengths, first = _prepare(matrix)
+    valid = lengths >= 2
+    train_len = (lengths * 0.8).astype(np.int64)
+
+    t = np.arange(dense.shape[1])
+    test = (t[None, :] >= train_len[:, None]) & (t[None, :] < lengths[:, None])
+    n_test = np.maximum(test.sum(axis=1), 1)
+    weekday = t % SEASON_LENGTH
+
+    # Error de cada método en la partición de prueba (predicciones recortadas a >= 0 como al servir)
+    errors = {}
+    for method, (level, slope, season) in _fit_params(dense, train_len).items():
+        yhat = np.maximum(level[:, None] + slope[:, None] * t[None, :] + season[:, weekday], 0)
+        diff = np.where(test, dense - yhat, 0.0)
+        mae = np.abs(diff).sum(axis=1) / n_test
+        rmse = np.sqrt((diff ** 2).sum(axis=1) / n_test)
+        if method == "seasonal_naive":
+            # Sin una semana completa de entrenamiento no hay estacionalidad que repetir
+            rmse = np.where(train_len >= SEASON_LENGTH, rmse, np.inf)
+        errors[method] = (mae, rmse)
+
+    rmse_table = np.stack([errors[m][1] for m in BASELINE_METHODS], axis=1)
+    best = rmse_table.argmin(axis=1)
+
+    # Los parámetros finales se ajustan con toda la serie: la predicción arranca tras el último día
+    final = _fit_params(dense, lengths)
+    return valid, first, best, errors, final
+
+
+def fit_baselines(series: dict, batch_size: int = 5000) -> dict:
+    """
+    Ajusta los modelos base de todas las series a la vez.
+
+    Args:
+        series (dict): key -> DataFrame con 'ds' y 'y' agregados por día (ver load_daily_series).
+        batch_size (int): series por matriz, para acotar la memoria con catálogos grandes.
+
+    Returns:
+        dict key -> (BaselineForecaster, {'MAE', 'RMSE'}) del mejor método de cada serie.
+        Las series con menos de 2 días tras la limpieza se omiten, como en train_series.
+    """
+    results = {}
+    items = list(series.items())
+    for offset in range(0, len(items), batch_size):
+        keys, starts, matrix = build_daily_matrix(dict(items[offset:offset + batch_size]))
+        if not keys:
+            continue
+        valid, first, best, errors, final = _fit_chunk(matrix)
+        origins = starts + first.astype("timedelta64[D]")
+
+        for i in np.flatnonzero(valid):
+            method = BASELINE_METHODS[best[i]]
+            level, slope, season = final[method]
+            mae, rmse = errors[method]
+            forecaster = BaselineForecaster(method, origins[i], level[i], slope[i], season[i])
+            results[keys[i]] = (forecaster, {"MAE": float(mae[i]), "RMSE": float(rmse[i])})
+    return results
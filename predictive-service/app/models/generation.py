@@ -0,0 +1,38 @@
+import itertools
+from datetime import datetime
+
+# Los lectores (rutas) toman la generación actual una sola vez por petición y trabajan
+# sobre esa referencia. El entrenamiento arma una generación nueva aparte y la publica
+# reasignando `_current`, que es atómico en CPython: nunca se ve un catálogo a medias.
+
+_counter = itertools.count(1)
+
+
+class ModelGeneration:
+    """
+    Modelos, métricas, fingerprints, predicciones precalculadas y órdenes ARIMA de un entrenamiento completo.
+    No se modifica después de publicarse.
+    """
+
+    def __init__(self, models=None, metrics=None, fingerprints=None, version=None, forecasts=None, arima=None):
+        self.models = models if models is not None else {}
+        self.metrics = metrics if metrics is not None else {}
+        self.fingerprints = fingerprints if fingerprints is not None else {}
+        self.forecasts = forecasts if forecasts is not None else {}  # key -> modelo -> precalculado
+        self.arima = arima if arima is not None else {}  # key -> órdenes ARIMA elegidos (ver train_arima)
+        self.version = version  # versión del almacén en disco (None si no se guardó)
+        self.created_at = datetime.now()
+        self.id = version or f"mem-{self.created_at.strftime('%Y%m%dT%H%M%S')}-{next(_counter)}"
+
+
+_current = ModelGeneration(version=None)
+
+
+def get_generation() -> ModelGeneration:
+    return _current
+
+
+def publish_generation(generation: ModelGeneration) -> ModelGeneration:
+    global _current
+    _current = generation
+    return generation
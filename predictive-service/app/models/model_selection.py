@@ -0,0 +1,71 @@
+import numpy as np
+
+from app.core.config import MODEL_TIERING, TIER_MIN_DAYS, TIER_MIN_POINTS, TIER_MAX_ADI, TIER_MIN_CV
+
+# Qué modelos se entrenan según el perfil de la serie. Prophet y ARIMA son los caros
+# (segundos por serie) y solo aportan con historial suficiente y demanda regular; el resto
+# se queda con la regresión lineal y los modelos base (baseline_models, incluye Croston),
+# que se ajustan para todas las series.
+#   "regular":      historial largo y ventas casi todos los días -> todos los modelos
+#   "short":        menos de TIER_MIN_DAYS días o TIER_MIN_POINTS días con ventas
+#   "intermittent": intervalo medio entre ventas (ADI) mayor que TIER_MAX_ADI
+#   "flat":         demanda diaria casi constante (coeficiente de variación < TIER_MIN_CV)
+
+FULL_MODELS = ("prophet", "linear", "arima")
+LIGHT_MODELS = ("linear",)
+EXPENSIVE_MODELS = ("prophet", "arima")
+
+TIERS = ("regular", "short", "intermittent", "flat")
+TIER_MODELS = {
+    "regular": FULL_MODELS,
+    "short": LIGHT_MODELS,
+    "intermittent": LIGHT_MODELS,
+    "flat": LIGHT_MODELS,
+}
+
+
+def profile_series(df) -> dict:
+    """
+    Perfil de una serie diaria (ds, y) con solo los días con ventas.
+
+    Returns:
+        dict con 'days' (días entre la primera y la última venta), 'points' (días con ventas),
+        'adi' (días promedio entre ventas) y 'cv' (desviación / promedio de la demanda diaria,
+        contando los días sin ventas).
+    """
+    ds = np.asarray(df["ds"], dtype="datetime64[D]")
+    y = np.asarray(df["y"], dtype=np.float64)
+    if len(ds) == 0:
+        return {"days": 0, "points": 0, "adi": float("inf"), "cv": 0.0}
+
+    days = int((ds[-1] - ds[0]).astype(np.int64)) + 1
+    points = int((y > 0).sum())
+    adi = days / points if points else float("inf")
+
+    # Media y varianza de la serie con los días sin ventas en 0, sin armarla
+    mean = y.sum() / days
+    variance = max((y ** 2).sum() / days - mean ** 2, 0.0)
+    cv = float(np.sqrt(variance) / mean) if mean > 0 else 0.0
+    return {"days": days, "points": points, "adi": round(adi, 3), "cv": round(cv, 3)}
+
+
+def classify_series(profile: dict) -> str:
+    if profile["days"] < TIER_MIN_DAYS or profile["points"] < TIER_MIN_POINTS:
+        return "short"
+    if profile["adi"] > TIER_MAX_ADI:
+        return "intermittent"
+    if profile["cv"] < TIER_MIN_CV:
+        return "flat"
+    return "regular"
+
+
+def plan_training(series: dict) -> dict:
+    """
+    Asigna un tier a cada serie. Con MODEL_TIERING=false todas son "regular".
+
+    Returns:
+        dict key -> tier (ver TIER_MODELS para los modelos de cada uno).
+    """
+    if not MODEL_TIERING:
+        return {key: "regular" for key in series}
+    return {key: classify_series(profile_series(df)) for key, df in series.items()}
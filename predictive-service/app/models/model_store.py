@@ -0,0 +1,331 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, cada proceso se considera entrenador
+    fcntl = None
+
+from app.core.config import MODEL_STORE_DIR, MODEL_STORE_KEEP
+
+# Estructura en disco:
+#   MODEL_STORE_DIR/LATEST                                   -> id de la última versión
+#   MODEL_STORE_DIR/trainer.lock                             -> flock del proceso que entrena
+#   MODEL_STORE_DIR/versions/<version>/manifest.json         -> keys, métricas, fingerprints y órdenes ARIMA
+#   MODEL_STORE_DIR/versions/<version>/models/<id>.joblib    -> modelos de una key
+#   MODEL_STORE_DIR/versions/<version>/forecasts.npy         -> matriz de predicciones (filas x horizonte)
+#   MODEL_STORE_DIR/versions/<version>/forecasts_index.json  -> key/modelo -> fila de la matriz
+#
+# forecasts.npy se abre con mmap: todos los workers de uvicorn comparten las mismas
+# páginas del page cache en vez de tener cada uno su copia de las predicciones.
+
+VERSIONS_DIR = os.path.join(MODEL_STORE_DIR, "versions")
+LATEST_FILE = os.path.join(MODEL_STORE_DIR, "LATEST")
+TRAINER_LOCK_FILE = os.path.join(MODEL_STORE_DIR, "trainer.lock")
+
+# Predicciones que se evalúan al vuelo a partir de parámetros (ver forecast_store)
+PARAMETER_MODES = {
+    "linear": ("coef", "intercept"),
+    "baseline": ("method", "origin", "level", "slope", "season"),
+}
+
+_trainer_lock_fd = None
+
+
+def key_id(key) -> str:
+    """
+    Nombre de archivo estable para una key (product, brand, unit).
+    """
+    raw = "\x1f".join(key)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def fingerprint_series(df) -> str:
+    """
+    Hash de la serie diaria agregada (ds, y). Si no cambia, el modelo entrenado sigue siendo válido.
+
+    `y` se redondea a 6 decimales para que el hash no dependa del orden en que se
+    sumaron las ventas del día (SQL vs pandas); con cantidades enteras no cambia nada.
+    """
+    h = hashlib.sha256()
+    h.update(np.asarray(df["ds"], dtype="datetime64[D]").astype("int64").tobytes())
+    h.update(np.round(np.asarray(df["y"], dtype="float64"), 6).tobytes())
+    return h.hexdigest()
+
+
+class LazyModels(dict):
+    """
+    Modelos de una key que se leen del disco la primera vez que se usan.
+    Se comporta como el dict {'prophet': ..., 'linear': ..., 'arima': ..., 'baseline': ...} de siempre.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if not self.loaded:
+                super().update(joblib.load(self.path))
+                self.loaded = True
+
+    def __getitem__(self, name):
+        self._load()
+        return super().__getitem__(name)
+
+    def get(self, name, default=None):
+        self._load()
+        return super().get(name, default)
+
+    def __contains__(self, name):
+        self._load()
+        return super().__contains__(name)
+
+    def __iter__(self):
+        self._load()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load()
+        return super().__len__()
+
+    def keys(self):
+        self._load()
+        return super().keys()
+
+    def values(self):
+        self._load()
+        return super().values()
+
+    def items(self):
+        self._load()
+        return super().items()
+
+    def __reduce__(self):
+        # Al pasar a otro proceso se envía solo la ruta, no los modelos
+        return (LazyModels, (self.path,))
+
+
+def _to_float_metrics(key_metrics):
+    return {
+        name: {k: float(v) for k, v in values.items()}
+        for name, values in key_metrics.items()
+    }
+
+
+def _prune_old_versions(keep_version):
+    # Los ids empiezan con la fecha, así que el orden alfabético es cronológico
+    versions = sorted(name for name in os.listdir(VERSIONS_DIR) if not name.startswith("."))
+    keep = set(versions[-max(1, MODEL_STORE_KEEP):]) | {keep_version}
+    for version in versions:
+        if version not in keep:
+            shutil.rmtree(os.path.join(VERSIONS_DIR, version), ignore_errors=True)
+
+
+def _link_or_copy(src, dest):
+    # Los modelos que no cambiaron se enlazan desde la versión anterior en vez de reescribirse
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def acquire_trainer_lock() -> bool:
+    """
+    Intenta ser el único proceso que entrena (flock no bloqueante sobre trainer.lock).
+    El lock se mantiene mientras viva el proceso; si muere, el sistema lo libera y
+    otro worker puede tomarlo.
+
+    Returns:
+        bool: True si este proceso es (o ya era) el entrenador.
+    """
+    global _trainer_lock_fd
+    if _trainer_lock_fd is not None or fcntl is None:
+        return True
+
+    os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+    fd = os.open(TRAINER_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _trainer_lock_fd = fd
+    return True
+
+
+def _write_forecasts(version_dir, forecasts):
+    # Las predicciones con valores (prophet, arima) van como filas de una sola matriz;
+    # las lineales y las de los modelos base solo guardan sus parámetros en el índice
+    rows = []
+    index = []
+    for key, key_forecasts in forecasts.items():
+        for model_name, entry in key_forecasts.items():
+            item = {"key": list(key), "model": model_name, "mode": entry["mode"]}
+            if entry["mode"] in PARAMETER_MODES:
+                item.update({name: entry[name] for name in PARAMETER_MODES[entry["mode"]]})
+            else:
+                item["row"] = len(rows)
+                item["length"] = len(entry["yhat"])
+                if entry["mode"] == "fixed":
+                    item["start"] = str(np.datetime64(entry["start"], "D"))
+                rows.append(entry["yhat"])
+            index.append(item)
+
+    width = max((len(row) for row in rows), default=0)
+    matrix = np.full((len(rows), width), np.nan, dtype=np.float64)
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+
+    np.save(os.path.join(version_dir, "forecasts.npy"), matrix)
+    with open(os.path.join(version_dir, "forecasts_index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+
+
+def _read_forecasts(version_dir):
+    index_path = os.path.join(version_dir, "forecasts_index.json")
+    if not os.path.exists(index_path):
+        return {}
+
+    matrix = np.load(os.path.join(version_dir, "forecasts.npy"), mmap_mode="r")
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+
+    forecasts = {}
+    for item in index:
+        entry = {"mode": item["mode"]}
+        if item["mode"] in PARAMETER_MODES:
+            entry.update({name: item[name] for name in PARAMETER_MODES[item["mode"]]})
+        else:
+            # Vista sobre el mmap: no copia datos
+            entry["yhat"] = matrix[item["row"], :item["length"]]
+            if item["mode"] == "fixed":
+                entry["start"] = np.datetime64(item["start"], "D")
+        forecasts.setdefault(tuple(item["key"]), {})[item["model"]] = entry
+    return forecasts
+
+
+def save_generation(models: dict, metrics: dict, fingerprints: dict, forecasts: dict = None, arima: dict = None) -> str:
+    """
+    Guarda una generación completa de modelos y la marca como la última.
+    `fingerprints` puede incluir series sin modelo (pocos datos) para no reintentarlas
+    en el siguiente entrenamiento incremental.
+
+    Returns:
+        str: id de la versión guardada.
+    """
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f") + "-" + uuid.uuid4().hex[:6]
+    tmp_dir = os.path.join(VERSIONS_DIR, f".tmp-{version}")
+    os.makedirs(os.path.join(tmp_dir, "models"), exist_ok=True)
+
+    entries = []
+    for key, key_models in models.items():
+        filename = f"{key_id(key)}.joblib"
+        dest = os.path.join(tmp_dir, "models", filename)
+        if isinstance(key_models, LazyModels) and not key_models.loaded:
+            _link_or_copy(key_models.path, dest)
+        else:
+            joblib.dump(dict(key_models), dest)
+        entries.append({
+            "key": list(key),
+            "file": filename,
+            "fingerprint": fingerprints.get(key),
+            "metrics": _to_float_metrics(metrics.get(key, {})),
+            "arima": (arima or {}).get(key),
+        })
+
+    skipped = [
+        {"key": list(key), "fingerprint": fingerprint}
+        for key, fingerprint in fingerprints.items()
+        if key not in models
+    ]
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "entries": entries,
+        "skipped": skipped,
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    _write_forecasts(tmp_dir, forecasts or {})
+
+    # Publicar: primero la carpeta completa, luego el puntero LATEST (ambos atómicos)
+    os.rename(tmp_dir, os.path.join(VERSIONS_DIR, version))
+    tmp_latest = f"{LATEST_FILE}.tmp"
+    with open(tmp_latest, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_latest, LATEST_FILE)
+
+    _prune_old_versions(version)
+    return version
+
+
+def read_latest_version():
+    """
+    Id de la última versión publicada, o None si no hay ninguna.
+    """
+    try:
+        with open(LATEST_FILE, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_latest():
+    """
+    Lee la última versión guardada (ver load_version).
+    """
+    version = read_latest_version()
+    if version is None:
+        return None
+    return load_version(version)
+
+
+def load_version(version):
+    """
+    Lee el manifest de una versión guardada. Los modelos no se deserializan
+    hasta que se usan (ver LazyModels) y las predicciones se abren con mmap,
+    así que el arranque tarda segundos.
+
+    Returns:
+        dict con 'version', 'models', 'metrics', 'fingerprints', 'forecasts' y 'arima',
+        o None si la versión no existe.
+    """
+    version_dir = os.path.join(VERSIONS_DIR, version)
+    manifest_path = os.path.join(version_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    forecasts = _read_forecasts(version_dir)
+
+    loaded = {"version": version, "models": {}, "metrics": {}, "fingerprints": {}, "forecasts": forecasts, "arima": {}}
+    for entry in manifest["entries"]:
+        key = tuple(entry["key"])
+        loaded["models"][key] = LazyModels(os.path.join(version_dir, "models", entry["file"]))
+        loaded["metrics"][key] = entry["metrics"]
+        loaded["fingerprints"][key] = entry["fingerprint"]
+        if entry.get("arima"):
+            loaded["arima"][key] = entry["arima"]
+    for entry in manifest.get("skipped", []):
+        loaded["fingerprints"][tuple(entry["key"])] = entry["fingerprint"]
+
+    return loaded
@@ -1,14 +1,65 @@
 import pandas as pd
 from prophet import Prophet
-from collections import defaultdict
-from app.db.connection import get_connection
+from app.services.sales_service import load_daily_series
+from app.core.config import (
+    TRAINING_WORKERS,
+    MODEL_TIMEOUT_SECONDS,
+    ARIMA_WARM_START,
+    ARIMA_REFIT_TOLERANCE,
+    ARIMA_FULL_SEARCH_EVERY,
+)
+from app.models.model_store import save_generation, load_latest, load_version, read_latest_version, fingerprint_series
+from app.models.generation import ModelGeneration, get_generation, publish_generation
+from app.models.baseline_models import fit_baselines, BASELINE_METHODS
+from app.models.model_selection import plan_training, TIERS, TIER_MODELS, FULL_MODELS, EXPENSIVE_MODELS
+from app.models.training_schedule import load_pending, save_pending, prioritize_series, training_deadline
+from app.services.forecast_store import precompute_key_forecasts
+from app.services.forecasting import predict_prophet_horizon
+from app.utils.runtime_metrics import stage, stage_seconds, model_fit_seconds, training_series, training_tier_series
 import numpy as np
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from pmdarima import auto_arima
+from pmdarima import auto_arima, ARIMA
+
+# Los modelos y métricas publicados viven en app.models.generation (get_generation())
+training_report = {}  # Tiempos del último entrenamiento (por key y global)
+_training_lock = threading.Lock()  # Un solo entrenamiento a la vez
+
+
+class ModelTimeoutError(Exception):
+    pass
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Corta el entrenamiento de un modelo si supera `seconds`.
+    Solo funciona en el hilo principal (los workers del pool lo son);
+    en otro hilo se ejecuta sin límite.
+    """
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _handler(signum, frame):
+        raise ModelTimeoutError(f"superó {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, _handler)
+    signal.alarm(seconds)
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
 
-models = {}    # Almacena modelos entrenados por tipo
-metrics = {}   # Almacena métricas MAE y RMSE por tipo
 
 def train_linear_regression(df):
     df = df.copy()
@@ -31,7 +82,19 @@ def train_linear_regression(df):
 
     return model, mae, rmse
 
-def train_arima(df):
+def train_arima(df, previous=None):
+    """
+    Entrena ARIMA con búsqueda de órdenes (auto_arima) o, si hay `previous`, reajustando
+    los órdenes que eligió la generación anterior, que es mucho más barato.
+
+    Se vuelve a buscar si el reajuste falla, si su RMSE empeora más de ARIMA_REFIT_TOLERANCE
+    respecto al de la última búsqueda, o tras ARIMA_FULL_SEARCH_EVERY reajustes seguidos.
+
+    Returns:
+        (modelo, MAE, RMSE, metadatos) con metadatos = {'order', 'seasonal_order',
+        'with_intercept', 'rmse' (de la última búsqueda), 'age' (reajustes desde la búsqueda),
+        'search_seconds' (lo que tardó la búsqueda), 'mode' ('warm' o 'full')}.
+    """
     df = df.copy()
     df = df.set_index('ds')
     df = df.asfreq('D').fillna(0)
@@ -40,114 +103,575 @@ def train_arima(df):
     train = df.iloc[:train_size]
     test = df.iloc[train_size:]
 
+    if previous and previous.get("age", 0) < ARIMA_FULL_SEARCH_EVERY:
+        try:
+            model = ARIMA(
+                order=tuple(previous["order"]),
+                seasonal_order=tuple(previous["seasonal_order"]),
+                with_intercept=previous.get("with_intercept", True),
+                suppress_warnings=True,
+            )
+            model.fit(train['y'])
+            forecast = model.predict(n_periods=len(test))
+
+            mae = mean_absolute_error(test['y'], forecast)
+            rmse = np.sqrt(mean_squared_error(test['y'], forecast))
+            if rmse <= previous["rmse"] * (1 + ARIMA_REFIT_TOLERANCE) + 1e-9:
+                meta = {**previous, "age": previous.get("age", 0) + 1, "mode": "warm"}
+                return model, mae, rmse, meta
+            print(f"🔁 ARIMA {previous['order']} empeoró (RMSE {rmse:.2f} vs {previous['rmse']:.2f}), se busca de nuevo")
+        except ModelTimeoutError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Reajuste ARIMA {previous.get('order')} falló, se busca de nuevo: {e}")
+
     try:
+        t0 = time.perf_counter()
         model = auto_arima(train['y'], seasonal=True, m=7, suppress_warnings=True)
+        search_seconds = time.perf_counter() - t0
         forecast = model.predict(n_periods=len(test))
 
         mae = mean_absolute_error(test['y'], forecast)
         rmse = np.sqrt(mean_squared_error(test['y'], forecast))
-        return model, mae, rmse
+        meta = {
+            "order": list(model.order),
+            "seasonal_order": list(model.seasonal_order),
+            "with_intercept": bool(model.with_intercept),
+            "rmse": float(rmse),
+            "age": 0,
+            "search_seconds": round(search_seconds, 3),
+            "mode": "full",
+        }
+        return model, mae, rmse, meta
+    except ModelTimeoutError:
+        raise
     except Exception as e:
         print(f"❌ ARIMA fallo en {df.index[0]}: {e}")
-        return None, None, None
-
-def train_models_from_db():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT
-            product_name,
-            COALESCE(brand_name, 'Sin marca') AS brand,
-            COALESCE(unit_of_measure_name, 'Sin unidad') AS unit,
-            sale_date::date AS date,
-            quantity
-        FROM product_sales
-        WHERE sale_date IS NOT NULL AND quantity IS NOT NULL
-        ORDER BY sale_date;
-    """)
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    grouped = defaultdict(list)
-    for row in rows:
-        key = (row['product_name'], row['brand'], row['unit'])
-        grouped[key].append({'ds': row['date'], 'y': float(row['quantity'])})
-
-    models.clear()
-    metrics.clear()
-
-    for key, records in grouped.items():
-        
-        df = pd.DataFrame(records)
-        df = df.groupby("ds").sum().reset_index()
-        df = df.sort_values(by='ds').reset_index(drop=True)
-
-        if df.shape[0] < 2:
-            print(f"⏭️ Skip {key} por pocos datos ({df.shape[0]})")
-            continue
-
-        # Eliminar outliers
-        q1 = df['y'].quantile(0.25)
-        q3 = df['y'].quantile(0.75)
-        iqr = q3 - q1
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
-        df = df[(df['y'] >= lower_bound) & (df['y'] <= upper_bound)]
-
-        if df.shape[0] < 2:
-            print(f"⚠️ Skip {key} después de limpieza por pocos datos")
-            continue
-
-        cap_value = df['y'].max() * 1.2
-        df['cap'] = cap_value
-        df['floor'] = 0
-
-        train_size = int(len(df) * 0.8)
-        train_df = df.iloc[:train_size]
-        test_df = df.iloc[train_size:]
-
-        models[key] = {}
-        metrics[key] = {}
-
-        # Prophet
-        prophet_model = Prophet(
-            growth="logistic",
-            seasonality_mode="multiplicative",  
-            yearly_seasonality=False,
-            weekly_seasonality=True,            
-            changepoint_prior_scale=0.15  
-        )
-        prophet_model.add_seasonality(name='monthly', period=30.5, fourier_order=4)
-        prophet_model.fit(train_df)
+        return None, None, None, None
+
+def train_prophet(train_df, test_df, cap_value):
+    prophet_model = Prophet(
+        growth="logistic",
+        seasonality_mode="multiplicative",
+        yearly_seasonality=False,
+        weekly_seasonality=True,
+        changepoint_prior_scale=0.15
+    )
+    prophet_model.add_seasonality(name='monthly', period=30.5, fourier_order=4)
+    prophet_model.fit(train_df)
+
+    # Solo los días posteriores al entrenamiento, sin intervalos de incertidumbre
+    pred = predict_prophet_horizon(prophet_model, len(test_df)).reset_index(drop=True)
+    true = test_df[['ds', 'y']].reset_index(drop=True)
+    pred['yhat'] = pred['yhat'].clip(lower=0, upper=cap_value)
 
-        future = prophet_model.make_future_dataframe(periods=len(test_df), freq='D')
-        future['cap'] = cap_value
-        future['floor'] = 0
-        forecast = prophet_model.predict(future)
+    prophet_mae = mean_absolute_error(true['y'], pred['yhat'])
+    prophet_rmse = np.sqrt(mean_squared_error(true['y'], pred['yhat']))
 
-        pred = forecast[['ds', 'yhat']].tail(len(test_df)).reset_index(drop=True)
-        true = test_df[['ds', 'y']].reset_index(drop=True)
-        pred['yhat'] = pred['yhat'].clip(lower=0, upper=cap_value)
+    return prophet_model, prophet_mae, prophet_rmse
 
-        prophet_mae = mean_absolute_error(true['y'], pred['yhat'])
-        prophet_rmse = np.sqrt(mean_squared_error(true['y'], pred['yhat']))
+def train_series(key, df, timeout=MODEL_TIMEOUT_SECONDS, arima_previous=None, models=FULL_MODELS):
+    """
+    Entrena Prophet, regresión lineal y ARIMA para una sola serie (product, brand, unit).
+    `df` debe venir agregado por día y ordenado (ver aggregate_daily).
+    `arima_previous` son los órdenes ARIMA de la generación anterior (ver train_arima).
+    `models` limita qué modelos se entrenan (ver model_selection.TIER_MODELS).
 
-        models[key]['prophet'] = prophet_model
-        metrics[key]['prophet'] = {'MAE': prophet_mae, 'RMSE': prophet_rmse}
-        print(f"✅ Prophet entrenado para {key} | MAE: {prophet_mae:.2f} | RMSE: {prophet_rmse:.2f}")
+    Returns:
+        dict con 'models', 'metrics', 'forecasts' (precalculadas a 60 días), 'arima'
+        (metadatos de train_arima) y 'timings' (segundos por modelo y total).
+        'models' es None si la serie no tiene datos suficientes.
+    """
+    started = time.perf_counter()
+    timings = {}
+    result = {"models": None, "metrics": None, "forecasts": None, "arima": None, "timings": timings}
 
-        # Linear Regression
+    if df.shape[0] < 2:
+        print(f"⏭️ Skip {key} por pocos datos ({df.shape[0]})")
+        timings["total"] = time.perf_counter() - started
+        return result
+
+    # Eliminar outliers
+    q1 = df['y'].quantile(0.25)
+    q3 = df['y'].quantile(0.75)
+    iqr = q3 - q1
+    lower_bound = q1 - 1.5 * iqr
+    upper_bound = q3 + 1.5 * iqr
+    df = df[(df['y'] >= lower_bound) & (df['y'] <= upper_bound)].copy()
+
+    if df.shape[0] < 2:
+        print(f"⚠️ Skip {key} después de limpieza por pocos datos")
+        timings["total"] = time.perf_counter() - started
+        return result
+
+    cap_value = df['y'].max() * 1.2
+    df['cap'] = cap_value
+    df['floor'] = 0
+
+    train_size = int(len(df) * 0.8)
+    train_df = df.iloc[:train_size]
+    test_df = df.iloc[train_size:]
+
+    key_models = {}
+    key_metrics = {}
+
+    # Prophet
+    if "prophet" in models:
+        t0 = time.perf_counter()
+        try:
+            with time_limit(timeout):
+                prophet_model, prophet_mae, prophet_rmse = train_prophet(train_df, test_df, cap_value)
+            key_models['prophet'] = prophet_model
+            key_metrics['prophet'] = {'MAE': prophet_mae, 'RMSE': prophet_rmse}
+            print(f"✅ Prophet entrenado para {key} | MAE: {prophet_mae:.2f} | RMSE: {prophet_rmse:.2f}")
+        except ModelTimeoutError as e:
+            print(f"⏱️ Prophet cancelado para {key}: {e}")
+        timings['prophet'] = time.perf_counter() - t0
+
+    # Linear Regression
+    if "linear" in models:
+        t0 = time.perf_counter()
         lin_model, lin_mae, lin_rmse = train_linear_regression(df)
-        models[key]['linear'] = lin_model
-        metrics[key]['linear'] = {'MAE': lin_mae, 'RMSE': lin_rmse}
+        key_models['linear'] = lin_model
+        key_metrics['linear'] = {'MAE': lin_mae, 'RMSE': lin_rmse}
         print(f"📐 Linear entrenado para {key} | MAE: {lin_mae:.2f} | RMSE: {lin_rmse:.2f}")
+        timings['linear'] = time.perf_counter() - t0
+
+    # ARIMA
+    if "arima" in models:
+        t0 = time.perf_counter()
+        try:
+            with time_limit(timeout):
+                arima_model, arima_mae, arima_rmse, arima_meta = train_arima(df, arima_previous)
+            if arima_model:
+                key_models['arima'] = arima_model
+                key_metrics['arima'] = {'MAE': arima_mae, 'RMSE': arima_rmse}
+                result["arima"] = arima_meta
+                print(f"📊 ARIMA ({arima_meta['mode']}) entrenado para {key} | MAE: {arima_mae:.2f} | RMSE: {arima_rmse:.2f}")
+        except ModelTimeoutError as e:
+            print(f"⏱️ ARIMA cancelado para {key}: {e}")
+        timings['arima'] = time.perf_counter() - t0
+
+    # Predicciones al horizonte máximo, para que las rutas solo tengan que recortarlas
+    t0 = time.perf_counter()
+    result["forecasts"] = precompute_key_forecasts(key_models)
+    timings['precompute'] = time.perf_counter() - t0
+
+    timings["total"] = time.perf_counter() - started
+    result["models"] = key_models
+    result["metrics"] = key_metrics
+    return result
+
+def aggregate_daily(df):
+    df = df.groupby("ds").sum().reset_index()
+    return df.sort_values(by='ds').reset_index(drop=True)
+
+def _train_series_job(key, df, timeout, arima_previous=None, models=FULL_MODELS):
+    # Punto de entrada de cada worker del pool (debe ser picklable)
+    return key, train_series(key, df, timeout, arima_previous, models)
+
+def _init_training_worker(nice):
+    # Los procesos de entrenamiento ceden la CPU a los workers de uvicorn
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+def _train_series_safe(key, df, timeout, arima_previous, models):
+    # Entrenamiento en este proceso, con el mismo manejo de errores que los del pool
+    try:
+        return train_series(key, df, timeout, arima_previous, models)
+    except Exception as e:
+        print(f"❌ Error entrenando {key}: {e}")
+        return None
+
+def run_training(series, workers=None, timeout=MODEL_TIMEOUT_SECONDS, arima_hints=None, model_plan=None,
+                 order=None, deadline=None, nice=0):
+    """
+    Entrena todas las series repartiéndolas entre procesos.
+
+    Args:
+        series (dict): key -> DataFrame con columnas 'ds' y 'y'.
+        workers (int): Número de procesos. Con 1 se entrena en el proceso actual.
+        timeout (int): Segundos máximos por modelo.
+        arima_hints (dict): key -> órdenes ARIMA anteriores para reajustar sin búsqueda.
+        model_plan (dict): key -> modelos a entrenar; las que falten entrenan todos.
+        order (list): keys en orden de prioridad. Sin él, las series más largas primero.
+        deadline (float): time.monotonic() desde el que no se empiezan series nuevas (las
+            que ya se están entrenando terminan). Las que no empezaron no se devuelven.
+        nice (int): Incremento de nice de los procesos del pool.
+
+    Yields:
+        (key, resultado de train_series) en orden de finalización; (key, None) si el
+        entrenamiento de esa serie falló (excepción en el worker o el pool se cayó).
+    """
+    workers = max(1, workers or TRAINING_WORKERS)
+    arima_hints = arima_hints or {}
+    model_plan = model_plan or {}
+    keys = list(order) if order is not None else list(series)
+
+    def expired():
+        return deadline is not None and time.monotonic() >= deadline
+
+    def is_light(key):
+        # Sin Prophet ni ARIMA: enviarlas a un worker cuesta más que ajustarlas aquí
+        return not set(model_plan.get(key, FULL_MODELS)) & set(EXPENSIVE_MODELS)
+
+    def train_here(key):
+        return _train_series_safe(key, series[key], timeout, arima_hints.get(key), model_plan.get(key, FULL_MODELS))
+
+    if order is None:
+        # Sin prioridades: las livianas primero y después las más largas, para repartir
+        # mejor la carga entre workers
+        heavy = sorted((key for key in keys if not is_light(key)), key=lambda key: len(series[key]), reverse=True)
+        keys = [key for key in keys if is_light(key)] + heavy
+    heavy_count = sum(1 for key in keys if not is_light(key))
+
+    if workers == 1 or heavy_count <= 1:
+        for key in keys:
+            if expired():
+                return
+            yield key, train_here(key)
+        return
+
+    # "spawn" evita heredar hilos (scheduler, uvicorn) y conexiones abiertas del padre
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, heavy_count), mp_context=context,
+        initializer=_init_training_worker, initargs=(nice,),
+    ) as executor:
+        # Las pesadas se envían de a pocas (dos por worker) para respetar el orden y poder
+        # cortar en el plazo; las livianas se entrenan aquí en su turno mientras los workers
+        # trabajan, así el orden de prioridad vale para todas
+        remaining = iter(keys)
+        futures = {}
+        broken = False
+
+        def mark_broken():
+            nonlocal broken
+            if not broken:
+                print("💥 El pool de entrenamiento se cayó: las series pesadas restantes quedan sin entrenar")
+            broken = True
+
+        while True:
+            while len(futures) < 2 * workers and not expired():
+                key = next(remaining, None)
+                if key is None:
+                    break
+                if is_light(key):
+                    yield key, train_here(key)
+                    continue
+                if not broken:
+                    try:
+                        future = executor.submit(
+                            _train_series_job, key, series[key], timeout, arima_hints.get(key),
+                            model_plan.get(key, FULL_MODELS),
+                        )
+                        futures[future] = key
+                        continue
+                    except BrokenProcessPool:
+                        mark_broken()
+                # Con el pool caído las pesadas no se pueden entrenar: conservan sus modelos anteriores
+                yield key, None
+
+            if not futures:
+                return
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    mark_broken()
+                    yield key, None
+                except Exception as e:
+                    print(f"❌ Error entrenando {key}: {e}")
+                    yield key, None
+
+def train_models_from_db(workers=None, timeout=MODEL_TIMEOUT_SECONDS, incremental=False,
+                         budget_seconds=None, prioritize=False, nice=0):
+    """
+    Entrena los modelos de todas las series de product_sales.
+
+    Con incremental=True solo se reentrenan las series cuyo fingerprint cambió
+    (ventas nuevas o corregidas); el resto conserva sus modelos y métricas.
+
+    Con prioritize=True las series se entrenan en orden de prioridad y con budget_seconds
+    se dejan de empezar series al agotarse el tiempo (ver training_schedule): las que
+    quedan conservan sus modelos anteriores y se retoman en el siguiente entrenamiento.
+
+    La generación nueva se arma aparte y se publica al final de una sola vez;
+    mientras tanto las rutas siguen sirviendo la anterior completa.
+
+    Returns:
+        dict con el reporte de este entrenamiento (ver training_report), o None si ya había
+        otro en curso y este no se hizo.
+    """
+    if not _training_lock.acquire(blocking=False):
+        print("⏳ Ya hay un entrenamiento en curso, se omite este")
+        return None
+
+    try:
+        _train_generation(workers, timeout, incremental, budget_seconds, prioritize, nice)
+        # Copia tomada con el lock: otro entrenamiento no puede reemplazarlo antes de devolverlo
+        return dict(training_report)
+    finally:
+        _training_lock.release()
+
+def _train_generation(workers, timeout, incremental, budget_seconds=None, prioritize=False, nice=0):
+    started = time.perf_counter()
+    deadline = training_deadline(budget_seconds)
+    previous = get_generation()
+
+    # Una sola consulta agregada por día, leída en bloques columnares
+    load_started = time.perf_counter()
+    with stage("training", "load"):
+        series = load_daily_series()
+    load_seconds = time.perf_counter() - load_started
+    fingerprints = {key: fingerprint_series(df) for key, df in series.items()}
+
+    models = {}
+    metrics = {}
+    forecasts = {}
+    arima = {}
+    removed = []
+    if incremental:
+        dirty = {
+            key: df for key, df in series.items()
+            if fingerprints[key] != previous.fingerprints.get(key)
+        }
+        removed = [key for key in previous.models if key not in series]
+        for key, key_models in previous.models.items():
+            if key in series and key not in dirty:
+                models[key] = key_models
+                metrics[key] = previous.metrics.get(key, {})
+                if key in previous.forecasts:
+                    forecasts[key] = previous.forecasts[key]
+                if key in previous.arima:
+                    arima[key] = previous.arima[key]
+        print(f"🔎 Series con cambios: {len(dirty)}/{len(series)} | eliminadas: {len(removed)}")
+    else:
+        dirty = series
+
+    training_series.inc(len(series) - len(dirty), outcome="reused")
+
+    # Prophet y ARIMA solo para las series que los aprovechan (ver model_selection)
+    with stage("training", "plan"):
+        tiers = plan_training(dirty)
+    model_plan = {key: TIER_MODELS[tier] for key, tier in tiers.items()}
+    tier_report = {
+        "counts": {tier: 0 for tier in TIERS},
+        "fit_seconds": {tier: 0.0 for tier in TIERS},
+        "saved_seconds": 0.0,
+    }
+    for tier in tiers.values():
+        tier_report["counts"][tier] += 1
+
+    # Modelos base de todas las series cambiadas en una sola pasada vectorizada
+    baseline_started = time.perf_counter()
+    with stage("training", "baseline"):
+        baselines = fit_baselines(dirty)
+    baseline_seconds = time.perf_counter() - baseline_started
+
+    # Series más importantes primero (ventanas del scheduler)
+    pending = load_pending() if prioritize else {}
+    order = None
+    if prioritize:
+        with stage("training", "prioritize"):
+            order = prioritize_series(dirty, previous, pending)
+
+    # Órdenes ARIMA ya elegidos: se reajustan en vez de repetir la búsqueda
+    arima_hints = previous.arima if ARIMA_WARM_START else {}
+    arima_report = {"warm": 0, "full": 0, "warm_seconds": 0.0, "full_seconds": 0.0, "saved_seconds": 0.0}
+
+    key_timings = {}
+    failed = []
+    with stage("training", "fit"):
+        for key, result in run_training(dirty, workers, timeout, arima_hints, model_plan, order, deadline, nice):
+            if result is None:
+                failed.append(key)
+                training_series.inc(outcome="failed")
+                continue
+            key_timings[key] = result["timings"]
+            tier_report["fit_seconds"][tiers[key]] += result["timings"]["total"]
+            for model_name, seconds in result["timings"].items():
+                if model_name != "total":
+                    model_fit_seconds.observe(seconds, model=model_name)
+            if result["models"] is None:
+                training_series.inc(outcome="skipped")
+                continue
+            training_series.inc(outcome="trained")
+            models[key] = result["models"]
+            metrics[key] = result["metrics"]
+            forecasts[key] = result["forecasts"]
+            arima_meta = result["arima"]
+            if arima_meta:
+                arima[key] = arima_meta
+                arima_seconds = result["timings"].get("arima", 0.0)
+                arima_report[arima_meta["mode"]] += 1
+                arima_report[f"{arima_meta['mode']}_seconds"] += arima_seconds
+                if arima_meta["mode"] == "warm":
+                    # Ahorro estimado: lo que tardó la última búsqueda de esta serie menos el reajuste
+                    arima_report["saved_seconds"] += max(0.0, arima_meta["search_seconds"] - arima_seconds)
+
+    # Con presupuesto, las que no llegaron a entrenarse conservan lo anterior y se guardan
+    # sin fingerprint para que el siguiente entrenamiento incremental las retome. Lo mismo
+    # con las que fallaron en el worker (o quedaron sin entrenar porque el pool se cayó).
+    failed_keys = set(failed)
+    deferred = (
+        [key for key in dirty if key not in key_timings and key not in failed_keys]
+        if deadline is not None else []
+    )
+    for key in deferred + failed:
+        fingerprints.pop(key, None)
+        if key in previous.models:
+            models[key] = previous.models[key]
+            metrics[key] = previous.metrics.get(key, {})
+            if key in previous.forecasts:
+                forecasts[key] = previous.forecasts[key]
+            if key in previous.arima:
+                arima[key] = previous.arima[key]
+    kept_previous = {key for key in deferred + failed if key in previous.models}
+    training_series.inc(len(deferred), outcome="deferred")
+
+    # Ahorro estimado: lo que Prophet y ARIMA tardaron en promedio en las series "regular"
+    # de este entrenamiento, por cada serie que no los entrenó
+    expensive = [
+        sum(key_timings[key].get(name, 0.0) for name in EXPENSIVE_MODELS)
+        for key, tier in tiers.items() if tier == "regular" and key in key_timings
+    ]
+    skipped_expensive = sum(1 for tier in tiers.values() if tier != "regular")
+    if expensive:
+        tier_report["saved_seconds"] = skipped_expensive * sum(expensive) / len(expensive)
+    for tier, count in tier_report["counts"].items():
+        training_tier_series.inc(count, tier=tier)
+
+    # El modelo base se suma como un competidor más; si los demás fallaron queda solo él
+    baseline_report = {"series": len(baselines), "seconds": round(baseline_seconds, 3), "fallback": 0}
+    baseline_report.update({method: 0 for method in BASELINE_METHODS})
+    for key, (forecaster, key_metrics) in baselines.items():
+        if key in kept_previous:
+            continue  # sus modelos anteriores quedan intactos hasta que se reentrene completa
+        if key not in models:
+            models[key], metrics[key], forecasts[key] = {}, {}, {}
+            baseline_report["fallback"] += 1
+        models[key]["baseline"] = forecaster
+        metrics[key]["baseline"] = key_metrics
+        forecasts[key].update(precompute_key_forecasts({"baseline": forecaster}))
+        baseline_report[forecaster.method] += 1
+
+    with stage("training", "save"):
+        version = save_models_to_store(models, metrics, fingerprints, forecasts, arima)
+        stored = load_version(version) if version else None
+    if stored is not None:
+        # Publicar lo guardado (modelos bajo demanda, predicciones en mmap) en lugar de lo
+        # entrenado: se libera la memoria y este worker sirve lo mismo que los demás
+        generation = _publish_stored(stored)
+    else:
+        generation = publish_generation(ModelGeneration(models, metrics, fingerprints, version, forecasts, arima))
+
+    # Sin presupuesto no queda nada pendiente: también limpia lo de ventanas anteriores
+    save_pending(deferred, pending)
+
+    elapsed = time.perf_counter() - started
+    stage_seconds.observe(elapsed, operation="training", stage="total")
+    training_report.clear()
+    training_report.update({
+        "workers": max(1, workers or TRAINING_WORKERS),
+        "incremental": incremental,
+        "generation": generation.id,
+        "series": len(series),
+        "retrained": len(dirty) - len(deferred) - len(failed),
+        "failed": len(failed),
+        "reused": len(series) - len(dirty),
+        "removed": len(removed),
+        "trained": len(models),
+        "version": version,
+        "load_seconds": round(load_seconds, 2),
+        "elapsed_seconds": round(elapsed, 2),
+        "fit_seconds": round(sum(t.get("total", 0) for t in key_timings.values()), 2),
+        "arima": {k: round(v, 2) if isinstance(v, float) else v for k, v in arima_report.items()},
+        "baseline": baseline_report,
+        "tiers": {
+            "counts": tier_report["counts"],
+            "fit_seconds": {tier: round(v, 2) for tier, v in tier_report["fit_seconds"].items()},
+            "saved_seconds": round(tier_report["saved_seconds"], 2),
+        },
+        "schedule": {
+            "budget_seconds": budget_seconds or None,
+            "prioritized": prioritize,
+            "nice": nice,
+            "deferred": len(deferred),
+        },
+        "keys": key_timings,
+    })
+    print(
+        f"🏁 Generación {generation.id} publicada: {len(dirty) - len(deferred) - len(failed)} reentrenadas, "
+        f"{len(series) - len(dirty)} sin cambios, {len(models)} con modelo, en {elapsed:.1f}s "
+        f"(suma de ajustes {training_report['fit_seconds']:.1f}s, {training_report['workers']} workers)"
+    )
+    print(
+        f"🗂️ Tiers: {', '.join(f'{tier}: {count}' for tier, count in tier_report['counts'].items())} "
+        f"| ~{tier_report['saved_seconds']:.1f}s ahorrados sin Prophet/ARIMA"
+    )
+    print(
+        f"📏 Modelos base: {baseline_report['series']} series en {baseline_seconds * 1000:.0f} ms "
+        f"({', '.join(f'{m}: {baseline_report[m]}' for m in BASELINE_METHODS)})"
+    )
+    if failed:
+        print(f"⚠️ {len(failed)} series fallaron y conservan sus modelos anteriores hasta el próximo entrenamiento")
+    if deferred:
+        print(
+            f"⏱️ Presupuesto de {budget_seconds:.0f}s agotado: {len(deferred)} series pendientes "
+            f"para la siguiente ventana"
+        )
+    if arima_report["warm"]:
+        print(
+            f"📊 ARIMA: {arima_report['warm']} reajustadas, {arima_report['full']} con búsqueda completa, "
+            f"~{arima_report['saved_seconds']:.1f}s ahorrados"
+        )
+
+    return generation
+
+def save_models_to_store(models, metrics, fingerprints, forecasts, arima=None):
+    try:
+        version = save_generation(models, metrics, fingerprints, forecasts, arima)
+        print(f"💾 Modelos guardados en disco (versión {version})")
+        return version
+    except Exception as e:
+        print(f"❌ Error guardando modelos en disco: {e}")
+        return None
+
+def load_models_from_store():
+    """
+    Publica la última versión guardada en disco (los modelos se leen bajo demanda).
+
+    Returns:
+        str: versión cargada, o None si no hay modelos guardados.
+    """
+    stored = load_latest()
+    if stored is None:
+        return None
+    return _publish_stored(stored).version
+
+
+def reload_models_if_changed():
+    """
+    Carga la última versión del almacén si otro proceso publicó una nueva.
+
+    Returns:
+        str: versión cargada, o None si no hubo cambios.
+    """
+    version = read_latest_version()
+    if version is None or version == get_generation().version:
+        return None
+
+    stored = load_version(version)
+    if stored is None:
+        return None
+    return _publish_stored(stored).version
 
-        # ARIMA
-        arima_model, arima_mae, arima_rmse = train_arima(df)
-        if arima_model:
-            models[key]['arima'] = arima_model
-            metrics[key]['arima'] = {'MAE': arima_mae, 'RMSE': arima_rmse}
-            print(f"📊 ARIMA entrenado para {key} | MAE: {arima_mae:.2f} | RMSE: {arima_rmse:.2f}")
 
-    return models, metrics
+def _publish_stored(stored):
+    return publish_generation(ModelGeneration(
+        stored["models"], stored["metrics"], stored["fingerprints"], stored["version"], stored["forecasts"],
+        stored["arima"],
+    ))
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.core.config import MODEL_STORE_DIR, TRAINING_PRIORITY_DAYS
+from app.services.forecast_store import lookup_forecast
+
+# Reentrenamiento por ventanas: cada ventana entrena las series cambiadas en orden de
+# prioridad hasta agotar su presupuesto de tiempo. Las que no alcanzan conservan sus modelos
+# anteriores y se guardan sin fingerprint, así el siguiente entrenamiento incremental las
+# vuelve a ver como cambiadas y retoma donde quedó esta ventana.
+#
+# Orden de prioridad (de mayor a menor peso):
+#   1. alerta de reposición: la predicción actual a ALERT_DAYS días supera el stock
+#   2. series sin modelo entrenado (nuevas, o que solo tienen el modelo base)
+#   3. días que la serie lleva pendiente de ventanas anteriores
+#   4. ventas de los últimos TRAINING_PRIORITY_DAYS días
+#
+# MODEL_STORE_DIR/training-pending.json guarda desde cuándo espera cada serie pendiente.
+
+PENDING_FILE = os.path.join(MODEL_STORE_DIR, "training-pending.json")
+ALERT_DAYS = 7
+
+
+def load_pending() -> dict:
+    """
+    Series que quedaron sin entrenar en ventanas anteriores: key -> fecha ISO desde la que esperan.
+    """
+    try:
+        with open(PENDING_FILE, encoding="utf-8") as f:
+            entries = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {tuple(entry["key"]): entry["since"] for entry in entries}
+
+
+def save_pending(deferred, previous_pending: dict):
+    """
+    Guarda las series que esta ventana dejó sin entrenar, conservando desde cuándo esperan.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    entries = [{"key": list(key), "since": previous_pending.get(key, now)} for key in deferred]
+    os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+    tmp = f"{PENDING_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False)
+    os.replace(tmp, PENDING_FILE)
+
+
+def recent_volume(df, days: int = TRAINING_PRIORITY_DAYS) -> float:
+    ds = np.asarray(df["ds"], dtype="datetime64[D]")
+    if len(ds) == 0:
+        return 0.0
+    return float(np.asarray(df["y"], dtype=np.float64)[ds > ds[-1] - days].sum())
+
+
+def restock_alerts(keys, previous) -> set:
+    """
+    Keys cuya predicción publicada (la del mejor modelo, ya precalculada) supera el stock actual.
+    """
+    from app.services.inventory_service import get_current_stock_bulk
+
+    projected = {}
+    for key in keys:
+        key_metrics = previous.metrics.get(key)
+        key_forecasts = previous.forecasts.get(key)
+        if not key_metrics or key_forecasts is None:
+            continue
+        best = min(key_metrics.items(), key=lambda x: x[1]["RMSE"])[0]
+        entry = key_forecasts.get(best)
+        # Solo lo precalculado: predecir con Prophet aquí costaría más que entrenar
+        result = lookup_forecast(entry, ALERT_DAYS) if entry is not None else None
+        if result is not None:
+            projected[key] = result.total
+
+    if not projected:
+        return set()
+    stock = get_current_stock_bulk(list(projected))
+    return {key for key, total in projected.items() if total > float(stock.get(key) or 0)}
+
+
+def prioritize_series(series: dict, previous, pending: dict) -> list:
+    """
+    Ordena las series a entrenar de mayor a menor prioridad (ver el comentario del módulo).
+
+    Returns:
+        lista de keys.
+    """
+    try:
+        alerts = restock_alerts(series.keys(), previous)
+    except Exception as e:
+        print(f"⚠️ No se pudieron calcular las alertas de reposición para priorizar: {e}")
+        alerts = set()
+
+    now = datetime.now()
+
+    def waiting_days(key):
+        since = pending.get(key)
+        return (now - datetime.fromisoformat(since)).days if since else 0
+
+    def priority(key):
+        has_model = any(name != "baseline" for name in previous.metrics.get(key, {}))
+        return (key in alerts, not has_model, waiting_days(key), recent_volume(series[key]))
+
+    return sorted(series, key=priority, reverse=True)
+
+
+def training_deadline(budget_seconds):
+    """
+    Momento (time.monotonic) en que la ventana deja de enviar series, o None sin presupuesto.
+    """
+    if not budget_seconds or budget_seconds <= 0:
+        return None
+    return time.monotonic() + budget_seconds
@@ -1,74 +1,168 @@
 # app/routes/compare_route.py
 
-from fastapi import APIRouter, Query
-from app.models.prophet_models import models, metrics
-from app.services.prediction_service import get_forecast_all_models
-from typing import Dict
-from datetime import datetime, timedelta
-from app.services.inventory_service import get_current_stock_general
+import json
+from typing import Optional
+from fastapi import APIRouter, Query, Header
+from fastapi.responses import StreamingResponse
+from app.models.generation import get_generation
+from app.services.prediction_service import get_forecast_all_models_bulk
+from app.core.config import COMPARE_BATCH_SIZE, COMPARE_STREAM_BATCH_SIZE
+from app.core.executors import bulk_executor
+from app.utils.response_format import negotiate, columnar_response, JSON
 router = APIRouter()
 
 
+def select_keys(generation, brand: str, unit: str, product: Optional[str] = None) -> list:
+    product = product.strip().lower() if product else None
+    return [
+        (product_name, brand_name, unit_name)
+        for product_name, brand_name, unit_name in generation.models.keys()
+        if (brand == "Sin marca" or brand_name == brand)
+        and (unit == "Sin unidad" or unit_name == unit)
+        and (product is None or product in product_name.lower())
+    ]
+
+
+def build_comparison(key, data_key):
+    """
+    Arma el registro de comparación de un producto a partir de get_forecast_all_models_bulk.
+    """
+    if not data_key or not data_key["forecasts"]:
+        return None
+
+    product_name, brand_name, unit_name = key
+    model_forecasts = {}
+    current_quality = data_key["current_quality"]
+    general_alert = False
+
+    for model_name, data in data_key["forecasts"].items():
+        forecast = data.get("forecast", [])
+        total = data["projected_sales"]
+        needed_stock = max(0, round(total - current_quality, 2))
+        alert_restock = total > current_quality
+        if alert_restock:
+            general_alert = True
+
+        model_forecasts[model_name] = {
+            "total_forecast": round(total, 2),
+            "forecast": forecast,
+            "metrics": data.get("metrics"),
+            "alert_restock": alert_restock,
+            "needed_stock": needed_stock,
+        }
+
+    return {
+        "product": product_name,
+        "brand": brand_name,
+        "unit": unit_name,
+        "forecasts": model_forecasts,
+        "current_quality": current_quality,
+        "general_alert": general_alert,
+
+    }
+
+
+def compare_batch(generation, batch_keys: list, days: int) -> list:
+    """
+    Registros de comparación de un lote de keys (una consulta agrupada a la BD por lote).
+    """
+    try:
+        batch = get_forecast_all_models_bulk(batch_keys, days, generation, operation="compare")
+    except Exception as e:
+        print(f"Error consultando lote de {len(batch_keys)} productos: {e}")
+        return []
+
+    records = []
+    for key in batch_keys:
+        record = build_comparison(key, batch.get(key))
+        if record is not None:
+            records.append(record)
+    return records
+
+
 @router.get("/compare")
-def compare_forecasts(
+async def compare_forecasts(
     brand: str = Query("Sin marca"),
     unit: str = Query("Sin unidad"),
     days: int = Query(7, ge=1, le=60),
+    accept: Optional[str] = Header(None),
 ):
+    """
+    Comparación de modelos por producto. Para catálogos grandes conviene pedirla en formato
+    columnar (Accept: application/vnd.forecast.columnar+json o application/x-msgpack).
+    """
+    # Pool propio para /compare: no compite por hilos con /predict
+    return await bulk_executor.run(_compare_forecasts, brand, unit, days, negotiate(accept))
+
+
+def _compare_forecasts(brand: str, unit: str, days: int, media_type: str = JSON):
+    generation = get_generation()
     results = []
-    unique_keys = list(models.keys())
-    print("🔍 Keys en modelos:", unique_keys)
-
-    for product_name, brand_name, unit_name in unique_keys:
-        if brand != "Sin marca" and brand_name != brand:
-            continue
-        if unit != "Sin unidad" and unit_name != unit:
-            continue
-
-        try:
-            all_forecasts = get_forecast_all_models(product_name, brand_name, unit_name, days)
-            
-            if not all_forecasts or "forecasts" not in all_forecasts:
-                continue
-
-            model_forecasts = {}
-    
-            current_quality = get_current_stock_general(product_name, brand_name, unit_name)
-            general_alert = False
-
-            for model_name, data in all_forecasts["forecasts"].items():
-                forecast = data.get("forecast", [])
-                total = sum(item["yhat"] for item in forecast)
-                needed_stock = max(0, round(total - current_quality, 2))
-                alert_restock = total > current_quality
-                if alert_restock:
-                    general_alert = True
-               
-                model_forecasts[model_name] = {
-                    "total_forecast": round(total, 2),
-                    "forecast": forecast,
-                    "metrics": data.get("metrics"),
-                    "alert_restock": alert_restock,
-                    "needed_stock": needed_stock,
-                }
-          
-
-           
-            results.append({
-                "product": product_name,
-                "brand": brand_name,
-                "unit": unit_name,
-                "forecasts": model_forecasts,
-                "current_quality": current_quality,
-                "general_alert": general_alert,
-
-            })
-
-        except Exception as e:
-            print(f"Error procesando {product_name} ({brand_name}/{unit_name}): {e}")
-            continue
+
+    selected_keys = select_keys(generation, brand, unit)
+    print(f"🔍 Comparando {len(selected_keys)} productos")
+
+    # Los datos de BD se consultan por lotes de keys, no uno por producto
+    for start in range(0, len(selected_keys), COMPARE_BATCH_SIZE):
+        batch_keys = selected_keys[start:start + COMPARE_BATCH_SIZE]
+        results.extend(compare_batch(generation, batch_keys, days))
+
+    if media_type != JSON:
+        return columnar_response({"success": True, "generation": generation.id, "days": days}, results, media_type)
 
     return {
         "success": True,
+        "generation": generation.id,
         "comparison": results
     }
+
+
+@router.get("/compare/stream")
+async def compare_forecasts_stream(
+    brand: str = Query("Sin marca"),
+    unit: str = Query("Sin unidad"),
+    days: int = Query(7, ge=1, le=60),
+    product: Optional[str] = Query(None, description="Filtra por nombre de producto (contiene, sin distinguir mayúsculas)"),
+    alert: Optional[bool] = Query(None, description="Solo productos con (true) o sin (false) alerta general"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Igual que /compare pero en NDJSON: una línea JSON por producto, enviada apenas se
+    calcula su lote. offset/limit paginan sobre los registros ya filtrados.
+    La generación de modelos usada va en el header X-Model-Generation.
+    """
+    generation = get_generation()
+    selected_keys = select_keys(generation, brand, unit, product)
+
+    if alert is None:
+        # Sin filtro de alerta se pagina sobre las keys antes de calcular (cada key da un
+        # registro, salvo las que no tienen ninguna predicción, que igual ocupan su lugar)
+        selected_keys = selected_keys[offset:offset + limit] if limit else selected_keys[offset:]
+        offset = 0
+
+    print(f"🔍 Comparando (stream) {len(selected_keys)} productos")
+
+    async def stream():
+        skipped = 0
+        sent = 0
+        for start in range(0, len(selected_keys), COMPARE_STREAM_BATCH_SIZE):
+            batch_keys = selected_keys[start:start + COMPARE_STREAM_BATCH_SIZE]
+            records = await bulk_executor.run(compare_batch, generation, batch_keys, days)
+
+            for record in records:
+                if alert is not None and record["general_alert"] != alert:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+                sent += 1
+                if limit and sent >= limit:
+                    return
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Generation": generation.id},
+    )
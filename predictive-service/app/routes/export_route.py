@@ -0,0 +1,86 @@
+# app/routes/export_route.py
+
+import os
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+from app.models.generation import get_generation
+from app.routes.compare_route import select_keys
+from app.routes.predict_route import XLSX_MEDIA_TYPE
+from app.services.export_jobs import submit_catalog_export, get_job, job_file_path
+from app.utils.logging_config import logger
+
+router = APIRouter()
+
+
+def _job_response(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "filters": job["filters"],
+        "days": job["days"],
+        "products": job["keys"],
+        "generation": job["generation"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "size": job["size"],
+        "error": job["error"],
+        "status_url": f"/export/jobs/{job['id']}",
+        "download_url": f"/export/jobs/{job['id']}/download",
+    }
+
+
+@router.post("/export/jobs", status_code=202)
+async def create_export_job(data: dict = Body(default={})):
+    """
+    Reporte de catálogo en segundo plano: {"brand", "unit", "product", "days"}, con los
+    mismos filtros que /compare ("Sin marca" / "Sin unidad" = todas). Devuelve el id del
+    trabajo; el archivo se descarga de download_url cuando status es "done".
+    """
+    brand = data.get("brand") or "Sin marca"
+    unit = data.get("unit") or "Sin unidad"
+    product = data.get("product") or None
+    try:
+        days = int(data.get("days", 7))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="days debe ser un número entero.")
+    if not 1 <= days <= 60:
+        raise HTTPException(status_code=400, detail="days debe estar entre 1 y 60.")
+
+    keys = select_keys(get_generation(), brand, unit, product)
+    if not keys:
+        raise HTTPException(status_code=404, detail="No hay productos con modelos para esos filtros.")
+
+    # ExecutorBusyError (503) si ya hay demasiados reportes en cola
+    job = submit_catalog_export(keys, days, {"brand": brand, "unit": unit, "product": product})
+    logger.info(f"Reporte {job['id']} encolado: {len(keys)} productos, {days} días")
+    return JSONResponse(status_code=202, content=_job_response(job))
+
+
+@router.get("/export/jobs/{job_id}")
+async def get_export_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reporte no encontrado o expirado.")
+    return _job_response(job)
+
+
+@router.get("/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reporte no encontrado o expirado.")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"El reporte falló: {job['error']}")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail="El reporte todavía se está generando.")
+
+    path = job_file_path(job_id)
+    if not os.path.exists(path):
+        # Se limpió entre la lectura del estado y la descarga
+        raise HTTPException(status_code=404, detail="Reporte no encontrado o expirado.")
+
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=f"forecast_catalogo_{job['days']}d_{job_id[:8]}.xlsx",
+    )
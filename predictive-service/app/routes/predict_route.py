@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import StreamingResponse
-from app.models.prophet_models import models
-from app.services.prediction_service import get_forecast, generar_prediccion  # ← se incluye generar_prediccion
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Query, HTTPException, Header, Body
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from app.services.prediction_service import (
+    generar_prediccion,
+    cached_stock,
+    cached_last_month_sales,
+    get_model_outputs,
+    generar_predicciones_bulk,
+)
+from app.services.cache_service import invalidate_caches, cache_sizes
 from app.services.export_service import create_forecast_excel_multi
-from app.models.prophet_models import metrics
-from app.utils.logging_config import logger  # ← nuevo import
-from fastapi import APIRouter, HTTPException, Body
-from fastapi.responses import StreamingResponse
+from app.models.generation import get_generation
+from app.services.forecasting import MODEL_NAMES, ForecastResult, future_dates
+from app.services.forecast_store import get_model_forecast
+from app.utils.logging_config import logger
+from app.core.executors import inference_executor, bulk_executor, ExecutorBusyError
+from app.utils import runtime_metrics
+from app.utils.runtime_metrics import stage
+from app.utils.response_format import negotiate, columnar_response, JSON
+from app.core.config import PREDICT_BATCH_MAX_ITEMS, PREDICT_BATCH_CHUNK_SIZE
 
 router = APIRouter()
 
@@ -39,7 +52,7 @@ def validate_input_params(product_name: str, brand: str, unit: str):
 
 
 @router.get("/predict")
-def predict(
+async def predict(
     product_name: str = Query(..., min_length=1),
     brand: str = Query("Sin marca", min_length=1),
     unit: str = Query("Sin unidad", min_length=1),
@@ -49,7 +62,8 @@ def predict(
         validate_input_params(product_name, brand, unit)
 
         # Ahora usamos la función completa que incluye guardado automático
-        prediction_data = generar_prediccion(product_name, brand, unit, days)
+        # Prophet/ARIMA y psycopg2 bloquean: se ejecutan en el pool de inferencia
+        prediction_data = await inference_executor.run(generar_prediccion, product_name, brand, unit, days)
 
         if prediction_data is None:
             logger.error(f"Modelo no encontrado: {product_name} - {brand} - {unit}")
@@ -64,30 +78,166 @@ def predict(
 }
 
     
-    except HTTPException as e:
+    except (HTTPException, ExecutorBusyError) as e:
         raise e
     except Exception as e:
         logger.exception(f"Error inesperado durante la predicción: {e}")
         raise HTTPException(status_code=500, detail="Ocurrió un error interno al generar la predicción.")
 
 
+def parse_batch_item(item):
+    """
+    Un elemento de /predict/batch: {"product_name", "brand", "unit", "days"} o
+    [product_name, brand, unit, days], con los mismos valores por defecto que /predict.
+
+    Returns:
+        (product_name, brand, unit, days)
+    Raises:
+        ValueError con el motivo si el elemento no es válido.
+    """
+    if isinstance(item, (list, tuple)):
+        item = dict(zip(("product_name", "brand", "unit", "days"), item))
+    if not isinstance(item, dict):
+        raise ValueError("Cada elemento debe ser un objeto o una lista [producto, marca, unidad, días].")
+
+    product_name = item.get("product_name") or item.get("product")
+    brand = item.get("brand") or "Sin marca"
+    unit = item.get("unit") or "Sin unidad"
+    if not all(isinstance(value, str) and value.strip() for value in (product_name, brand, unit)):
+        raise ValueError("El nombre del producto, la marca y la unidad no pueden estar vacíos.")
+    try:
+        days = int(item.get("days", 7))
+    except (TypeError, ValueError):
+        raise ValueError("days debe ser un número entero.")
+    if not 1 <= days <= 60:
+        raise ValueError("days debe estar entre 1 y 60.")
+    return product_name, brand, unit, days
+
+
+@router.post("/predict/batch")
+async def predict_batch(data: dict = Body(...)):
+    """
+    /predict para muchos productos en una llamada: {"items": [{"product_name", "brand",
+    "unit", "days"}, ...]}. Las predicciones se reparten en el pool de inferencia por
+    lotes y los datos de BD se consultan una vez para todo el batch.
+
+    Cada resultado lleva su "index" en items; los que fallan traen success=false, status
+    (400 o 404, como /predict) y detail, sin afectar al resto.
+    """
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="items debe ser una lista no vacía.")
+    if len(items) > PREDICT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {PREDICT_BATCH_MAX_ITEMS} elementos por batch.")
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, parse_batch_item(item)))
+        except ValueError as e:
+            results[index] = {"index": index, "success": False, "status": 400, "detail": str(e)}
+
+    generation = get_generation()
+    if valid:
+        parsed = [item for _, item in valid]
+        chunks = [parsed[start:start + PREDICT_BATCH_CHUNK_SIZE] for start in range(0, len(parsed), PREDICT_BATCH_CHUNK_SIZE)]
+        try:
+            with stage("predict_batch", "total"):
+                chunk_outputs = await asyncio.gather(
+                    *(inference_executor.run(get_model_outputs, chunk, generation) for chunk in chunks)
+                )
+                outputs = [output for chunk in chunk_outputs for output in chunk]
+                predictions = await inference_executor.run(generar_predicciones_bulk, parsed, outputs, generation)
+        except ExecutorBusyError:
+            raise
+        except Exception as e:
+            logger.exception(f"Error inesperado durante la predicción en batch: {e}")
+            raise HTTPException(status_code=500, detail="Ocurrió un error interno al generar las predicciones.")
+
+        for (index, _), (_, _, error), prediction_data in zip(valid, outputs, predictions):
+            if prediction_data is not None:
+                results[index] = {
+                    "index": index,
+                    "success": True,
+                    "model_used": prediction_data.pop("model_type", "desconocido"),
+                    **prediction_data,
+                }
+            elif error is not None:
+                results[index] = {"index": index, "success": False, "status": 500,
+                                  "detail": "Ocurrió un error interno al generar la predicción."}
+            else:
+                results[index] = {"index": index, "success": False, "status": 404,
+                                  "detail": "No se encontró un modelo entrenado para este producto."}
+
+    failed = sum(1 for result in results if not result["success"])
+    logger.info(f"Predicción en batch: {len(items) - failed} de {len(items)} elementos")
+    return {
+        "success": True,
+        "generation": generation.id,
+        "count": len(items),
+        "failed": failed,
+        "results": results,
+    }
+
+
 @router.get("/predict/models")
-def list_available_models():
+async def list_available_models():
+    generation = get_generation()
     return {
         "success": True,
+        "generation": generation.id,
         "models": [
             {
                 "product_name": product,
                 "brand": brand,
                 "unit": unit,
             }
-            for (product, brand, unit) in models.keys()
+            for (product, brand, unit) in generation.models.keys()
         ]
     }
 
 
-@router.post("/predict/export-all")
-def export_all_forecasts_excel(data: dict = Body(...)):
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@router.get("/predict/export")
+async def export_forecasts_excel(
+    product_name: str = Query(..., min_length=1),
+    brand: str = Query("Sin marca", min_length=1),
+    unit: str = Query("Sin unidad", min_length=1),
+    days: int = Query(7, ge=1, le=60)
+):
+    """
+    Excel con todos los modelos de un producto. Las predicciones se calculan (o se toman
+    del cache) aquí mismo: el cliente ya no tiene que enviarlas de vuelta.
+    """
+    validate_input_params(product_name, brand, unit)
+    data = await inference_executor.run(_predict_all_models, product_name, brand, unit, days)
+    if not data["forecasts"]:
+        raise HTTPException(status_code=404, detail="No hay predicciones disponibles para este producto.")
+
+    try:
+        excel_file = await bulk_executor.run(
+            create_forecast_excel_multi, data["forecasts"], product_name, brand, unit, days
+        )
+    except ExecutorBusyError:
+        raise
+    except Exception:
+        logger.exception("Error al exportar predicciones")
+        raise HTTPException(status_code=500, detail="No se pudo generar el archivo.")
+
+    filename = f"forecast_{product_name}_{brand}_{unit}.xlsx"
+    return StreamingResponse(
+        excel_file,
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+# Obsoleta: recibe las predicciones desde el cliente. Usar GET /predict/export.
+@router.post("/predict/export-all", deprecated=True)
+async def export_all_forecasts_excel(data: dict = Body(...)):
     try:
         product = data["product"]
         brand = data["brand"]
@@ -95,21 +245,25 @@ def export_all_forecasts_excel(data: dict = Body(...)):
         days = data["days"]
         forecasts = data["forecasts"]
 
-        excel_file = create_forecast_excel_multi(forecasts, product, brand, unit, days)
+        excel_file = await bulk_executor.run(create_forecast_excel_multi, forecasts, product, brand, unit, days)
         filename = f"forecast_{product}_{brand}_{unit}.xlsx"
 
         return StreamingResponse(
             excel_file,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            media_type=XLSX_MEDIA_TYPE,
             headers={"Content-Disposition": f"attachment; filename={filename}"},
         )
+    except ExecutorBusyError:
+        raise
     except Exception as e:
         logger.exception("Error al exportar predicciones")
         raise HTTPException(status_code=500, detail="No se pudo generar el archivo.")
 
 
 @router.get("/metrics")
-def get_metrics():
+async def get_metrics():
+    generation = get_generation()
+    metrics = generation.metrics
     if not metrics:
         logger.warning("Métricas vacías. Se requiere entrenamiento previo.")
         return {
@@ -132,98 +286,125 @@ def get_metrics():
     logger.info(f"{len(resumen)} métricas resumidas devueltas correctamente.")
     return {
         "success": True,
+        "generation": generation.id,
         "summary": resumen,
-        "raw": metrics  # opcional, para mantener las métricas completas
+        # Métricas completas de todos los modelos; las keys son tuplas y JSON no las acepta como llaves
+        "raw": [
+            {"product_name": key[0], "brand": key[1], "unit": key[2], "metrics": model_metrics}
+            for key, model_metrics in metrics.items()
+        ],
     }
 
+@router.get("/metrics/runtime", response_class=PlainTextResponse)
+async def get_runtime_metrics():
+    """
+    Tiempos por etapa, cache y entrenamiento en formato de texto de Prometheus.
+    (/metrics devuelve la precisión de los modelos, no esto.)
+    """
+    return PlainTextResponse(runtime_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(data: dict = Body(default={})):
+    """
+    Invalida el stock y/o las ventas cacheados, p. ej. desde NestJS tras registrar una venta
+    o un ajuste de inventario: {"scope": "stock" | "sales" | "all", "product_name", "brand", "unit"}.
+    Sin producto se invalida toda la capa. Las predicciones de los modelos no necesitan
+    invalidarse: se renuevan con cada generación.
+    """
+    scope = data.get("scope", "all")
+    if scope not in ("stock", "sales", "all"):
+        raise HTTPException(status_code=400, detail="scope debe ser 'stock', 'sales' o 'all'.")
+
+    key = None
+    if data.get("product_name"):
+        key = (data["product_name"], data.get("brand") or "Sin marca", data.get("unit") or "Sin unidad")
+
+    removed = invalidate_caches(scope, key)
+    logger.info(f"Cache invalidado ({scope}) para {key or 'todas las keys'}: {removed}")
+    return {"success": True, "scope": scope, "removed": removed, "sizes": cache_sizes()}
+
 @router.get("/predict/all-models")
-def predict_all_models(
+async def predict_all_models(
     product_name: str = Query(..., min_length=1),
     brand: str = Query("Sin marca", min_length=1),
     unit: str = Query("Sin unidad", min_length=1),
-    days: int = Query(7, ge=1, le=60)
+    days: int = Query(7, ge=1, le=60),
+    accept: Optional[str] = Header(None),
 ):
-    from datetime import datetime, timedelta
-    import pandas as pd
-    from app.services.sales_service import get_last_month_sales, get_sales_history
-    from app.services.inventory_service import get_current_stock_general
-    from math import sqrt
+    """
+    Predicción de todos los modelos. Con Accept: application/vnd.forecast.columnar+json o
+    application/x-msgpack responde en formato columnar (ver app/utils/response_format.py).
+    """
+    media_type = negotiate(accept)
+    data = await inference_executor.run(_predict_all_models, product_name, brand, unit, days)
+    if media_type == JSON:
+        return data
+
+    meta = {"success": data["success"], "days": days, "generation": data["generation"]}
+    row = {"product": product_name, "brand": brand, "unit": unit, "forecasts": data["forecasts"]}
+    return await inference_executor.run(columnar_response, meta, [row], media_type)
+
+
+def _predict_all_models(product_name: str, brand: str, unit: str, days: int):
+    with stage("predict_all_models", "total"):
+        return _predict_all_models_stages(product_name, brand, unit, days)
+
+
+def _predict_all_models_stages(product_name: str, brand: str, unit: str, days: int):
+    from app.services.sales_service import get_sales_history_bulk
 
     key = (product_name, brand, unit)
+    generation = get_generation()
+    models = generation.models
+    metrics = generation.metrics
 
     if key not in models:
         raise HTTPException(status_code=404, detail="No hay modelos entrenados para este producto.")
 
     try:
-        base_dates = [(datetime.today() + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(1, days + 1)]
+        base_dates = future_dates(days)
         forecasts = {}
 
-        for model_name, model in models[key].items():
-            try:
-                if model_name == "prophet":
-                    cap = model.history['cap'].max() if 'cap' in model.history else 100
-                    future = model.make_future_dataframe(periods=days)
-                    future['cap'] = cap
-                    future['floor'] = 0
-                    forecast = model.predict(future).tail(days)
-                    yhat = forecast['yhat'].clip(lower=0).tolist()
-
-                elif model_name == "linear":
-                    timestamps = [[(datetime.today() + timedelta(days=i)).toordinal()] for i in range(1, days + 1)]
-                    yhat = model.predict(timestamps).tolist()
-
-                elif model_name == "arima":
-                    yhat = model.predict(n_periods=days).tolist()
+        # Datos de BD comunes a todos los modelos
+        with stage("predict_all_models", "db_last_month"):
+            last_month_sales = float(cached_last_month_sales(product_name, brand, unit) or 0.0)
+        with stage("predict_all_models", "db_stock"):
+            stock = cached_stock(product_name, brand, unit)
+        history = None
 
-                else:
+        for model_name in MODEL_NAMES:
+            try:
+                # Predicción precalculada tras el entrenamiento (o calculada si no existe)
+                with stage("predict_all_models", "forecast"):
+                    model_forecast = get_model_forecast(generation, key, model_name, days)
+                if model_forecast is None:
                     continue
 
-                # Construir forecast con fechas
-                forecast_list = [
-                    {"ds": base_dates[i], "yhat": round(max(0, float(yhat[i])), 2)}
-                    for i in range(min(len(base_dates), len(yhat)))
-                ]
+                # Esta ruta etiqueta todos los modelos desde mañana y redondea a 2 decimales
+                forecast = ForecastResult(base_dates[:len(model_forecast)], model_forecast.yhat).round(2)
 
                 # Intentar usar métricas entrenadas si existen
                 model_metrics = metrics.get(key, {}).get(model_name)
 
                 if model_metrics:
-                    mae = round(model_metrics["MAE"], 2)
-                    rmse = round(model_metrics["RMSE"], 2)
-                else:
-                    sales_dict = {
-                        item["ds"]: item["y"] for item in get_sales_history(product_name, brand, unit)
+                    model_metrics = {
+                        "MAE": round(model_metrics["MAE"], 2),
+                        "RMSE": round(model_metrics["RMSE"], 2),
                     }
+                else:
+                    if history is None:
+                        with stage("predict_all_models", "db_history"):
+                            history = get_sales_history_bulk([key], base_dates[0].item(), base_dates[-1].item())[key]
+                    model_metrics = forecast.error_metrics(*history)
 
-                    errors = [
-                        float(sales_dict.get(p["ds"], 0)) - p["yhat"]
-                        for p in forecast_list if p["ds"] in sales_dict
-                    ]
-
-                    mae = round(sum(abs(e) for e in errors) / len(errors), 2) if errors else 0.0
-                    rmse = round(sqrt(sum(e**2 for e in errors) / len(errors)), 2) if errors else 0.0
-
-                total_predicted = sum(p["yhat"] for p in forecast_list)
-                last_month_sales = float(get_last_month_sales(product_name, brand, unit) or 0.0)
+                total_predicted = forecast.total
                 percent_change = round(((total_predicted - last_month_sales) / last_month_sales) * 100, 2) if last_month_sales > 0 else None
 
-                # Tendencia
-                diffs = [forecast_list[i]["yhat"] - forecast_list[i-1]["yhat"] for i in range(1, len(forecast_list))]
-                avg_diff = sum(diffs) / len(diffs) if diffs else 0
-                tendency = "creciente" if avg_diff > 0.1 else "decreciente" if avg_diff < -0.1 else "estable"
-
-                # Stock actual y alerta
-                stock = get_current_stock_general(product_name, brand, unit)
-                alert_restock = total_predicted > stock
-
                 forecasts[model_name] = {
-                    "forecast": forecast_list,
-                    "metrics": {
-                        "MAE": mae,
-                        "RMSE": rmse
-                    },
-                    "tendency": tendency,
-                    "alert_restock": alert_restock,
+                    "forecast": forecast.to_records(),
+                    "metrics": model_metrics,
+                    "tendency": forecast.tendency(),
+                    "alert_restock": total_predicted > stock,
                     "sales_last_month": last_month_sales,
                     "projected_sales": total_predicted,
                     "percent_change": percent_change,
@@ -240,6 +421,7 @@ def predict_all_models(
             "brand": brand,
             "unit": unit,
             "days": days,
+            "generation": generation.id,
             "forecasts": forecasts
         }
 
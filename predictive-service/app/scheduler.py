@@ -1,19 +1,96 @@
 # app/scheduler.py
+from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
-from app.models.prophet_models import train_models_from_db
+from app.models.prophet_models import train_models_from_db, reload_models_if_changed
+from app.models.model_store import acquire_trainer_lock
+from app.models.generation import get_generation
+from app.core.config import (
+    MODEL_RELOAD_SECONDS,
+    TRAINING_WINDOW_DAYS,
+    TRAINING_WINDOW_HOUR,
+    TRAINING_BUDGET_SECONDS,
+    TRAINING_WINDOW_WORKERS,
+    TRAINING_NICE,
+)
 import logging
 
 scheduler = BackgroundScheduler()
-models = {}  # ⬅️ Aquí se almacenan los modelos entrenados
-metrics = {}
+
+# Con uvicorn --workers N solo el proceso que tiene trainer.lock entrena; todos (incluido
+# él) leen los modelos del almacén en disco y recargan cuando cambia LATEST.
+
 def retrain_models_job():
-    global models
     try:
-        print("🔁 Iniciando reentrenamiento semanal de modelos Prophet...")
-        models = train_models_from_db()
-        print("✅ Modelos reentrenados con éxito")
+        print("🔁 Iniciando reentrenamiento de modelos Prophet...")
+        # Solo se reentrenan las series con ventas nuevas desde el último entrenamiento
+        if train_models_from_db(incremental=True) is not None:
+            print("✅ Modelos reentrenados con éxito")
     except Exception as e:
         logging.error(f"❌ Error en reentrenamiento automático: {e}")
 
-# Ejecutar todos los lunes a las 3 AM
-scheduler.add_job(retrain_models_job, 'cron', day_of_week='mon', hour=3, minute=0)
+
+def training_window_job():
+    """
+    Ventana de reentrenamiento: las series cambiadas en orden de prioridad, con un límite de
+    tiempo y menos procesos (con nice) para no quitarle CPU a las rutas. Si quedan series
+    pendientes se agenda otra ventana para la noche siguiente a la misma hora.
+    """
+    try:
+        print(f"🔁 Ventana de reentrenamiento (presupuesto {TRAINING_BUDGET_SECONDS:.0f}s, {TRAINING_WINDOW_WORKERS} procesos)...")
+        report = train_models_from_db(
+            workers=TRAINING_WINDOW_WORKERS,
+            incremental=True,
+            budget_seconds=TRAINING_BUDGET_SECONDS,
+            prioritize=True,
+            nice=TRAINING_NICE,
+        )
+    except Exception as e:
+        logging.error(f"❌ Error en reentrenamiento automático: {e}")
+        return
+
+    if report is None:
+        # Ya había un entrenamiento en curso: lo pendiente lo agenda esa ventana
+        return
+    deferred = report["schedule"]["deferred"]
+    if deferred:
+        next_run = (datetime.now() + timedelta(days=1)).replace(
+            hour=TRAINING_WINDOW_HOUR, minute=0, second=0, microsecond=0
+        )
+        scheduler.add_job(training_window_job, "date", run_date=next_run, id="training_continuation", replace_existing=True)
+        print(f"📅 {deferred} series pendientes, se continúa el {next_run:%Y-%m-%d %H:%M}")
+    else:
+        print("✅ Modelos reentrenados con éxito")
+
+
+def claim_training() -> bool:
+    """
+    Si este proceso obtiene el lock de entrenador, agenda las ventanas de reentrenamiento.
+    """
+    if not acquire_trainer_lock():
+        return False
+    if scheduler.get_job("retrain_models") is None:
+        print("🏋️ Este worker entrena los modelos")
+        # Por defecto todos los lunes a las 3 AM (TRAINING_WINDOW_DAYS / TRAINING_WINDOW_HOUR)
+        scheduler.add_job(
+            training_window_job, 'cron', day_of_week=TRAINING_WINDOW_DAYS, hour=TRAINING_WINDOW_HOUR, minute=0,
+            id="retrain_models",
+        )
+        if get_generation().version is None:
+            # Sin modelos guardados: entrenar en segundo plano para no bloquear el arranque
+            print("⚠️ No hay modelos guardados, entrenando en segundo plano...")
+            scheduler.add_job(retrain_models_job, id="initial_training")
+    return True
+
+
+def sync_models_job():
+    try:
+        version = reload_models_if_changed()
+        if version:
+            print(f"🔄 Modelos recargados (versión {version})")
+        # Si el entrenador murió, otro worker toma su lugar
+        claim_training()
+    except Exception as e:
+        logging.error(f"❌ Error recargando modelos: {e}")
+
+
+scheduler.add_job(sync_models_job, 'interval', seconds=MODEL_RELOAD_SECONDS, id="sync_models")
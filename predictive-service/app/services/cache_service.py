@@ -0,0 +1,208 @@
+import os
+import threading
+import uuid
+from datetime import date
+
+from cachetools import LRUCache, TTLCache
+
+from app.core.config import (
+    MODEL_STORE_DIR,
+    PREDICTION_CACHE_SIZE,
+    STOCK_CACHE_TTL,
+    SALES_CACHE_TTL,
+    AGGREGATE_CACHE_SIZE,
+)
+from app.utils.runtime_metrics import prediction_cache_requests
+
+# Cache de /predict en dos capas:
+#   - ModelOutputCache: la predicción del mejor modelo. Depende solo de la generación de
+#     modelos y del día (las fechas de linear/arima/baseline cuentan desde mañana), así que
+#     va en la llave y un reentrenamiento nunca sirve datos viejos.
+#   - AggregateCache: stock y ventas de la BD, con TTL corto e invalidación explícita
+#     (POST /cache/invalidate, que NestJS llama al registrar ventas y movimientos de stock:
+#     ver PredictiveCacheService en apps/backend). alert_restock se calcula siempre fuera
+#     del cache.
+#
+# Cada worker de uvicorn tiene sus caches. La invalidación se aplica en el proceso que la
+# recibe y reemplaza un archivo marcador por capa en MODEL_STORE_DIR; los demás workers
+# ven el cambio con un stat al consultar y vacían esa capa.
+
+
+class ModelOutputCache:
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE):
+        self._entries = LRUCache(maxsize=maxsize)
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def _key(self, generation_id, key, days):
+        return (generation_id, date.today().isoformat(), *key, days)
+
+    def get(self, generation_id, key, days):
+        with self._lock:
+            value = self._entries.get(self._key(generation_id, key, days))
+        prediction_cache_requests.inc(layer="model", result="hit" if value is not None else "miss")
+        return value
+
+    def set(self, generation_id, key, days, value):
+        with self._lock:
+            # Con una generación nueva las entradas anteriores ya no se van a pedir
+            if generation_id != self._generation:
+                self._entries.clear()
+                self._generation = generation_id
+            self._entries[self._key(generation_id, key, days)] = value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AggregateCache:
+    """
+    Valores derivados de la BD por key (product, brand, unit), con TTL.
+    Las llaves internas son (key, *extra) para poder invalidar todo lo de una key.
+    """
+
+    def __init__(self, scope, ttl, maxsize=AGGREGATE_CACHE_SIZE):
+        self.scope = scope
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._marker = os.path.join(MODEL_STORE_DIR, f"cache-{scope}.invalidate")
+        self._seen = self._marker_state()
+        self._version = 0  # sube con cada invalidación
+
+    def _marker_state(self):
+        try:
+            stat = os.stat(self._marker)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _sync(self):
+        # Otro worker invalidó esta capa: no se sabe qué keys, se vacía completa
+        state = self._marker_state()
+        if state != self._seen:
+            self._entries.clear()
+            self._seen = state
+            self._version += 1
+
+    def get_or_load(self, key, extra, loader):
+        entry_key = (tuple(key), *extra)
+        with self._lock:
+            self._sync()
+            if entry_key in self._entries:
+                prediction_cache_requests.inc(layer=self.scope, result="hit")
+                return self._entries[entry_key]
+            version = self._version
+        prediction_cache_requests.inc(layer=self.scope, result="miss")
+
+        value = loader()
+        with self._lock:
+            # Si se invalidó mientras se consultaba la BD, el valor puede ser anterior al cambio
+            if version == self._version:
+                self._entries[entry_key] = value
+        return value
+
+    def get_or_load_many(self, requests, loader) -> dict:
+        """
+        Igual que get_or_load para muchas (key, extra) a la vez: lo que no está en cache se
+        pide con una sola llamada a loader(faltantes), que devuelve dict (key, extra) -> valor.
+
+        Returns:
+            dict (key, extra) -> valor
+        """
+        requests = [(tuple(key), tuple(extra)) for key, extra in requests]
+        found, missing = {}, []
+        with self._lock:
+            self._sync()
+            for key, extra in requests:
+                entry_key = (key, *extra)
+                if entry_key in self._entries:
+                    found[(key, extra)] = self._entries[entry_key]
+                else:
+                    missing.append((key, extra))
+            version = self._version
+        if found:
+            prediction_cache_requests.inc(len(found), layer=self.scope, result="hit")
+        if not missing:
+            return found
+        prediction_cache_requests.inc(len(missing), layer=self.scope, result="miss")
+
+        loaded = loader(missing)
+        with self._lock:
+            if version == self._version:
+                for (key, extra), value in loaded.items():
+                    self._entries[(key, *extra)] = value
+        return {**found, **loaded}
+
+    @property
+    def version(self) -> int:
+        """
+        Sube con cada invalidación (también las de otros workers). Sirve para armar llaves de
+        resultados derivados de esta capa, como los reportes de catálogo.
+        """
+        with self._lock:
+            self._sync()
+            return self._version
+
+    def invalidate(self, key=None):
+        """
+        Borra lo de una key (o todo) en este proceso y avisa a los demás workers.
+
+        Returns:
+            int: entradas borradas en este proceso.
+        """
+        with self._lock:
+            self._version += 1
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                key = tuple(key)
+                stale = [entry_key for entry_key in list(self._entries.keys()) if entry_key[0] == key]
+                for entry_key in stale:
+                    self._entries.pop(entry_key, None)
+                removed = len(stale)
+
+            try:
+                os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+                tmp = f"{self._marker}.{uuid.uuid4().hex}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(f"{key}\n")
+                os.replace(tmp, self._marker)  # inodo nuevo: los demás workers lo detectan
+                self._seen = self._marker_state()
+            except OSError as e:
+                print(f"⚠️ No se pudo avisar la invalidación de {self.scope} a otros workers: {e}")
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+prediction_cache = ModelOutputCache()
+stock_cache = AggregateCache("stock", STOCK_CACHE_TTL)
+sales_cache = AggregateCache("sales", SALES_CACHE_TTL)
+
+AGGREGATE_CACHES = {"stock": stock_cache, "sales": sales_cache}
+
+
+def invalidate_caches(scope: str = "all", key=None) -> dict:
+    """
+    Invalida los agregados de BD: scope "stock", "sales" o "all".
+    La salida de modelos no se toca: cambia sola con cada generación.
+
+    Returns:
+        dict capa -> entradas borradas en este proceso.
+    """
+    scopes = AGGREGATE_CACHES if scope == "all" else {scope: AGGREGATE_CACHES[scope]}
+    return {name: cache.invalidate(key) for name, cache in scopes.items()}
+
+
+def cache_sizes() -> dict:
+    return {"model": len(prediction_cache), **{name: len(cache) for name, cache in AGGREGATE_CACHES.items()}}
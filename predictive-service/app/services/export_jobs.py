@@ -0,0 +1,142 @@
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.config import EXPORT_JOBS_DIR, EXPORT_JOB_TTL
+from app.core.executors import export_executor
+from app.models.generation import get_generation
+from app.services.export_service import create_catalog_excel
+
+# Reportes de catálogo generados en segundo plano. El estado y el archivo viven en
+# EXPORT_JOBS_DIR (no en memoria) para que cualquier worker de uvicorn pueda responder
+# el estado y la descarga, no solo el que recibió la petición:
+#   EXPORT_JOBS_DIR/<job_id>.json  -> estado (pending, running, done, failed) y parámetros
+#   EXPORT_JOBS_DIR/<job_id>.xlsx  -> reporte terminado
+
+
+def _status_path(job_id):
+    return os.path.join(EXPORT_JOBS_DIR, f"{job_id}.json")
+
+
+def job_file_path(job_id):
+    return os.path.join(EXPORT_JOBS_DIR, f"{job_id}.xlsx")
+
+
+def _write_status(job):
+    tmp = f"{_status_path(job['id'])}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp, _status_path(job["id"]))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_job(job_id: str):
+    """
+    Estado de un trabajo, o None si no existe (o ya se limpió).
+    """
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(_status_path(job_id), encoding="utf-8") as f:
+            job = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    # El worker que lo generaba se reinició: nadie lo va a terminar
+    if job["status"] in ("pending", "running") and not _pid_alive(job["pid"]):
+        job["status"] = "failed"
+        job["error"] = "El proceso que generaba el reporte terminó antes de completarlo"
+    return job
+
+
+def cleanup_jobs(max_age: float = EXPORT_JOB_TTL):
+    """
+    Borra los reportes terminados (done o failed) hace más de `max_age` segundos, con su
+    estado y su archivo, y los .tmp que quedaron de escrituras cortadas. Los trabajos en
+    curso no se tocan aunque lleven más que eso.
+    """
+    if not os.path.isdir(EXPORT_JOBS_DIR):
+        return
+    limit = datetime.now() - timedelta(seconds=max_age)
+    for name in os.listdir(EXPORT_JOBS_DIR):
+        path = os.path.join(EXPORT_JOBS_DIR, name)
+        try:
+            if name.endswith(".tmp"):
+                if os.path.getmtime(path) < limit.timestamp():
+                    os.remove(path)
+                continue
+            if not name.endswith(".json"):
+                continue
+
+            job = get_job(name[:-len(".json")])
+            if job is None or job["status"] not in ("done", "failed"):
+                continue
+            # Los que quedaron sin terminar porque su worker murió no tienen finished_at
+            finished = datetime.fromisoformat(job["finished_at"] or job["created_at"])
+            if finished < limit:
+                os.remove(path)
+                if os.path.exists(job_file_path(job["id"])):
+                    os.remove(job_file_path(job["id"]))
+        except (OSError, ValueError, KeyError):
+            pass
+
+
+def submit_catalog_export(keys, days: int, filters: dict) -> dict:
+    """
+    Encola un reporte de catálogo (ver create_catalog_excel) y devuelve su estado inicial.
+    Lanza ExecutorBusyError si ya hay EXPORT_MAX_PENDING reportes en cola.
+    """
+    os.makedirs(EXPORT_JOBS_DIR, exist_ok=True)
+    cleanup_jobs()
+
+    generation = get_generation()
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "pending",
+        "filters": filters,
+        "days": days,
+        "keys": len(keys),
+        "generation": generation.id,
+        "pid": os.getpid(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "finished_at": None,
+        "size": None,
+        "error": None,
+    }
+    _write_status(job)
+    try:
+        export_executor.submit(_run_job, job, keys, days, generation)
+    except Exception:
+        os.remove(_status_path(job["id"]))
+        raise
+    return job
+
+
+def _run_job(job, keys, days, generation):
+    job = {**job, "status": "running"}
+    _write_status(job)
+    started = time.perf_counter()
+    try:
+        data = create_catalog_excel(keys, days, generation).getvalue()
+        tmp = f"{job_file_path(job['id'])}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, job_file_path(job["id"]))
+        job.update(status="done", size=len(data))
+        print(f"📄 Reporte {job['id']} listo: {job['keys']} productos en {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        job.update(status="failed", error=str(e))
+        print(f"❌ Error generando el reporte {job['id']}: {e}")
+    job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    _write_status(job)
@@ -1,32 +1,104 @@
 import io
-import pandas as pd
-from fastapi.responses import StreamingResponse
-from cachetools import TTLCache
 import hashlib
 import json
+import threading
+from datetime import date
 
-# Cache para archivos Excel en memoria: max 100 items, 1 hora de TTL
-excel_cache = TTLCache(maxsize=100, ttl=3600)
+from cachetools import TTLCache
 
-def make_cache_key_excel(forecast: list[dict], alert_restock: bool) -> str:
+from app.core.config import EXPORT_BATCH_SIZE, EXPORT_CACHE_MAX_BYTES, EXPORT_CACHE_TTL, STOCK_CACHE_TTL
+from app.models.generation import get_generation
+from app.services.cache_service import stock_cache, sales_cache
+
+# Los libros se escriben en modo write-only: openpyxl vuelca cada fila a un archivo temporal
+# en vez de mantener todas las celdas en memoria, así un reporte de todo el catálogo
+# ocupa lo que pesa el .xlsx y no lo que pesan sus celdas como objetos.
+
+# Archivos generados por hash de su contenido, acotado por tamaño total en bytes
+excel_cache = TTLCache(maxsize=EXPORT_CACHE_MAX_BYTES, ttl=EXPORT_CACHE_TTL, getsizeof=len)
+# Reportes de catálogo: firma de la petición -> hash del contenido que generó
+catalog_reports = TTLCache(maxsize=1000, ttl=STOCK_CACHE_TTL)
+_cache_lock = threading.Lock()
+
+SUMMARY_HEADER = [
+    "Modelo",
+    "Tendencia",
+    "¿Reponer?",
+    "Stock Actual",
+    "Proyección Total",
+    "Variación (%)",
+    "MAE",
+    "RMSE"
+]
+
+
+def make_cache_key_excel(*parts) -> str:
     """
-    Genera una clave hash para el forecast + alerta
+    Hash del contenido de un reporte (cualquier combinación de datos serializables a JSON).
     """
-    raw_data = {
-        "forecast": forecast,
-        "alert_restock": alert_restock,
-    }
-    json_str = json.dumps(raw_data, sort_keys=True)
+    json_str = json.dumps(parts, sort_keys=True, default=str)
     return hashlib.sha256(json_str.encode()).hexdigest()
 
+
+def _cached_file(content_key):
+    with _cache_lock:
+        data = excel_cache.get(content_key)
+    return io.BytesIO(data) if data is not None else None
+
+
+def _store_file(content_key, data: bytes):
+    with _cache_lock:
+        try:
+            excel_cache[content_key] = data
+        except ValueError:
+            print(f"⚠️ Reporte de {len(data)} bytes supera EXPORT_CACHE_MAX_BYTES, no se cachea")
+
+
+def _summary_values(model_name: str, model_data: dict) -> list:
+    # Fila del resumen con los mismos redondeos que se muestran en el frontend
+    percent = model_data.get("percent_change")
+    percent = percent if percent is not None else 0
+
+    projected = model_data.get("projected_sales", 0) or 0
+    total_projection = int(round(projected))
+
+    metrics = model_data.get("metrics", {})
+    mae = metrics.get("MAE")
+    rmse = metrics.get("RMSE")
+
+    return [
+        model_name,
+        model_data.get("tendency", ""),
+        "Sí" if model_data.get("alert_restock") else "No",
+        int(model_data.get("current_quality") or 0),
+        total_projection,
+        f"{int(round(percent))}%",
+        int(round(mae)) if mae is not None else "",
+        int(round(rmse)) if rmse is not None else ""
+    ]
+
+
 def create_forecast_excel_multi(models: dict, product: str, brand: str, unit: str, days: int):
+    """
+    Excel de un producto con una hoja y gráfico por modelo, más el resumen.
+    Si ya se generó el mismo contenido se devuelve el archivo cacheado.
+    """
+    content_key = make_cache_key_excel("sku", models, product, brand, unit, days)
+    cached = _cached_file(content_key)
+    if cached is not None:
+        return cached
+
+    data = _build_sku_workbook(models, product, brand, unit, days)
+    _store_file(content_key, data)
+    return io.BytesIO(data)
+
+
+def _build_sku_workbook(models: dict, product: str, brand: str, unit: str, days: int) -> bytes:
     from openpyxl import Workbook
-    from openpyxl.utils.dataframe import dataframe_to_rows
     from openpyxl.chart import LineChart, Reference
     from openpyxl.chart.label import DataLabelList
 
-    wb = Workbook()
-    wb.remove(wb.active)  # Elimina hoja vacía inicial
+    wb = Workbook(write_only=True)
 
     # Hoja de resumen
     resumen_sheet = wb.create_sheet("Resumen General")
@@ -35,30 +107,19 @@ def create_forecast_excel_multi(models: dict, product: str, brand: str, unit: st
     resumen_sheet.append(["Unidad", unit])
     resumen_sheet.append(["Días de proyección", days])
     resumen_sheet.append([])
-
-    resumen_sheet.append([
-        "Modelo",
-        "Tendencia",
-        "¿Reponer?",
-        "Stock Actual",
-        "Proyección Total",
-        "Variación (%)",
-        "MAE",
-        "RMSE"
-    ])
+    resumen_sheet.append(SUMMARY_HEADER)
 
     # Para resumen gráfico de totales
     resumen_totales = []
 
     for model_name, model_data in models.items():
         forecast = model_data["forecast"]
-        df = pd.DataFrame(forecast)
-        df.rename(columns={"ds": "Fecha", "yhat": "Cantidad Estimada"}, inplace=True)
 
         # Crear hoja individual
         sheet = wb.create_sheet(title=model_name.capitalize())
-        for row in dataframe_to_rows(df, index=False, header=True):
-            sheet.append(row)
+        sheet.append(["Fecha", "Cantidad Estimada"])
+        for record in forecast:
+            sheet.append([record["ds"], record["yhat"]])
 
         # Insertar gráfico de línea
         chart = LineChart()
@@ -66,8 +127,8 @@ def create_forecast_excel_multi(models: dict, product: str, brand: str, unit: st
         chart.y_axis.title = "Cantidad Estimada"
         chart.x_axis.title = "Fecha"
 
-        data = Reference(sheet, min_col=2, min_row=1, max_row=len(df) + 1)
-        cats = Reference(sheet, min_col=1, min_row=2, max_row=len(df) + 1)
+        data = Reference(sheet, min_col=2, min_row=1, max_row=len(forecast) + 1)
+        cats = Reference(sheet, min_col=1, min_row=2, max_row=len(forecast) + 1)
 
         chart.add_data(data, titles_from_data=True)
         chart.set_categories(cats)
@@ -79,28 +140,9 @@ def create_forecast_excel_multi(models: dict, product: str, brand: str, unit: st
         sheet.add_chart(chart, "D10")
 
         # Totales y métricas
-        percent = model_data.get("percent_change")
-        percent = percent if percent is not None else 0
-
-        projected = model_data.get("projected_sales", 0) or 0
-        total_projection = int(round(projected))
-
-        metrics = model_data.get("metrics", {})
-        mae = metrics.get("MAE")
-        rmse = metrics.get("RMSE")
-
-        resumen_sheet.append([
-            model_name,
-            model_data.get("tendency", ""),
-            "Sí" if model_data.get("alert_restock") else "No",
-            int(model_data.get("current_quality") or 0),
-            total_projection,
-            f"{int(round(percent))}%",
-            int(round(mae)) if mae is not None else "",
-            int(round(rmse)) if rmse is not None else ""
-        ])
-
-        resumen_totales.append((model_name, total_projection))
+        row = _summary_values(model_name, model_data)
+        resumen_sheet.append(row)
+        resumen_totales.append((model_name, row[4]))
 
     # Gráfico de barras: Proyección total por modelo
     if resumen_totales:
@@ -127,5 +169,79 @@ def create_forecast_excel_multi(models: dict, product: str, brand: str, unit: st
     # Guardar archivo en memoria
     output = io.BytesIO()
     wb.save(output)
-    output.seek(0)
-    return output
+    return output.getvalue()
+
+
+def create_catalog_excel(keys, days: int, generation=None, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Excel de muchos productos (o todo el catálogo) en dos hojas: "Resumen" con una fila
+    por producto y modelo, y "Pronóstico" con los valores diarios en columnas.
+
+    Los datos se calculan por lotes de `batch_size` keys y se escriben a medida que llegan,
+    así la memoria no crece con el tamaño del catálogo. El archivo se cachea por el hash de
+    su contenido; una petición repetida con la misma generación, día y datos de BD
+    (sin invalidaciones de stock/ventas) se sirve sin recalcular nada.
+    """
+    generation = generation or get_generation()
+    keys = sorted(key for key in keys if key in generation.models)
+
+    signature = make_cache_key_excel(
+        "catalog", generation.id, date.today(), keys, days, stock_cache.version, sales_cache.version
+    )
+    with _cache_lock:
+        content_key = catalog_reports.get(signature)
+    if content_key is not None:
+        cached = _cached_file(content_key)
+        if cached is not None:
+            return cached
+
+    data, content_key = _build_catalog_workbook(keys, days, generation, batch_size)
+    _store_file(content_key, data)
+    with _cache_lock:
+        catalog_reports[signature] = content_key
+    return io.BytesIO(data)
+
+
+def _build_catalog_workbook(keys, days: int, generation, batch_size: int):
+    from openpyxl import Workbook
+    from app.services.prediction_service import get_forecast_all_models_bulk, seleccionar_mejor_modelo
+
+    hasher = hashlib.sha256()
+
+    def write(sheet, row):
+        sheet.append(row)
+        hasher.update(json.dumps(row, default=str).encode())
+        hasher.update(b"\n")
+
+    wb = Workbook(write_only=True)
+    summary = wb.create_sheet("Resumen")
+    forecast_sheet = wb.create_sheet("Pronóstico")
+
+    write(summary, ["Días de proyección", days])
+    write(summary, ["Generación de modelos", generation.id])
+    write(summary, [])
+    write(summary, ["Producto", "Marca", "Unidad", *SUMMARY_HEADER, "Seleccionado"])
+    write(forecast_sheet, ["Producto", "Marca", "Unidad", "Modelo", "Desde", *[f"Día {i}" for i in range(1, days + 1)]])
+
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        bulk = get_forecast_all_models_bulk(batch, days, generation, operation="export")
+        for key in batch:
+            data = bulk.get(key)
+            if data is None:
+                continue
+            best = seleccionar_mejor_modelo(key, generation)
+            for model_name, model_data in data["forecasts"].items():
+                write(summary, [*key, *_summary_values(model_name, model_data), "Sí" if model_name == best else "No"])
+                forecast = model_data["forecast"]
+                write(forecast_sheet, [
+                    *key,
+                    model_name,
+                    forecast[0]["ds"] if forecast else None,
+                    *[round(record["yhat"], 2) for record in forecast],
+                ])
+        del bulk
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue(), hasher.hexdigest()
@@ -0,0 +1,97 @@
+import numpy as np
+
+from app.services.forecasting import forecast_model, future_dates, ForecastResult, EPOCH_ORDINAL
+from app.models.baseline_models import evaluate_baseline
+
+# Horizonte máximo que aceptan las rutas (days <= 60)
+FORECAST_HORIZON = 60
+
+# Cada modelo fecha sus predicciones de forma distinta, y eso define cómo se recorta lo precalculado:
+#   "fixed":    Prophet predice desde el final de su historial; fechas y valores no dependen de hoy.
+#   "relative": ARIMA devuelve los próximos n periodos y se etiquetan desde mañana.
+#   "linear":   la regresión depende de la fecha; se guardan coeficientes y se evalúa al vuelo.
+#   "baseline": igual que "linear", con los parámetros del modelo base (ver baseline_models).
+
+
+def precompute_key_forecasts(key_models: dict, horizon: int = FORECAST_HORIZON) -> dict:
+    """
+    Calcula una sola vez las predicciones a `horizon` días de todos los modelos de una key.
+
+    Returns:
+        dict modelo -> entrada precalculada (ver lookup_forecast).
+    """
+    entries = {}
+    for model_name, model in key_models.items():
+        try:
+            if model_name == "linear":
+                entries[model_name] = {
+                    "mode": "linear",
+                    "coef": float(np.ravel(model.coef_)[0]),
+                    "intercept": float(model.intercept_),
+                }
+                continue
+            if model_name == "baseline":
+                entries[model_name] = {"mode": "baseline", **model.to_params()}
+                continue
+
+            result = forecast_model(model_name, model, horizon)
+            if model_name == "prophet":
+                # Las fechas de Prophet son diarias y consecutivas: basta la primera
+                entries[model_name] = {"mode": "fixed", "start": result.dates[0], "yhat": result.yhat}
+            else:
+                entries[model_name] = {"mode": "relative", "yhat": result.yhat}
+        except Exception as e:
+            print(f"⚠️ No se pudo precalcular {model_name}: {e}")
+    return entries
+
+
+def lookup_forecast(entry: dict, days: int):
+    """
+    Recorta una predicción precalculada a `days` días.
+
+    Returns:
+        ForecastResult igual al de forecast_model, o None si no alcanza el horizonte.
+    """
+    if entry["mode"] == "linear":
+        dates = future_dates(days)
+        ordinals = (dates.astype("int64") + EPOCH_ORDINAL).astype(np.float64)
+        return ForecastResult(dates, entry["coef"] * ordinals + entry["intercept"])
+
+    if entry["mode"] == "baseline":
+        dates = future_dates(days)
+        return ForecastResult(
+            dates, evaluate_baseline(entry["origin"], entry["level"], entry["slope"], entry["season"], dates)
+        )
+
+    if days > len(entry["yhat"]):
+        return None
+
+    if entry["mode"] == "fixed":
+        dates = entry["start"] + np.arange(days)
+    else:
+        dates = future_dates(days)
+
+    return ForecastResult(dates, entry["yhat"][:days])
+
+
+def get_model_forecast(generation, key, model_name: str, days: int):
+    """
+    Predicción de un modelo: primero lo precalculado tras el entrenamiento y,
+    si no existe porque el precálculo de ese modelo falló, la calcula con el modelo.
+    """
+    precomputed = generation.forecasts.get(key)
+    if precomputed is not None:
+        entry = precomputed.get(model_name)
+        if entry is not None:
+            result = lookup_forecast(entry, days)
+            if result is not None:
+                return result
+        elif model_name not in generation.metrics.get(key, {}):
+            # La key se precalculó y este modelo no se entrenó: no hace falta cargar los modelos
+            return None
+        # Si no, el precálculo de este modelo falló: se predice con el modelo
+
+    model = generation.models.get(key, {}).get(model_name)
+    if not model:
+        return None
+    return forecast_model(model_name, model, days)
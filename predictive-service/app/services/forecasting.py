@@ -0,0 +1,143 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+
+MODEL_NAMES = ["prophet", "linear", "arima", "baseline"]
+
+# date.toordinal() de 1970-01-01: datetime64[D] cuenta días desde esa fecha
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def predict_prophet_dates(model, dates, include_uncertainty: bool = False) -> pd.DataFrame:
+    """
+    Predice con Prophet solo las fechas indicadas, con el cap/floor del entrenamiento.
+
+    Sin include_uncertainty se evita el muestreo de intervalos (yhat_lower/yhat_upper),
+    que es la parte más cara de Prophet.predict.
+    """
+    future = pd.DataFrame({"ds": pd.to_datetime(dates)})
+    # Usar el cap con el que se entrenó (growth logistic)
+    future["cap"] = model.history["cap"].max() if "cap" in model.history else 100
+    future["floor"] = 0
+
+    if include_uncertainty:
+        return model.predict(future)
+
+    # Mismo cálculo de yhat que Prophet.predict, sin predict_uncertainty
+    df = model.setup_dataframe(future.copy())
+    df["trend"] = model.predict_trend(df)
+    seasonal = model.predict_seasonal_components(df)
+    yhat = df["trend"] * (1 + seasonal["multiplicative_terms"]) + seasonal["additive_terms"]
+    return pd.DataFrame({"ds": df["ds"], "yhat": yhat.values})
+
+
+def predict_prophet_horizon(model, days: int, include_uncertainty: bool = False) -> pd.DataFrame:
+    """
+    Predice los `days` días siguientes al final del historial, sin volver a predecir
+    todo el historial como hace make_future_dataframe + predict.
+    """
+    last_date = model.history["ds"].max()
+    dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=days, freq="D")
+    return predict_prophet_dates(model, dates, include_uncertainty)
+
+
+def future_dates(days: int) -> np.ndarray:
+    """
+    Fechas de mañana en adelante como datetime64[D].
+    """
+    return np.datetime64(date.today(), "D") + np.arange(1, days + 1)
+
+
+class ForecastResult:
+    """
+    Predicción de un modelo guardada como arrays de NumPy.
+
+    `dates` es datetime64[D] y `yhat` float64 ya recortado a >= 0. Totales, tendencia
+    y métricas se calculan vectorizados; to_records() arma la lista de
+    {"ds": "YYYY-MM-DD", "yhat": float} que devuelven las rutas.
+    """
+
+    __slots__ = ("dates", "yhat")
+
+    def __init__(self, dates, yhat):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.yhat = np.maximum(np.asarray(yhat, dtype=np.float64), 0)
+
+    def __len__(self):
+        return len(self.yhat)
+
+    def head(self, days: int) -> "ForecastResult":
+        return ForecastResult(self.dates[:days], self.yhat[:days])
+
+    def round(self, decimals: int = 2) -> "ForecastResult":
+        return ForecastResult(self.dates, np.round(self.yhat, decimals))
+
+    @property
+    def total(self) -> float:
+        return float(self.yhat.sum())
+
+    @property
+    def slope(self) -> float:
+        # Promedio de las diferencias día a día
+        if len(self.yhat) < 2:
+            return 0.0
+        return float((self.yhat[-1] - self.yhat[0]) / (len(self.yhat) - 1))
+
+    def tendency(self) -> str:
+        if len(self.yhat) < 2:
+            return "estable"
+        slope = self.slope
+        if slope > 0.1:
+            return "creciente"
+        elif slope < -0.1:
+            return "decreciente"
+        return "estable"
+
+    def error_metrics(self, history_dates, history_values) -> dict:
+        """
+        MAE y RMSE contra las ventas reales de las fechas que coinciden con la predicción.
+        """
+        history_dates = np.asarray(history_dates, dtype="datetime64[D]")
+        if len(history_dates) == 0:
+            return {"MAE": 0.0, "RMSE": 0.0}
+        history_values = np.asarray(history_values, dtype=np.float64)
+
+        mask = np.isin(self.dates, history_dates)
+        if not mask.any():
+            return {"MAE": 0.0, "RMSE": 0.0}
+
+        # history_dates viene ordenado por fecha (GROUP BY ... ORDER BY ds)
+        real = history_values[np.searchsorted(history_dates, self.dates[mask])]
+        errors = real - self.yhat[mask]
+        mae = np.abs(errors).mean()
+        rmse = np.sqrt((errors ** 2).mean())
+        return {"MAE": round(float(mae), 2), "RMSE": round(float(rmse), 2)}
+
+    def to_records(self) -> list[dict]:
+        dates = np.datetime_as_string(self.dates, unit="D").tolist()
+        return [{"ds": ds, "yhat": value} for ds, value in zip(dates, self.yhat.tolist())]
+
+
+def forecast_model(model_name: str, model, days: int) -> ForecastResult:
+    """
+    Predice `days` días con un modelo entrenado.
+    """
+    if model_name == "prophet":
+        df = predict_prophet_horizon(model, days)
+        return ForecastResult(df["ds"].values, df["yhat"].values)
+
+    elif model_name == "linear":
+        dates = future_dates(days)
+        ordinals = dates.astype("int64") + EPOCH_ORDINAL
+        yhat = model.predict(ordinals.reshape(-1, 1))
+        return ForecastResult(dates, yhat)
+
+    elif model_name == "arima":
+        yhat = model.predict(n_periods=days)
+        return ForecastResult(future_dates(days), np.asarray(yhat))
+
+    elif model_name == "baseline":
+        dates = future_dates(days)
+        return ForecastResult(dates, model.predict(dates))
+
+    raise ValueError(f"Tipo de modelo desconocido: {model_name}")
@@ -1,21 +1,19 @@
-from app.db.connection import get_connection
+from app.db.connection import db_cursor
+from app.services.sales_service import KEYS_CTE, keys_to_arrays
 
 def get_current_stock_general(product_name: str, brand: str, unit: str) -> float:
-    conn = get_connection()
-    cursor = conn.cursor()
     print("🔍 Buscando stock para:", product_name, brand, unit)
-    cursor.execute("""
-        SELECT current_quantity
-        FROM products
-        WHERE name = %s 
-          AND "brandId" = (SELECT id FROM brands WHERE name = %s)
-          AND "unitOfMeasureId" = (SELECT id FROM units_of_measure WHERE name = %s)
-        LIMIT 1
-    """, (product_name, brand, unit))
-    result = cursor.fetchone()
+    with db_cursor() as cursor:
+        cursor.execute("""
+            SELECT current_quantity
+            FROM products
+            WHERE name = %s 
+              AND "brandId" = (SELECT id FROM brands WHERE name = %s)
+              AND "unitOfMeasureId" = (SELECT id FROM units_of_measure WHERE name = %s)
+            LIMIT 1
+        """, (product_name, brand, unit))
+        result = cursor.fetchone()
     print("🧪 Resultado crudo de DB:", result, " | Tipo:", type(result))
-    cursor.close()
-    conn.close()
     
     if result is None:
         print("⚠️ No se encontró el producto, devolviendo 0")
@@ -31,3 +29,30 @@ def get_current_stock_general(product_name: str, brand: str, unit: str) -> float
     print("⚠️ Formato inesperado, devolviendo 0")
     # Caso por defecto
     return 0
+
+def get_current_stock_bulk(keys) -> dict:
+    """
+    Stock actual de muchas keys (product, brand, unit) en una sola consulta.
+    Los productos que no existen devuelven 0, igual que get_current_stock_general.
+    """
+    keys = list(keys)
+    stock = {key: 0 for key in keys}
+    if not keys:
+        return stock
+
+    query = KEYS_CTE + """
+        SELECT DISTINCT ON (k.product_name, k.brand, k.unit)
+            k.product_name, k.brand, k.unit, p.current_quantity
+        FROM k
+        JOIN products p ON p.name = k.product_name
+        JOIN brands b ON b.id = p."brandId" AND b.name = k.brand
+        JOIN units_of_measure u ON u.id = p."unitOfMeasureId" AND u.name = k.unit
+    """
+
+    with db_cursor() as cursor:
+        cursor.execute(query, keys_to_arrays(keys))
+        rows = cursor.fetchall()
+
+    for row in rows:
+        stock[(row["product_name"], row["brand"], row["unit"])] = row["current_quantity"] or 0
+    return stock
@@ -1,10 +1,34 @@
 import os
+import json
+import queue
+import random
+import threading
 import requests
 import logging
+from datetime import datetime
 from decimal import Decimal
+from requests.adapters import HTTPAdapter
+from app.core.config import (
+    NEST_API_URL,
+    NEST_API_BATCH_URL,
+    NEST_QUEUE_MAX,
+    NEST_BATCH_SIZE,
+    NEST_FLUSH_INTERVAL,
+    NEST_MAX_RETRIES,
+    NEST_BACKOFF_BASE,
+    NEST_TIMEOUT,
+    NEST_DEAD_LETTER_PATH,
+)
 
 logger = logging.getLogger("nest_client")
 
+# Campos que acepta CreatePredictionDto en NestJS (usa forbidNonWhitelisted,
+# así que cualquier campo extra hace fallar el guardado con 400)
+NEST_FIELDS = (
+    "product", "brand", "unit", "days", "tendency", "alert_restock", "forecast",
+    "metrics", "sales_last_month", "projected_sales", "percent_change", "model_type",
+)
+
 # 🔁 Función para convertir Decimals a floats
 def convert_decimals(obj):
     if isinstance(obj, list):
@@ -16,26 +40,288 @@ def convert_decimals(obj):
     else:
         return obj
 
+def to_nest_payload(prediction_data):
+    # ✅ Convertir Decimals y quitar campos que NestJS rechaza
+    return convert_decimals({key: prediction_data[key] for key in NEST_FIELDS if key in prediction_data})
+
 def guardar_prediccion_en_nest(prediction_data, api_key=None):
+    """
+    Guarda una predicción de forma síncrona. Las rutas usan prediction_outbox para no esperar a NestJS.
+    """
     print("Intentando guardar predicción en NestJS...")
-    url = os.getenv("NEST_API_URL")
+    url = NEST_API_URL
     print(f"URL destino: {url}")
 
     headers = {"Content-Type": "application/json"}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
 
-    # ✅ Convertir Decimals antes de enviar
-    safe_data = convert_decimals(prediction_data)
+    safe_data = to_nest_payload(prediction_data)
 
     try:
-        response = requests.post(url, json=safe_data, headers=headers)
+        response = requests.post(url, json=safe_data, headers=headers, timeout=NEST_TIMEOUT)
         if response.status_code in (200, 201):
             logger.info("✅ Predicción guardada exitosamente en NestJS.")
         else:
             logger.error(f"❌ Error al guardar: {response.status_code} {response.text}")
     except requests.exceptions.Timeout:
         print("❌ Timeout al guardar predicción en NestJS.")
-    
+
     except Exception as e:
         logger.exception(f"❌ Excepción al guardar predicción: {e}")
+
+
+class PredictionOutbox:
+    """
+    Cola en segundo plano para guardar predicciones en NestJS sin bloquear /predict.
+
+    Un hilo agrupa las predicciones en lotes y las envía por una sesión HTTP con
+    conexiones reutilizables. Los errores transitorios (red, 5xx, 429) se reintentan
+    con backoff exponencial. Lo que no se pudo guardar, o no cupo en la cola, se
+    escribe en un archivo JSONL (dead letter) que el hilo reenvía al arrancar.
+    """
+
+    def __init__(
+        self,
+        url,
+        batch_url=None,
+        max_queue=1000,
+        batch_size=20,
+        flush_interval=2.0,
+        max_retries=4,
+        backoff_base=0.5,
+        timeout=5.0,
+        dead_letter_path="logs/nest_dead_letter.jsonl",
+        api_key=None,
+    ):
+        self.url = url
+        self.batch_url = batch_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.dead_letter_path = dead_letter_path
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._dead_letter_lock = threading.Lock()
+        self._stats_lock = threading.Lock()  # lo actualizan las rutas y el hilo de envío
+
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._session.headers["Content-Type"] = "application/json"
+        if api_key:
+            self._session.headers["Authorization"] = f"Bearer {api_key}"
+
+        self._stats = {"enqueued": 0, "sent": 0, "retried": 0, "dead_lettered": 0, "dropped": 0, "replayed": 0}
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="nest-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """
+        Envía lo que quede en la cola (hasta `timeout` segundos) y detiene el hilo.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # Si el hilo no alcanzó a vaciar la cola, no perder las predicciones
+        self._dead_letter(self._drain(), "apagado del servicio")
+        self._session.close()
+
+    def enqueue(self, prediction_data) -> bool:
+        """
+        Encola una predicción. Nunca bloquea: si la cola está llena va al dead letter.
+        """
+        if not self.url and not self.batch_url:
+            logger.debug("NEST_API_URL no configurada, no se guarda la predicción")
+            return False
+
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+        payload = to_nest_payload(prediction_data)
+        try:
+            self._queue.put_nowait(payload)
+            self._count("enqueued")
+            return True
+        except queue.Full:
+            self._count("dropped")
+            logger.warning("⚠️ Cola de NestJS llena, la predicción va al dead letter")
+            self._dead_letter([payload], "cola llena")
+            return False
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _drain(self, limit=None):
+        items = []
+        while limit is None or len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        try:
+            self.replay_dead_letter()
+        except Exception as e:
+            logger.exception(f"❌ Error reenviando el dead letter a NestJS: {e}")
+
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first] + self._drain(self.batch_size - 1)
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                logger.exception(f"❌ Error inesperado enviando lote a NestJS: {e}")
+                self._dead_letter(batch, str(e))
+
+    def _send_batch(self, batch):
+        if self.batch_url:
+            ok, error = self._post_with_retries(self.batch_url, batch)
+            if ok:
+                self._count("sent", len(batch))
+            else:
+                self._dead_letter(batch, error)
+            return
+
+        # Sin endpoint de lotes: una petición por predicción, reutilizando la conexión
+        for item in batch:
+            ok, error = self._post_with_retries(self.url, item)
+            if ok:
+                self._count("sent")
+            else:
+                self._dead_letter([item], error)
+
+    def _post_with_retries(self, url, payload):
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retried")
+                delay = self.backoff_base * (2 ** (attempt - 1))
+                # Jitter para no reintentar todos a la vez; se corta si el servicio se está apagando
+                if self._stop.wait(delay * random.uniform(0.5, 1.5)) and attempt > 1:
+                    break
+            try:
+                response = self._session.post(url, data=json.dumps(payload), timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+                continue
+
+            if response.status_code in (200, 201):
+                return True, None
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+            # Los 4xx (salvo 429) no se arreglan reintentando
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                break
+
+        logger.error(f"❌ No se pudo guardar en NestJS: {error}")
+        return False, error
+
+    def replay_dead_letter(self) -> int:
+        """
+        Reenvía lo guardado en el dead letter (p. ej. mientras NestJS estuvo caído). Lo que
+        vuelve a fallar se escribe de nuevo en el archivo. Los rechazos 4xx (salvo 429) no
+        se reenvían: fallarían igual.
+
+        El archivo se mueve primero a `<dead_letter_path>.replay`; si el proceso se corta a
+        mitad del reenvío, ese archivo se retoma en el siguiente arranque.
+
+        Returns:
+            int: predicciones reenviadas.
+        """
+        if not self.url and not self.batch_url:
+            return 0
+
+        replay_path = f"{self.dead_letter_path}.replay"
+        permanent = []
+        with self._dead_letter_lock:
+            try:
+                with open(self.dead_letter_path, encoding="utf-8") as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                lines = []
+            if lines:
+                retry = []
+                for line in lines:
+                    try:
+                        error = json.loads(line).get("error") or ""
+                    except ValueError:
+                        permanent.append(line)  # línea cortada: se deja para revisarla a mano
+                        continue
+                    is_permanent = error.startswith("HTTP 4") and not error.startswith("HTTP 429")
+                    (permanent if is_permanent else retry).append(line)
+                with open(replay_path, "a", encoding="utf-8") as f:
+                    f.writelines(retry)
+                with open(self.dead_letter_path, "w", encoding="utf-8") as f:
+                    f.writelines(permanent)
+
+        try:
+            with open(replay_path, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return 0
+
+        items = [entry["payload"] for entry in entries]
+        for start in range(0, len(items), self.batch_size):
+            if self._stop.is_set():
+                # Se está apagando: lo que falta vuelve al dead letter para el próximo arranque
+                self._dead_letter(items[start:], "apagado del servicio")
+                break
+            self._send_batch(items[start:start + self.batch_size])
+        os.remove(replay_path)
+
+        self._count("replayed", len(items))
+        logger.info(f"📤 Reenviadas {len(items)} predicciones del dead letter")
+        return len(items)
+
+    def _dead_letter(self, items, error):
+        if not items:
+            return
+        self._count("dead_lettered", len(items))
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with self._dead_letter_lock, open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps({
+                        "failed_at": datetime.now().isoformat(timespec="seconds"),
+                        "error": error,
+                        "payload": item,
+                    }, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"❌ No se pudo escribir el dead letter: {e}")
+
+
+prediction_outbox = PredictionOutbox(
+    NEST_API_URL,
+    batch_url=NEST_API_BATCH_URL,
+    max_queue=NEST_QUEUE_MAX,
+    batch_size=NEST_BATCH_SIZE,
+    flush_interval=NEST_FLUSH_INTERVAL,
+    max_retries=NEST_MAX_RETRIES,
+    backoff_base=NEST_BACKOFF_BASE,
+    timeout=NEST_TIMEOUT,
+    dead_letter_path=NEST_DEAD_LETTER_PATH,
+)
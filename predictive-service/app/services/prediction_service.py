@@ -1,292 +1,392 @@
-from app.models.prophet_models import models, metrics
-from app.services.inventory_service import get_current_stock_general
-from cachetools import TTLCache
-from datetime import datetime, timedelta
-import hashlib
-from .nest_client import guardar_prediccion_en_nest
-from .sales_service import get_last_month_sales
-from math import sqrt
-from .sales_service import get_sales_history
-import pandas as pd
-
-
-# 1. Cache configurado con un TTL de 1 hora
-prediction_cache = TTLCache(maxsize=1000, ttl=3600)  # 1000 entradas, 1 hora de duración
-
-def make_cache_key(product_name: str, brand: str, unit: str, days: int) -> str:
-    """
-    Crea una llave hash única para cada combinación de parámetros.
-    """
-    raw_key = f"{product_name}:{brand}:{unit}:{days}"
-    return hashlib.sha256(raw_key.encode()).hexdigest()
+from app.models.generation import get_generation
+from app.services.inventory_service import get_current_stock_general, get_current_stock_bulk
+from app.services.forecasting import MODEL_NAMES
+from app.services.forecast_store import get_model_forecast
+import numpy as np
+from .nest_client import prediction_outbox
+from .sales_service import get_last_month_sales, get_last_month_sales_bulk, last_month_range
+from .sales_service import get_sales_history_bulk
+from .cache_service import prediction_cache, stock_cache, sales_cache
+from app.utils.runtime_metrics import stage
+
+
+# Stock y ventas de una key pasando por los caches de agregados (ver cache_service)
+def cached_stock(product_name: str, brand: str, unit: str):
+    key = (product_name, brand, unit)
+    return stock_cache.get_or_load(key, (), lambda: get_current_stock_general(*key))
+
+def cached_last_month_sales(product_name: str, brand: str, unit: str):
+    key = (product_name, brand, unit)
+    # El mes va en la llave: al cambiar de mes no se sirve el total del anterior
+    month = last_month_range()[0].strftime("%Y-%m")
+    return sales_cache.get_or_load(key, ("last_month", month), lambda: get_last_month_sales(*key))
+
+# Igual para muchas keys: lo que falta en cache se trae con una sola consulta por capa
+def cached_stock_bulk(keys) -> dict:
+    def load(missing):
+        stock = get_current_stock_bulk([key for key, _ in missing])
+        return {(key, extra): stock[key] for key, extra in missing}
+
+    values = stock_cache.get_or_load_many([(key, ()) for key in keys], load)
+    return {key: value for (key, _), value in values.items()}
 
-def seleccionar_mejor_modelo(key):
-    modelos = metrics.get(key)
+def cached_last_month_sales_bulk(keys) -> dict:
+    month = last_month_range()[0].strftime("%Y-%m")
+
+    def load(missing):
+        totals = get_last_month_sales_bulk([key for key, _ in missing])
+        return {(key, extra): totals.get(key, 0) for key, extra in missing}
+
+    values = sales_cache.get_or_load_many([(key, ("last_month", month)) for key in keys], load)
+    return {key: value for (key, _), value in values.items()}
+
+def seleccionar_mejor_modelo(key, generation=None):
+    generation = generation or get_generation()
+    modelos = generation.metrics.get(key)
     if not modelos:
         return "prophet"
     return min(modelos.items(), key=lambda x: x[1]["RMSE"])[0]
 
 
-def get_forecast(product_name: str, brand: str, unit: str, days: int):
-    cache_key = make_cache_key(product_name, brand, unit, days)
-
-    # 2. Verificar si la predicción ya está en caché
-    if cache_key in prediction_cache:
-        return prediction_cache[cache_key]
+def get_model_output(product_name: str, brand: str, unit: str, days: int, generation=None):
+    """
+    Predicción del mejor modelo de una key, cacheada por generación y día.
 
-    # 3. Obtener modelo
+    Returns:
+        (ForecastResult, modelo) o (None, None) si no hay modelo.
+    """
+    generation = generation or get_generation()
     key = (product_name, brand, unit)
-    modelo_seleccionado = seleccionar_mejor_modelo(key)
-    model = models.get(key, {}).get(modelo_seleccionado)
 
-    if not model:
-        return None, None
-    # Intentar recuperar cap del historial del modelo (si fue entrenado con logistic)
-    if hasattr(model, "history") and "cap" in model.history:
-        cap_value = model.history["cap"].max()
-    else:
-        cap_value = 100  # fallback si no existe 'cap'
-        print(f"⚠️ Cap no encontrado para {key}, usando fallback = {cap_value}")
-    
-    # Generar predicción según modelo
-    if modelo_seleccionado == "prophet":
-        cap_value = model.history['cap'].max() if "cap" in model.history else 100
-        future = model.make_future_dataframe(periods=days)
-        future['cap'] = cap_value
-        future['floor'] = 0
-        forecast = model.predict(future)
-        result_df = forecast[['ds', 'yhat']].tail(days)
-
-    elif modelo_seleccionado == "linear":
-        last_date = datetime.today()
-        dates = [last_date + timedelta(days=i) for i in range(1, days + 1)]
-        timestamps = [[d.toordinal()] for d in dates]
-        yhat = model.predict(timestamps)
-        result_df = pd.DataFrame({
-            "ds": [d.strftime("%Y-%m-%d") for d in dates],
-            "yhat": yhat
-        })
-
-    elif modelo_seleccionado == "arima":
-        forecast = model.predict(n_periods=days)
-        last_date = datetime.today()
-        dates = [last_date + timedelta(days=i) for i in range(1, days + 1)]
-        result_df = pd.DataFrame({
-            "ds": [d.strftime("%Y-%m-%d") for d in dates],
-            "yhat": forecast
-        })
+    cached = prediction_cache.get(generation.id, key, days)
+    if cached is not None:
+        return cached
 
-    else:
-        print(f"⚠️ Tipo de modelo desconocido: {modelo_seleccionado}")
+    modelo_seleccionado = seleccionar_mejor_modelo(key, generation)
+    if key not in generation.models:
         return None, None
 
+    try:
+        with stage("predict", "forecast"):
+            result = get_model_forecast(generation, key, modelo_seleccionado, days)
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return None, None
+    if result is None:
+        return None, None
 
-    # ⚠️ Conversión de Timestamp → string (para evitar error de serialización)
-    # Después del bloque de predicción según modelo...
-
-    if modelo_seleccionado == "prophet":
-        result_df = forecast[["ds", "yhat"]].tail(days)
-        result_df["yhat"] = result_df["yhat"].apply(lambda x: max(0, x))
-        result_df["ds"] = result_df["ds"].dt.strftime("%Y-%m-%d")
-        result = result_df.to_dict(orient="records")
-    else:
-        result_df["yhat"] = result_df["yhat"].apply(lambda x: max(0, x))
-        result = result_df.to_dict(orient="records")
+    prediction_cache.set(generation.id, key, days, (result, modelo_seleccionado))
+    return result, modelo_seleccionado
 
 
-    current_stock = get_current_stock_general(product_name, brand, unit)
-    total_predicted = sum(item["yhat"] for item in result)
-    alert_restock = total_predicted > current_stock
+def get_forecast(product_name: str, brand: str, unit: str, days: int, generation=None):
+    result, modelo_seleccionado = get_model_output(product_name, brand, unit, days, generation)
+    if result is None:
+        return None, None, None
 
-    # 5. Guardar en caché y retornar
-    prediction_cache[cache_key] = (result, alert_restock, modelo_seleccionado)
+    # La alerta depende del stock actual: se calcula siempre, nunca se cachea
+    with stage("predict", "db_stock"):
+        current_stock = cached_stock(product_name, brand, unit)
+    alert_restock = result.total > current_stock
     return result, alert_restock, modelo_seleccionado
 
 
    
-def get_forecast_all_models(product_name: str, brand: str, unit: str, days: int):
-    from app.models.prophet_models import models
-    from datetime import datetime, timedelta
-    import pandas as pd
+def forecast_all_models(key, days, generation):
+    """
+    Predicción de cada modelo entrenado de una key: {modelo: ForecastResult}.
+    """
+    forecasts = {}
+    for modelo in MODEL_NAMES:
+        try:
+            forecast_data = get_model_forecast(generation, key, modelo, days)
+            if forecast_data is not None:
+                forecasts[modelo] = forecast_data
+        except Exception as e:
+            print(f"❌ Error en modelo {modelo}: {e}")
+    return forecasts
 
-    key = (product_name, brand, unit)
-    result_all = {}
-    modelos = ["prophet", "linear", "arima"]
+def summarize_model_forecast(forecast_data, current_stock, last_month_sales, history):
+    """
+    Indicadores de una predicción (tendencia, métricas, variación y alerta de stock)
+    a partir de datos de BD ya consultados. `history` es (fechas, cantidades) en arrays.
+    """
+    try:
+        last_month_sales_float = float(last_month_sales)
+    except (TypeError, ValueError):
+        last_month_sales_float = 0.0
 
-    for modelo in modelos:
-        model = models.get(key, {}).get(modelo)
-        if not model:
-            continue
+    tendency = forecast_data.tendency()
+    metrics_calc = forecast_data.error_metrics(*history)
 
-        try:
-            if modelo == "prophet":
-                future = model.make_future_dataframe(periods=days)
-                future["cap"] = 100
-                future["floor"] = 0
-                forecast = model.predict(future)
-                df = forecast[["ds", "yhat"]].tail(days)
-                df["yhat"] = df["yhat"].apply(lambda x: max(0, x))
-                df["ds"] = df["ds"].dt.strftime("%Y-%m-%d")
-
-            elif modelo == "linear":
-                last_date = datetime.today()
-                dates = [last_date + timedelta(days=i) for i in range(1, days + 1)]
-                timestamps = [[d.toordinal()] for d in dates]
-                yhat = model.predict(timestamps)
-                df = pd.DataFrame({
-                    "ds": [d.strftime("%Y-%m-%d") for d in dates],
-                    "yhat": yhat
-                })
-                df["yhat"] = df["yhat"].apply(lambda x: max(0, x))
-
-            elif modelo == "arima":
-                forecast = model.predict(n_periods=days)
-                last_date = datetime.today()
-                dates = [last_date + timedelta(days=i) for i in range(1, days + 1)]
-                df = pd.DataFrame({
-                    "ds": [d.strftime("%Y-%m-%d") for d in dates],
-                    "yhat": forecast
-                })
-                df["yhat"] = df["yhat"].apply(lambda x: max(0, x))
-
-            forecast_data = df.to_dict(orient="records")
-
-            tendency = calcular_tendencia(forecast_data)
-            metrics_calc = calcular_metricas_reales(product_name, brand, unit, forecast_data)
-
-            from .sales_service import get_last_month_sales
-            last_month_sales = get_last_month_sales(product_name, brand, unit)
-            try:
-                last_month_sales_float = float(last_month_sales)
-            except (TypeError, ValueError):
-                last_month_sales_float = 0.0
-
-            projected_sales = sum(item["yhat"] for item in forecast_data)
-
-            if last_month_sales_float > 0:
-                percent_change = round(((projected_sales - last_month_sales_float) / last_month_sales_float) * 100, 2)
-            else:
-                percent_change = None
-
-            from app.services.inventory_service import get_current_stock_general
-            current_stock = get_current_stock_general(product_name, brand, unit)
-            alert_restock = projected_sales > current_stock
-
-            result_all[modelo] = {
-                "forecast": forecast_data,
-                "metrics": metrics_calc,
-                "tendency": tendency,
-                "alert_restock": alert_restock,
-                "sales_last_month": last_month_sales_float,
-                "projected_sales": projected_sales,
-                "percent_change": percent_change,
-                "current_quality": current_stock,
+    projected_sales = forecast_data.total
+
+    if last_month_sales_float > 0:
+        percent_change = round(((projected_sales - last_month_sales_float) / last_month_sales_float) * 100, 2)
+    else:
+        percent_change = None
 
+    alert_restock = projected_sales > current_stock
+
+    return {
+        "forecast": forecast_data.to_records(),
+        "metrics": metrics_calc,
+        "tendency": tendency,
+        "alert_restock": alert_restock,
+        "sales_last_month": last_month_sales_float,
+        "projected_sales": projected_sales,
+        "percent_change": percent_change,
+        "current_quality": current_stock,
+
+    }
+
+def get_forecast_all_models_bulk(keys, days: int, generation=None, operation: str = "all_models") -> dict:
+    """
+    Igual que get_forecast_all_models pero para muchas keys: stock, ventas del mes pasado
+    e historial se traen con tres consultas en total en lugar de varias por key y modelo.
+
+    `operation` solo etiqueta los tiempos por etapa (all_models, compare).
+
+    Returns:
+        dict key -> {"current_quality": stock, "forecasts": {...}}
+    """
+    generation = generation or get_generation()
+    keys = [key for key in keys if key in generation.models]
+    if not keys:
+        return {}
+
+    with stage(operation, "forecast"):
+        forecasts = {key: forecast_all_models(key, days, generation) for key in keys}
+
+    # Del historial solo interesan las fechas que cubren las predicciones
+    all_dates = [data.dates for key_forecasts in forecasts.values() for data in key_forecasts.values() if len(data)]
+    with stage(operation, "db_history"):
+        if all_dates:
+            all_dates = np.concatenate(all_dates)
+            history = get_sales_history_bulk(keys, all_dates.min().item(), all_dates.max().item())
+        else:
+            history = {}
+    no_history = (np.array([], dtype="datetime64[D]"), np.array([]))
+    with stage(operation, "db_stock"):
+        stock = get_current_stock_bulk(keys)
+    with stage(operation, "db_last_month"):
+        last_month = get_last_month_sales_bulk(keys)
+
+    with stage(operation, "summarize"):
+        return {
+            key: {
+                "current_quality": stock.get(key, 0),
+                "forecasts": {
+                    modelo: summarize_model_forecast(
+                        forecast_data, stock.get(key, 0), last_month.get(key, 0), history.get(key, no_history)
+                    )
+                    for modelo, forecast_data in forecasts[key].items()
+                },
             }
+            for key in keys
+        }
 
-        except Exception as e:
-            print(f"❌ Error en modelo {modelo}: {e}")
+def get_forecast_all_models(product_name: str, brand: str, unit: str, days: int, generation=None):
+    generation = generation or get_generation()
+    key = (product_name, brand, unit)
+    bulk = get_forecast_all_models_bulk([key], days, generation)
 
     return {
         "product": product_name,
         "brand": brand,
         "unit": unit,
         "days": days,
-        "forecasts": result_all
+        "generation": generation.id,
+        "forecasts": bulk[key]["forecasts"] if key in bulk else {}
     }
 
 def calcular_tendencia(result):
     """
-    Ejemplo simple para calcular tendencia basada en la pendiente de los últimos días.
+    Tendencia según la pendiente promedio de la predicción (ForecastResult).
     """
-    if not result or len(result) < 2:
-        return "estable"
-
-    diffs = [result[i]["yhat"] - result[i-1]["yhat"] for i in range(1, len(result))]
-    avg_diff = sum(diffs) / len(diffs)
+    return result.tendency()
 
-    if avg_diff > 0.1:
-        return "creciente"
-    elif avg_diff < -0.1:
-        return "decreciente"
-    else:
-        return "estable"
-
-def calcular_metricas_reales(product_name, brand, unit, forecast):
-    sales_history = get_sales_history(product_name, brand, unit)
-    sales_dict = {item["ds"]: item["y"] for item in sales_history}
-
-    errors = []
-    for pred in forecast:
-        real = sales_dict.get(pred["ds"])
-        if real is None:
-            continue
-        # Convertimos 'real' de Decimal a float para evitar error al restar con float
-        error = float(real) - pred["yhat"]
-        errors.append(error)
-
-    if not errors:
+def calcular_metricas_reales(product_name, brand, unit, forecast, model_type=None, generation_id=None):
+    key = (product_name, brand, unit)
+    if not len(forecast):
         return {"MAE": 0.0, "RMSE": 0.0}
+    start, end = forecast.dates.min().item(), forecast.dates.max().item()
 
-    mae = sum(abs(e) for e in errors) / len(errors)
-    rmse = sqrt(sum(e**2 for e in errors) / len(errors))
-
-    return {"MAE": round(mae, 2), "RMSE": round(rmse, 2)}
+    def compute():
+        with stage("predict", "db_history"):
+            history = get_sales_history_bulk([key], start, end)
+        with stage("predict", "metrics"):
+            return forecast.error_metrics(*history[key])
 
-def generar_prediccion(product_name, brand, unit, days):
-    # Obtener la predicción real
-    result, alert_restock, model_type = get_forecast(product_name, brand, unit, days)
-    if result is None:
-        print("No hay modelo para el producto especificado.")
-        return None
+    if generation_id is None:
+        return compute()
+    # Dependen de las ventas y de la predicción: generación, modelo y fechas van en la llave
+    return sales_cache.get_or_load(key, ("metrics", generation_id, model_type, start, end), compute)
 
-    # Calcular tendencia
-    tendency = calcular_tendencia(result)
+def calcular_metricas_reales_bulk(entries, generation_id) -> list:
+    """
+    calcular_metricas_reales para muchas (key, modelo, ForecastResult): comparte el cache de
+    /predict y el historial que falta se consulta una sola vez para todas las keys.
 
-    # Calcular métricas
-    metrics = calcular_metricas_reales(product_name, brand, unit, result)
+    Returns:
+        lista de {"MAE", "RMSE"} en el mismo orden que entries.
+    """
+    requests = {}
+    for key, model_type, forecast in entries:
+        if len(forecast):
+            extra = ("metrics", generation_id, model_type, forecast.dates.min().item(), forecast.dates.max().item())
+            requests[(key, extra)] = forecast
+
+    def load(missing):
+        history = get_sales_history_bulk(
+            list({key for key, _ in missing}),
+            min(extra[3] for _, extra in missing),
+            max(extra[4] for _, extra in missing),
+        )
+        # Con el rango más amplio no pasa nada: error_metrics solo usa las fechas de la predicción
+        return {(key, extra): requests[(key, extra)].error_metrics(*history[key]) for key, extra in missing}
+
+    values = sales_cache.get_or_load_many(requests.keys(), load)
+
+    results = []
+    for key, model_type, forecast in entries:
+        if not len(forecast):
+            results.append({"MAE": 0.0, "RMSE": 0.0})
+            continue
+        extra = ("metrics", generation_id, model_type, forecast.dates.min().item(), forecast.dates.max().item())
+        results.append(values[(key, extra)])
+    return results
 
-    # Ventas del mes pasado
-    last_month_sales = get_last_month_sales(product_name, brand, unit)
+def armar_prediccion(product_name, brand, unit, days, result, model_type, metrics, last_month_sales, current_stock):
+    """
+    Respuesta de /predict (y de cada elemento de /predict/batch) con los datos ya consultados.
+    """
     try:
         last_month_sales_float = float(last_month_sales)
     except (TypeError, ValueError):
         last_month_sales_float = 0.0
-    
-    # Proyección total de ventas en los próximos días
-    projected_sales = sum(item["yhat"] for item in result)  
-
-    current_stock = get_current_stock_general(product_name, brand, unit)
 
+    # Proyección total de ventas en los próximos días
+    projected_sales = result.total
 
     # Calcular variación porcentual (manejar caso 0)
-    if last_month_sales > 0:
-        
-          percent_change = round(((projected_sales - last_month_sales_float) / last_month_sales_float) * 100, 2)
+    if last_month_sales_float > 0:
+        percent_change = round(((projected_sales - last_month_sales_float) / last_month_sales_float) * 100, 2)
     else:
         percent_change = None  # o podrías usar 100.0 si quieres asumir una subida total
 
-    print(f"Ventas mes anterior: {last_month_sales}")
-    print(f"Proyección próxima: {projected_sales}")
-    print(f"Variación: {percent_change}%")
-
-    prediction_data = {
+    return {
         "product": product_name,
         "brand": brand,
         "unit": unit,
         "days": days,
-        "tendency": tendency,
-        "alert_restock": alert_restock,
-        "forecast": result,
+        "tendency": calcular_tendencia(result),
+        "alert_restock": projected_sales > current_stock,
+        "forecast": result.to_records(),
         "metrics": metrics,
         "sales_last_month": last_month_sales,
         "projected_sales": projected_sales,
-        "percent_change": percent_change, 
+        "percent_change": percent_change,
         "model_type": model_type,
-         "current_quality": current_stock,
+        "current_quality": current_stock,
     }
 
-    # Guardar la predicción en NestJS
-    guardar_prediccion_en_nest(prediction_data)
+def generar_prediccion(product_name, brand, unit, days):
+    with stage("predict", "total"):
+        return _generar_prediccion(product_name, brand, unit, days)
+
+def _generar_prediccion(product_name, brand, unit, days):
+    # Toda la petición usa la misma generación aunque termine un reentrenamiento en medio
+    generation = get_generation()
+
+    # Obtener la predicción real
+    result, model_type = get_model_output(product_name, brand, unit, days, generation)
+    if result is None:
+        print("No hay modelo para el producto especificado.")
+        return None
+
+    # Calcular métricas
+    metrics = calcular_metricas_reales(product_name, brand, unit, result, model_type, generation.id)
+
+    # Ventas del mes pasado
+    with stage("predict", "db_last_month"):
+        last_month_sales = cached_last_month_sales(product_name, brand, unit)
+
+    # La alerta depende del stock actual: se calcula siempre, nunca se cachea
+    with stage("predict", "db_stock"):
+        current_stock = cached_stock(product_name, brand, unit)
+
+    prediction_data = armar_prediccion(
+        product_name, brand, unit, days, result, model_type, metrics, last_month_sales, current_stock
+    )
+
+    print(f"Ventas mes anterior: {last_month_sales}")
+    print(f"Proyección próxima: {prediction_data['projected_sales']}")
+    print(f"Variación: {prediction_data['percent_change']}%")
+
+    # Guardar la predicción en NestJS en segundo plano (la cola copia los datos al encolar)
+    with stage("predict", "nest_enqueue"):
+        prediction_outbox.enqueue(prediction_data)
+
+    # La generación solo se devuelve al cliente, NestJS no la acepta en su DTO
+    prediction_data["generation"] = generation.id
 
     return prediction_data
+
+
+def get_model_outputs(items, generation) -> list:
+    """
+    get_model_output para una lista de (product, brand, unit, days). Un error en un
+    elemento no corta el resto.
+
+    Returns:
+        lista de (ForecastResult, modelo, error) en el mismo orden; result es None si no
+        hay modelo (error None) o si falló (error con el mensaje).
+    """
+    outputs = []
+    for product_name, brand, unit, days in items:
+        try:
+            result, model_type = get_model_output(product_name, brand, unit, days, generation)
+            outputs.append((result, model_type, None))
+        except Exception as e:
+            print(f"❌ Error prediciendo {product_name} - {brand} - {unit}: {e}")
+            outputs.append((None, None, str(e)))
+    return outputs
+
+def generar_predicciones_bulk(items, outputs, generation) -> list:
+    """
+    Arma las respuestas de /predict/batch a partir de get_model_outputs: stock, ventas del
+    mes pasado e historial para las métricas se consultan una vez para todo el lote (y solo
+    lo que no está en cache).
+
+    Returns:
+        lista alineada con items: prediction_data como generar_prediccion, o None si ese
+        elemento no tiene predicción.
+    """
+    found = [
+        (index, item, result, model_type)
+        for index, (item, (result, model_type, _)) in enumerate(zip(items, outputs))
+        if result is not None
+    ]
+    keys = list({tuple(item[:3]) for _, item, _, _ in found})
+
+    with stage("predict_batch", "db_stock"):
+        stock = cached_stock_bulk(keys)
+    with stage("predict_batch", "db_last_month"):
+        last_month = cached_last_month_sales_bulk(keys)
+    with stage("predict_batch", "metrics"):
+        metrics = calcular_metricas_reales_bulk(
+            [(tuple(item[:3]), model_type, result) for _, item, result, model_type in found], generation.id
+        )
+
+    predictions = [None] * len(items)
+    with stage("predict_batch", "summarize"):
+        for (index, item, result, model_type), model_metrics in zip(found, metrics):
+            key = tuple(item[:3])
+            prediction_data = armar_prediccion(
+                *item, result, model_type, model_metrics, last_month[key], stock[key]
+            )
+            prediction_outbox.enqueue(prediction_data)
+            prediction_data["generation"] = generation.id
+            predictions[index] = prediction_data
+    return predictions
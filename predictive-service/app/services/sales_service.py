@@ -1,15 +1,29 @@
 from datetime import datetime, timedelta
-from app.db.connection import get_connection
-import psycopg2.extras
+import numpy as np
+import pandas as pd
+import psycopg2.extensions
+from app.db.connection import db_cursor, db_connection
 
-def get_last_month_sales(product_name: str, brand: str, unit: str) -> float:
-    conn = get_connection()
-    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+# Tabla temporal con las keys pedidas, para consultar muchos productos en una sola query
+KEYS_CTE = """
+    WITH k(product_name, brand, unit) AS (
+        SELECT * FROM unnest(%s::text[], %s::text[], %s::text[])
+    )
+"""
+
+def keys_to_arrays(keys) -> tuple[list, list, list]:
+    keys = list(keys)
+    return [k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys]
 
+def last_month_range():
     today = datetime.today()
     first_day_this_month = today.replace(day=1)
     last_day_last_month = first_day_this_month - timedelta(days=1)
     first_day_last_month = last_day_last_month.replace(day=1)
+    return first_day_last_month, last_day_last_month
+
+def get_last_month_sales(product_name: str, brand: str, unit: str) -> float:
+    first_day_last_month, last_day_last_month = last_month_range()
 
     query = """
         SELECT COALESCE(SUM(quantity), 0) AS total
@@ -21,22 +35,18 @@ def get_last_month_sales(product_name: str, brand: str, unit: str) -> float:
           AND sale_date <= %s
     """
 
-    cursor.execute(query, (
-        product_name,
-        brand,
-        unit,
-        first_day_last_month,
-        last_day_last_month
-    ))
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(query, (
+            product_name,
+            brand,
+            unit,
+            first_day_last_month,
+            last_day_last_month
+        ))
+        result = cursor.fetchone()
 
     return result["total"]
 def get_sales_history(product_name: str, brand: str, unit: str) -> list[dict]:
-    conn = get_connection()
-    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-
     query = """
         SELECT sale_date::date AS ds, SUM(quantity) AS y
         FROM product_sales
@@ -47,10 +57,138 @@ def get_sales_history(product_name: str, brand: str, unit: str) -> list[dict]:
         ORDER BY ds
     """
 
-    cursor.execute(query, (product_name, brand, unit))
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(query, (product_name, brand, unit))
+        results = cursor.fetchall()
 
     # Formato compatible con cálculo de métricas
     return [{"ds": row["ds"].strftime("%Y-%m-%d"), "y": row["y"]} for row in results]
+
+def get_last_month_sales_bulk(keys) -> dict:
+    """
+    Ventas del mes pasado para muchas keys (product, brand, unit) en una sola consulta.
+    Las keys sin ventas devuelven 0.
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+    first_day_last_month, last_day_last_month = last_month_range()
+
+    query = KEYS_CTE + """
+        SELECT k.product_name, k.brand, k.unit, COALESCE(SUM(s.quantity), 0) AS total
+        FROM k
+        LEFT JOIN product_sales s
+          ON s.product_name = k.product_name
+         AND COALESCE(s.brand_name, 'Sin marca') = k.brand
+         AND COALESCE(s.unit_of_measure_name, 'Sin unidad') = k.unit
+         AND s.sale_date >= %s
+         AND s.sale_date <= %s
+        GROUP BY k.product_name, k.brand, k.unit
+    """
+
+    with db_cursor() as cursor:
+        cursor.execute(query, (*keys_to_arrays(keys), first_day_last_month, last_day_last_month))
+        rows = cursor.fetchall()
+
+    return {(row["product_name"], row["brand"], row["unit"]): row["total"] for row in rows}
+
+def get_sales_history_bulk(keys, date_from=None, date_to=None) -> dict:
+    """
+    Ventas diarias de muchas keys en una sola consulta, opcionalmente acotadas a un rango de fechas.
+
+    Returns:
+        dict key -> (fechas datetime64[D] ordenadas, cantidades float64)
+    """
+    keys = list(keys)
+    empty = (np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64))
+    if not keys:
+        return {}
+
+    query = KEYS_CTE + """
+        SELECT k.product_name, k.brand, k.unit, s.sale_date::date AS ds, SUM(s.quantity) AS y
+        FROM k
+        JOIN product_sales s
+          ON s.product_name = k.product_name
+         AND COALESCE(s.brand_name, 'Sin marca') = k.brand
+         AND COALESCE(s.unit_of_measure_name, 'Sin unidad') = k.unit
+        WHERE (%s::date IS NULL OR s.sale_date::date >= %s::date)
+          AND (%s::date IS NULL OR s.sale_date::date <= %s::date)
+        GROUP BY k.product_name, k.brand, k.unit, s.sale_date::date
+        ORDER BY ds
+    """
+
+    with db_cursor() as cursor:
+        cursor.execute(query, (*keys_to_arrays(keys), date_from, date_from, date_to, date_to))
+        rows = cursor.fetchall()
+
+    grouped = {key: ([], []) for key in keys}
+    for row in rows:
+        dates, values = grouped[(row["product_name"], row["brand"], row["unit"])]
+        dates.append(row["ds"])
+        values.append(row["y"])
+
+    return {
+        key: (np.array(dates, dtype="datetime64[D]"), np.array(values, dtype=np.float64)) if dates else empty
+        for key, (dates, values) in grouped.items()
+    }
+
+def load_daily_series(itersize: int = 50000) -> dict:
+    """
+    Ventas diarias de todas las series (product, brand, unit) para entrenar.
+
+    La agregación por día se hace en SQL y el resultado se lee con un cursor del lado
+    del servidor en bloques de `itersize` filas, pasando cada bloque a arrays de NumPy.
+    Así no se crea un dict por fila ni un DataFrame intermedio por venta.
+
+    Returns:
+        dict key -> DataFrame con 'ds' (datetime64) e 'y' (float64), ordenado por fecha
+        (el mismo formato que aggregate_daily).
+    """
+    query = """
+        SELECT
+            product_name,
+            COALESCE(brand_name, 'Sin marca') AS brand,
+            COALESCE(unit_of_measure_name, 'Sin unidad') AS unit,
+            sale_date::date - DATE '1970-01-01' AS day,
+            SUM(quantity)::float8 AS y
+        FROM product_sales
+        WHERE sale_date IS NOT NULL AND quantity IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+    """
+
+    day_chunks = []
+    y_chunks = []
+    bounds = []  # (key, fila inicial); las filas de una key vienen contiguas por el ORDER BY
+    current_key = None
+    offset = 0
+
+    with db_connection() as conn:
+        # Cursor con nombre = cursor del lado del servidor; tuplas en vez de RealDictCursor
+        with conn.cursor(name="training_daily_sales", cursor_factory=psycopg2.extensions.cursor) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+                products, brands, units, days, values = zip(*rows)
+                day_chunks.append(np.fromiter(days, dtype=np.int64, count=len(rows)))
+                y_chunks.append(np.fromiter(values, dtype=np.float64, count=len(rows)))
+                for i, key in enumerate(zip(products, brands, units)):
+                    if key != current_key:
+                        bounds.append((key, offset + i))
+                        current_key = key
+                offset += len(rows)
+
+    if not bounds:
+        return {}
+
+    dates = np.concatenate(day_chunks).astype("datetime64[D]").astype("datetime64[ns]")
+    values = np.concatenate(y_chunks)
+    ends = [start for _, start in bounds[1:]] + [offset]
+
+    return {
+        key: pd.DataFrame({"ds": dates[start:end], "y": values[start:end]}, copy=False)
+        for (key, start), end in zip(bounds, ends)
+    }
@@ -0,0 +1,141 @@
+import json
+from typing import Optional
+
+import msgpack
+import numpy as np
+from starlette.responses import Response
+
+from app.services.forecasting import MODEL_NAMES
+
+# Formatos de respuesta para las rutas de predicción masiva, elegidos con el header Accept.
+#   application/json              -> lo de siempre: listas de {"ds", "yhat"} por modelo
+#   application/vnd.forecast.columnar+json
+#                                 -> columnar: las fechas como inicio + largo por producto y
+#                                    modelo, los valores en un solo vector y los demás campos
+#                                    por columna
+#   application/x-msgpack         -> el mismo columnar en msgpack, con yhat como bytes
+#                                    float32 little-endian
+#
+# En el columnar cada producto ocupa una fila: "products" trae sus campos (product, brand,
+# unit, current_quality...) y "fields" los de cada modelo como matrices [producto][modelo]
+# (null si ese producto no tiene el modelo). Las métricas se aplanan a "MAE" y "RMSE".
+#
+# Las predicciones no comparten fechas (Prophet y ARIMA empiezan donde terminó el
+# entrenamiento de cada SKU), así que no se arma una matriz con un eje de fechas común:
+# "starts" y "lengths" son matrices [producto][modelo] y los valores van concatenados en
+# "yhat" en ese mismo orden (producto por producto, modelo por modelo): la serie de (i, j)
+# empieza en la suma de los lengths anteriores y sus fechas son días consecutivos desde
+# starts[i][j].
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.forecast.columnar+json"
+MSGPACK = "application/x-msgpack"
+
+FORMATS = (JSON, COLUMNAR_JSON, MSGPACK)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Formato de respuesta según el header Accept (respeta q=). JSON si no se pide otro.
+    """
+    if not accept:
+        return JSON
+
+    best, best_q = JSON, 0.0
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # */* o application/* no eligen nada: se queda JSON
+        if media_type in FORMATS and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def _model_order(rows) -> list:
+    names = {name for row in rows for name in row["forecasts"]}
+    return [name for name in MODEL_NAMES if name in names] + sorted(names - set(MODEL_NAMES))
+
+
+def to_columnar(meta: dict, rows: list) -> dict:
+    """
+    Convierte registros con "forecasts" (los de /compare o /predict/all-models) al formato
+    columnar. `meta` son los campos generales de la respuesta (success, generation...).
+
+    Returns:
+        dict con yhat como ndarray float64 (todas las predicciones concatenadas).
+    """
+    models = _model_order(rows)
+    model_index = {name: j for j, name in enumerate(models)}
+
+    starts = [[None] * len(models) for _ in rows]
+    lengths = [[0] * len(models) for _ in rows]
+    values = []
+    products = {}
+    fields = {}
+
+    for i, row in enumerate(rows):
+        for name, value in row.items():
+            if name != "forecasts":
+                products.setdefault(name, [None] * len(rows))[i] = value
+
+        # El orden de yhat es el de la matriz, no el del dict de cada producto
+        forecasts = sorted(row["forecasts"].items(), key=lambda item: model_index[item[0]])
+        for model_name, data in forecasts:
+            j = model_index[model_name]
+            forecast = data.get("forecast") or []
+            if forecast:
+                starts[i][j] = forecast[0]["ds"]
+                lengths[i][j] = len(forecast)
+                values.extend(record["yhat"] for record in forecast)
+
+            for name, value in data.items():
+                if name == "forecast":
+                    continue
+                items = value.items() if isinstance(value, dict) else ((name, value),)
+                for field, field_value in items:
+                    column = fields.get(field)
+                    if column is None:
+                        column = fields[field] = [[None] * len(models) for _ in rows]
+                    column[i][j] = field_value
+
+    return {
+        **meta,
+        "format": "columnar",
+        "models": models,
+        "products": products,
+        "fields": fields,
+        "starts": starts,
+        "lengths": lengths,
+        "yhat": np.asarray(values, dtype=np.float64),
+    }
+
+
+def _plain(value):
+    # Escalares de NumPy que se cuelan en los registros (p. ej. np.bool_)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def columnar_response(meta: dict, rows: list, media_type: str) -> Response:
+    """
+    Respuesta ya codificada en COLUMNAR_JSON o MSGPACK (con JSON las rutas devuelven el
+    dict de siempre). Arma matrices y serializa: se llama dentro de un ejecutor.
+    """
+    data = to_columnar(meta, rows)
+    yhat = data.pop("yhat")
+    if media_type == MSGPACK:
+        data["yhat"] = {"dtype": "<f4", "shape": list(yhat.shape), "data": yhat.astype("<f4").tobytes()}
+        body = msgpack.packb(data, default=_plain, use_bin_type=True)
+    else:
+        data["yhat"] = yhat.tolist()
+        body = json.dumps(data, ensure_ascii=False, default=_plain).encode("utf-8")
+
+    return Response(body, media_type=media_type, headers={"Vary": "Accept"})
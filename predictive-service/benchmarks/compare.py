@@ -0,0 +1,37 @@
+"""
+Compara dos resultados de benchmarks.run (mediana nueva / mediana base).
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/cambio.json
+"""
+import json
+import sys
+from pathlib import Path
+
+
+def load(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        sys.exit("Uso: python -m benchmarks.compare <base.json> <nuevo.json>")
+
+    base, new = load(argv[0]), load(argv[1])
+    print(f"base:  {base['meta'].get('commit')} {base['meta']['timestamp']}")
+    print(f"nuevo: {new['meta'].get('commit')} {new['meta']['timestamp']}")
+    print(f"{'benchmark':<30} {'base (s)':>10} {'nuevo (s)':>10} {'ratio':>8}")
+
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        before = base["results"].get(name, {}).get("median")
+        after = new["results"].get(name, {}).get("median")
+        if not before or after is None:
+            print(f"{name:<30} {before if before is not None else '-':>10} {after if after is not None else '-':>10} {'-':>8}")
+            continue
+        ratio = after / before
+        flag = "  🐢" if ratio > 1.1 else ("  🚀" if ratio < 0.9 else "")
+        print(f"{name:<30} {before:>10.4f} {after:>10.4f} {ratio:>7.2f}x{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Benchmarks de entrenamiento y de las rutas de predicción.
+
+Uso (desde predictive-service/, con DB_* o DATABASE_URL apuntando a una BD de pruebas):
+
+    python -m benchmarks.run --skus 200 --days 365 --seed-db --out benchmarks/results/base.json
+    python -m benchmarks.run --skip-training --out benchmarks/results/cambio.json
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/cambio.json
+
+Los modelos se guardan en un directorio temporal (MODEL_STORE_DIR) salvo que se indique otro,
+así que no se toca el almacén de producción. Con --skip-training se usa lo que haya en
+MODEL_STORE_DIR.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def measure(fn, repeat: int, calls: int = 1) -> dict:
+    """
+    Ejecuta `fn` `repeat` veces. Con calls > 1, `fn` hace varias llamadas y se reporta
+    también el tiempo por llamada.
+    """
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+
+    result = {
+        "runs": repeat,
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "mean": round(statistics.mean(runs), 6),
+        "max": round(max(runs), 6),
+    }
+    if calls > 1:
+        result["calls"] = calls
+        result["median_per_call"] = round(statistics.median(runs) / calls, 6)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de predictive-service")
+    parser.add_argument("--skus", type=int, default=100, help="SKUs sintéticos (con --seed-db)")
+    parser.add_argument("--days", type=int, default=365, help="Días de historial (con --seed-db)")
+    parser.add_argument("--sales-per-day", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seed-db", action="store_true", help="Cargar datos sintéticos antes de medir")
+    parser.add_argument("--force", action="store_true", help="Reemplazar product_sales aunque tenga datos")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de entrenamiento")
+    parser.add_argument("--skip-training", action="store_true", help="Usar los modelos ya guardados")
+    parser.add_argument("--horizon", type=int, default=30, help="Días a predecir en las rutas")
+    parser.add_argument("--sample", type=int, default=20, help="SKUs usados en las mediciones por llamada")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=None, help="Archivo JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Antes de importar app: la configuración se lee al importar
+    os.environ.setdefault("MODEL_STORE_DIR", tempfile.mkdtemp(prefix="bench-model-store-"))
+
+    from app.models.generation import get_generation
+    from app.models.prophet_models import train_models_from_db, load_models_from_store, training_report
+    from app.models.baseline_models import fit_baselines
+    from app.services.sales_service import load_daily_series
+    from app.services.prediction_service import get_forecast, get_forecast_all_models
+    from app.services.prediction_service import generar_prediccion, get_model_outputs, generar_predicciones_bulk
+    from app.services.cache_service import prediction_cache, stock_cache, sales_cache
+    from app.services.export_service import create_forecast_excel_multi, create_catalog_excel, excel_cache, catalog_reports
+    from app.routes.compare_route import _compare_forecasts
+    from app.utils.response_format import columnar_response, COLUMNAR_JSON, MSGPACK
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.db.connection import close_pool
+    from app.services.nest_client import prediction_outbox
+
+    # generar_prediccion y generar_predicciones_bulk encolan cada predicción para NestJS:
+    # sin URL la cola las descarta y la medición no guarda nada en la base real
+    prediction_outbox.url = prediction_outbox.batch_url = None
+
+    results = {}
+    meta = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model_store": os.environ["MODEL_STORE_DIR"],
+        "params": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+    }
+
+    if args.seed_db:
+        from benchmarks.synthetic_data import generate_sales, seed_database
+
+        print(f"🧪 Generando {args.skus} SKUs x {args.days} días...")
+        sales = generate_sales(args.skus, args.days, args.sales_per_day, seed=args.seed)
+        meta["dataset"] = seed_database(sales, force=args.force, seed=args.seed)
+        print(f"✅ Cargadas {meta['dataset']['sales']} ventas")
+
+    if args.skip_training:
+        if not load_models_from_store():
+            sys.exit(f"❌ No hay modelos guardados en {os.environ['MODEL_STORE_DIR']}")
+    else:
+        print("🏋️ Entrenamiento completo...")
+        results["train_full"] = measure(lambda: train_models_from_db(workers=args.workers), 1)
+        meta["training"] = {k: v for k, v in training_report.items() if k != "keys"}
+
+        print("🏋️ Entrenamiento incremental sin cambios...")
+        results["train_incremental"] = measure(
+            lambda: train_models_from_db(workers=args.workers, incremental=True), args.repeat
+        )
+
+    generation = get_generation()
+    keys = list(generation.models.keys())
+    if not keys:
+        sys.exit("❌ No hay modelos entrenados para medir")
+    sample = keys[:args.sample]
+    meta["generation"] = generation.id
+    meta["trained_keys"] = len(keys)
+    days = args.horizon
+
+    def forecast_sample():
+        prediction_cache.clear()
+        stock_cache.clear()
+        sales_cache.clear()
+        for key in sample:
+            get_forecast(*key, days, generation)
+
+    def forecast_sample_cached():
+        for key in sample:
+            get_forecast(*key, days, generation)
+
+    def clear_caches():
+        prediction_cache.clear()
+        stock_cache.clear()
+        sales_cache.clear()
+
+    # /predict una vez por SKU contra /predict/batch con los mismos SKUs, ambos sin cache
+    def predict_single_sample():
+        clear_caches()
+        for key in sample:
+            generar_prediccion(*key, days)
+
+    def predict_batch_sample():
+        clear_caches()
+        items = [(*key, days) for key in sample]
+        generar_predicciones_bulk(items, get_model_outputs(items, generation), generation)
+
+    def all_models_sample():
+        for key in sample:
+            get_forecast_all_models(*key, days, generation)
+
+    print("⏱️ Modelos base vectorizados...")
+    series = load_daily_series()
+    results["fit_baselines"] = measure(lambda: fit_baselines(series), args.repeat)
+    meta["baseline_series"] = len(series)
+    del series
+
+    print("⏱️ Rutas de predicción...")
+    results["get_forecast"] = measure(forecast_sample, args.repeat, len(sample))
+    results["get_forecast_cached"] = measure(forecast_sample_cached, args.repeat, len(sample))
+    results["get_forecast_all_models"] = measure(all_models_sample, args.repeat, len(sample))
+    results["predict_single"] = measure(predict_single_sample, args.repeat, len(sample))
+    results["predict_batch"] = measure(predict_batch_sample, args.repeat, len(sample))
+    results["compare_forecasts"] = measure(
+        lambda: _compare_forecasts("Sin marca", "Sin unidad", days), args.repeat
+    )
+
+    # Serialización de /compare: JSON como lo hace FastAPI contra los formatos columnares
+    comparison = _compare_forecasts("Sin marca", "Sin unidad", days)
+    comparison_meta = {"success": True, "generation": generation.id, "days": days}
+    results["encode_compare_json"] = measure(
+        lambda: JSONResponse(jsonable_encoder(comparison)), args.repeat
+    )
+    for name, media_type in (("columnar_json", COLUMNAR_JSON), ("msgpack", MSGPACK)):
+        results[f"encode_compare_{name}"] = measure(
+            lambda: columnar_response(comparison_meta, comparison["comparison"], media_type), args.repeat
+        )
+    del comparison
+
+    all_models = get_forecast_all_models(*sample[0], days, generation)
+
+    def uncached(fn):
+        def run():
+            excel_cache.clear()
+            catalog_reports.clear()
+            fn()
+        return run
+
+    results["create_forecast_excel_multi"] = measure(
+        uncached(lambda: create_forecast_excel_multi(all_models["forecasts"], *sample[0], days)), args.repeat
+    )
+    results["create_catalog_excel"] = measure(uncached(lambda: create_catalog_excel(keys, days, generation)), 1)
+    results["create_catalog_excel_cached"] = measure(lambda: create_catalog_excel(keys, days, generation), args.repeat)
+
+    close_pool()
+
+    output = {"meta": meta, "results": results}
+    out = args.out or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%dT%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(output, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    for name, values in results.items():
+        per_call = f" ({values['median_per_call'] * 1000:.1f} ms/llamada)" if "median_per_call" in values else ""
+        print(f"  {name:<30} mediana {values['median']:.3f}s{per_call}")
+    print(f"💾 Resultados en {out}")
+
+
+if __name__ == "__main__":
+    main()
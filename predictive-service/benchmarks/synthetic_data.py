@@ -0,0 +1,167 @@
+"""
+Datos sintéticos de ventas para los benchmarks.
+
+Cada serie toma la forma de app/dummy_data.csv (se repite como patrón semanal/diario),
+escalada por SKU y con tendencia y ruido. Una parte de los SKUs son intermitentes
+(muchos días sin ventas) para parecerse al catálogo real.
+"""
+import io
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.db.connection import db_connection
+
+BASE_CSV = Path(__file__).resolve().parent.parent / "app" / "dummy_data.csv"
+
+# Solo las columnas que lee predictive-service; en producción el esquema lo crea NestJS
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS brands (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        name varchar NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS units_of_measure (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        name varchar NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS products (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        name varchar NOT NULL,
+        "brandId" uuid,
+        "unitOfMeasureId" uuid,
+        current_quantity float DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS product_sales (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        product_name varchar NOT NULL,
+        brand_name varchar,
+        unit_of_measure_name varchar,
+        quantity decimal(10, 2),
+        sale_date timestamp
+    );
+"""
+
+
+def base_profile() -> np.ndarray:
+    """
+    Serie de app/dummy_data.csv normalizada a promedio 1.
+    """
+    y = pd.read_csv(BASE_CSV)["y"].to_numpy(dtype=np.float64)
+    return y / y.mean()
+
+
+def generate_sales(
+    skus: int,
+    days: int,
+    sales_per_day: int = 2,
+    brands: int = 5,
+    intermittent_share: float = 0.2,
+    seed: int = 42,
+    end: date = None,
+) -> pd.DataFrame:
+    """
+    Genera ventas individuales (varias por día y SKU) terminando en `end` (ayer por defecto).
+
+    Returns:
+        DataFrame con product_name, brand_name, unit_of_measure_name, quantity y sale_date.
+    """
+    rng = np.random.default_rng(seed)
+    end = end or date.today() - timedelta(days=1)
+    profile = base_profile()
+
+    # Demanda diaria esperada por SKU (filas) y día (columnas)
+    level = rng.lognormal(mean=1.5, sigma=0.6, size=(skus, 1))
+    trend = rng.normal(0, 0.3, size=(skus, 1)) * np.linspace(0, 1, days)
+    shape = profile[np.arange(days) % len(profile)]
+    demand = np.clip(level * shape * (1 + trend), 0, None)
+
+    intermittent = rng.random(skus) < intermittent_share
+    demand[intermittent] *= rng.random((int(intermittent.sum()), days)) < 0.15
+
+    # Cada día se reparte en `sales_per_day` ventas; las de cantidad 0 no se registran
+    quantities = rng.poisson(np.repeat(demand[:, :, None] / sales_per_day, sales_per_day, axis=2))
+    sku_idx, day_idx, _ = np.nonzero(quantities)
+    values = quantities[quantities > 0]
+
+    start = datetime.combine(end - timedelta(days=days - 1), datetime.min.time())
+    seconds = rng.integers(8 * 3600, 20 * 3600, size=len(values))
+    sale_dates = (
+        np.datetime64(start, "s")
+        + day_idx.astype("timedelta64[D]").astype("timedelta64[s]")
+        + seconds.astype("timedelta64[s]")
+    )
+
+    sku_names = np.array([f"Producto {i:05d}" for i in range(skus)])
+    brand_names = np.array([f"Marca {i}" for i in range(brands)], dtype=object)
+    sku_brand = brand_names[np.arange(skus) % brands]
+    # Algunos SKUs sin marca para ejercitar el COALESCE(brand_name, 'Sin marca')
+    sku_brand[np.arange(skus) % 10 == 9] = None
+
+    return pd.DataFrame({
+        "product_name": sku_names[sku_idx],
+        "brand_name": sku_brand[sku_idx],
+        "unit_of_measure_name": "Unidad",
+        "quantity": values.astype(np.float64),
+        "sale_date": sale_dates,
+    })
+
+
+def seed_database(sales: pd.DataFrame, force: bool = False, seed: int = 42) -> dict:
+    """
+    Reemplaza las tablas de ventas/productos de la BD configurada por los datos sintéticos.
+    Se niega a hacerlo si product_sales ya tiene datos, salvo con force=True.
+
+    Returns:
+        dict con la cantidad de ventas y productos cargados.
+    """
+    rng = np.random.default_rng(seed)
+
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA)
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM product_sales) AS has_rows")
+            if cursor.fetchone()["has_rows"] and not force:
+                raise RuntimeError(
+                    "product_sales ya tiene datos; usa una BD de pruebas o --force para reemplazarlos"
+                )
+
+            cursor.execute("TRUNCATE product_sales, products, brands, units_of_measure")
+
+            buffer = io.StringIO()
+            sales.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY product_sales (product_name, brand_name, unit_of_measure_name, quantity, sale_date) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+            products = sales[["product_name", "brand_name", "unit_of_measure_name"]].drop_duplicates()
+            cursor.execute(
+                "INSERT INTO brands (name) SELECT DISTINCT unnest(%s::text[])",
+                (products["brand_name"].dropna().unique().tolist(),),
+            )
+            cursor.execute(
+                "INSERT INTO units_of_measure (name) SELECT DISTINCT unnest(%s::text[])",
+                (products["unit_of_measure_name"].unique().tolist(),),
+            )
+            cursor.execute(
+                """
+                INSERT INTO products (name, "brandId", "unitOfMeasureId", current_quantity)
+                SELECT p.name, b.id, u.id, p.stock
+                FROM unnest(%s::text[], %s::text[], %s::text[], %s::float8[]) AS p(name, brand, unit, stock)
+                LEFT JOIN brands b ON b.name = p.brand
+                LEFT JOIN units_of_measure u ON u.name = p.unit
+                """,
+                (
+                    products["product_name"].tolist(),
+                    [b if isinstance(b, str) else None for b in products["brand_name"]],
+                    products["unit_of_measure_name"].tolist(),
+                    rng.integers(0, 200, size=len(products)).astype(float).tolist(),
+                ),
+            )
+            cursor.execute("ANALYZE product_sales")
+
+    return {"sales": len(sales), "products": len(products)}
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pmdarima import ARIMA
+
+from app.models import prophet_models
+from app.models.prophet_models import train_arima
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(1)
+    ds = pd.date_range("2024-01-01", periods=80, freq="D")
+    return pd.DataFrame({"ds": ds, "y": 10 + rng.normal(0, 1, 80)})
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    # auto_arima rápido que cuenta las búsquedas completas
+    calls = []
+
+    def fake_auto_arima(y, **kwargs):
+        calls.append(len(y))
+        return ARIMA(order=(1, 0, 0), seasonal_order=(0, 0, 0, 0), suppress_warnings=True).fit(y)
+
+    monkeypatch.setattr(prophet_models, "auto_arima", fake_auto_arima)
+    return calls
+
+
+def previous_meta(**overrides):
+    meta = {"order": [1, 0, 0], "seasonal_order": [0, 0, 0, 0], "with_intercept": True, "rmse": 100.0, "age": 0}
+    meta.update(overrides)
+    return meta
+
+
+def test_without_previous_orders_runs_full_search(series, searches):
+    model, mae, rmse, meta = train_arima(series)
+
+    assert searches == [64]  # 80% de la serie
+    assert meta["mode"] == "full" and meta["age"] == 0
+    assert meta["order"] == [1, 0, 0] and meta["rmse"] == pytest.approx(rmse)
+
+
+def test_previous_orders_are_refit_without_search(series, searches):
+    model, mae, rmse, meta = train_arima(series, previous=previous_meta(age=1))
+
+    assert searches == []
+    assert meta["mode"] == "warm" and meta["age"] == 2
+    assert meta["rmse"] == 100.0  # sigue siendo el de la última búsqueda
+    assert model.predict(n_periods=3).shape == (3,)
+
+
+@pytest.mark.parametrize("previous", [
+    previous_meta(rmse=1e-6),  # el reajuste empeora más que la tolerancia
+    previous_meta(age=prophet_models.ARIMA_FULL_SEARCH_EVERY),  # demasiados reajustes seguidos
+    previous_meta(order=[1, 0], seasonal_order=[0, 0, 0, 0]),  # órdenes inválidos: el reajuste falla
+])
+def test_falls_back_to_full_search(series, searches, previous):
+    model, mae, rmse, meta = train_arima(series, previous=previous)
+
+    assert len(searches) == 1
+    assert meta["mode"] == "full" and meta["age"] == 0
@@ -0,0 +1,87 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.baseline_models import BaselineForecaster, build_daily_matrix, fit_baselines
+
+
+def daily(start, values):
+    return pd.DataFrame({"ds": pd.date_range(start, periods=len(values), freq="D"), "y": np.asarray(values, float)})
+
+
+def next_days(df, days):
+    return np.datetime64(df["ds"].iloc[-1], "D") + np.arange(1, days + 1)
+
+
+def test_straight_line_picks_trend_and_continues_it():
+    df = daily("2024-01-01", 2 + 0.5 * np.arange(40))
+
+    forecaster, metrics = fit_baselines({"k": df})["k"]
+
+    assert forecaster.method == "trend"
+    assert metrics["RMSE"] == pytest.approx(0, abs=1e-9)
+    np.testing.assert_allclose(forecaster.predict(next_days(df, 3)), 2 + 0.5 * np.arange(40, 43))
+
+
+def test_trend_matches_least_squares_fit():
+    rng = np.random.default_rng(3)
+    values = 20 + 0.3 * np.arange(60) + rng.normal(0, 0.5, 60)
+    df = daily("2024-02-01", values)
+
+    forecaster, _ = fit_baselines({"k": df})["k"]
+    slope, level = np.polyfit(np.arange(60), values, 1)
+
+    assert forecaster.method == "trend"
+    assert forecaster.slope == pytest.approx(slope)
+    assert forecaster.level == pytest.approx(level)
+
+
+def test_weekly_pattern_picks_seasonal_naive():
+    week = [5, 1, 1, 1, 1, 8, 9]
+    df = daily("2024-03-04", week * 6)
+
+    forecaster, metrics = fit_baselines({"k": df})["k"]
+
+    assert forecaster.method == "seasonal_naive"
+    assert metrics["RMSE"] == 0
+    np.testing.assert_allclose(forecaster.predict(next_days(df, 7)), week)
+
+
+def test_batches_and_start_dates_do_not_change_the_fit():
+    rng = np.random.default_rng(4)
+    series = {
+        ("a", "b", "u"): daily("2024-01-01", rng.poisson(3, 50)),
+        ("c", "b", "u"): daily("2024-02-10", rng.poisson(8, 20)),
+        ("d", "b", "u"): daily("2023-12-01", np.where(rng.random(90) < 0.2, rng.poisson(4, 90), 0)),
+        ("e", "b", "u"): daily("2024-03-01", [4.0]),  # un solo día: sin modelo, como en train_series
+    }
+
+    together = fit_baselines(series)
+    one_by_one = fit_baselines(series, batch_size=1)
+
+    assert set(together) == {("a", "b", "u"), ("c", "b", "u"), ("d", "b", "u")}
+    for key, (forecaster, metrics) in together.items():
+        assert forecaster.to_params() == one_by_one[key][0].to_params()
+        assert metrics == one_by_one[key][1]
+
+
+def test_daily_matrix_pads_with_nan():
+    series = {"a": daily("2024-01-01", [1, 2]), "b": daily("2024-01-03", [3, 4, 5])}
+
+    keys, starts, matrix = build_daily_matrix(series)
+
+    assert keys == ["a", "b"]
+    assert starts.tolist() == np.array(["2024-01-01", "2024-01-03"], dtype="datetime64[D]").tolist()
+    np.testing.assert_array_equal(matrix, [[1, 2, np.nan], [3, 4, 5]])
+
+
+def test_forecaster_pickles_only_parameters():
+    forecaster = BaselineForecaster("moving_average", "2024-01-01", 3.5, 0, [0] * 7)
+
+    restored = pickle.loads(pickle.dumps(forecaster))
+
+    assert restored.to_params() == forecaster.to_params()
+    dates = np.array(["2024-02-01", "2024-02-02"], dtype="datetime64[D]")
+    np.testing.assert_allclose(restored.predict(dates), [3.5, 3.5])
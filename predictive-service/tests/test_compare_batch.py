@@ -0,0 +1,34 @@
+from app.routes import compare_route
+
+
+def test_compare_queries_db_once_per_batch(catalog, fake_db, monkeypatch):
+    monkeypatch.setattr(compare_route, "COMPARE_BATCH_SIZE", 2)
+
+    response = compare_route._compare_forecasts("Sin marca", "Sin unidad", 7)
+
+    assert response["success"]
+    assert len(response["comparison"]) == 5
+    # 5 productos en lotes de 2 -> 3 lotes, y cada lote hace una consulta de cada tipo
+    for query in ("history", "stock", "last_month"):
+        assert fake_db.count(query) == 3
+    assert sorted(len(keys) for name, keys in fake_db.calls if name == "stock") == [1, 2, 2]
+
+
+def test_compare_record_structure(catalog, fake_db):
+    response = compare_route._compare_forecasts("b", "u", 7)
+
+    record = next(row for row in response["comparison"] if row["product"] == "p4")
+    assert record["current_quality"] == fake_db.stock
+    assert set(record["forecasts"]) == {"linear", "arima"}
+
+    arima = record["forecasts"]["arima"]
+    assert len(arima["forecast"]) == 7
+    assert arima["total_forecast"] == 35.0  # StubArima de nivel 5 por 7 días
+    assert arima["alert_restock"] and arima["needed_stock"] == 25.0
+    assert record["general_alert"]
+
+
+def test_select_keys_filters_brand_unit_and_product(catalog):
+    assert len(compare_route.select_keys(catalog, "Sin marca", "Sin unidad")) == 5
+    assert compare_route.select_keys(catalog, "otra", "Sin unidad") == []
+    assert compare_route.select_keys(catalog, "b", "u", product=" P3 ") == [("p3", "b", "u")]
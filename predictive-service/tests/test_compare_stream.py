@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import compare_route
+
+
+@pytest.fixture
+def client(catalog, fake_db, monkeypatch):
+    monkeypatch.setattr(compare_route, "COMPARE_STREAM_BATCH_SIZE", 2)
+    # Solo el router: app.main arranca el scheduler
+    app = FastAPI()
+    app.include_router(compare_route.router)
+    return TestClient(app)
+
+
+def stream_products(client, **params):
+    response = client.get("/compare/stream", params=params)
+    assert response.status_code == 200
+    return response, [json.loads(line)["product"] for line in response.text.splitlines()]
+
+
+def test_stream_sends_one_line_per_product(client, catalog, fake_db):
+    response, products = stream_products(client)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["x-model-generation"] == catalog.id
+    assert products == ["p0", "p1", "p2", "p3", "p4"]
+    # Lotes de 2: 3 consultas de stock, no una por producto
+    assert fake_db.count("stock") == 3
+
+
+def test_offset_and_limit_skip_keys_before_computing(client, fake_db):
+    _, products = stream_products(client, offset=1, limit=2)
+
+    assert products == ["p1", "p2"]
+    assert fake_db.count("stock") == 1  # solo el lote de las keys pedidas
+
+
+def test_alert_filter_pages_over_filtered_records(client):
+    # Con stock 10, p0 (7 por semana en ambos modelos) es el único sin alerta
+    _, without_alert = stream_products(client, alert="false")
+    _, with_alert = stream_products(client, alert="true", offset=1, limit=2)
+
+    assert without_alert == ["p0"]
+    assert with_alert == ["p2", "p3"]
+
+
+def test_product_filter(client):
+    _, products = stream_products(client, product="P3")
+
+    assert products == ["p3"]
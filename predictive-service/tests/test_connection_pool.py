@@ -0,0 +1,119 @@
+import psycopg2
+import pytest
+
+from app.db import connection
+from app.db.connection import ConnectionPool, PoolTimeoutError, db_connection
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.conn.dead:
+            raise psycopg2.OperationalError("server closed the connection")
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, minconn=0, maxconn=2, timeout=0.05, check_after=30):
+        self.created = []
+        super().__init__(minconn, maxconn, timeout, check_after)
+
+    def _connect(self):
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+
+def test_connections_are_reused():
+    pool = FakePool(minconn=1)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    assert pool.getconn() is conn
+    assert len(pool.created) == 1
+
+
+def test_waits_and_times_out_when_exhausted():
+    pool = FakePool(maxconn=1)
+    pool.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+
+
+def test_stale_idle_connection_is_replaced():
+    pool = FakePool(check_after=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.dead = True  # el servidor la cerró mientras estaba ociosa
+
+    fresh = pool.getconn()
+
+    assert fresh is not conn
+    assert conn.closed
+
+
+@pytest.fixture
+def shared_pool(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(connection, "_pool", pool)
+    return pool
+
+
+def test_db_connection_commits_and_returns(shared_pool):
+    with db_connection() as conn:
+        pass
+
+    assert conn.commits == 1
+    assert shared_pool.stats()["idle"] == 1
+
+
+def test_db_connection_rolls_back_on_error(shared_pool):
+    with pytest.raises(ValueError):
+        with db_connection() as conn:
+            raise ValueError("consulta inválida")
+
+    assert conn.rollbacks == 1
+    assert shared_pool.stats()["idle"] == 1
+
+
+def test_broken_connection_is_discarded(shared_pool):
+    with pytest.raises(psycopg2.OperationalError):
+        with db_connection() as conn:
+            raise psycopg2.OperationalError("conexión perdida")
+
+    assert conn.closed
+    assert shared_pool.stats()["idle"] == 0
+    # El cupo se devolvió: se puede volver a pedir hasta maxconn
+    shared_pool.getconn()
+    shared_pool.getconn()
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.executors import BoundedExecutor, ExecutorBusyError
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor("test", workers=1, max_pending=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_run_offloads_to_pool_thread(executor):
+    async def main():
+        return await executor.run(lambda x, y=0: (threading.current_thread().name, x + y), 2, y=3)
+
+    thread_name, value = asyncio.run(main())
+
+    assert value == 5
+    assert thread_name.startswith("test")
+    assert executor.stats()["completed"] == 1 and executor.stats()["pending"] == 0
+
+
+def test_rejects_when_saturated_and_recovers(executor):
+    release = threading.Event()
+    running = [executor.submit(release.wait), executor.submit(release.wait)]
+
+    with pytest.raises(ExecutorBusyError):
+        executor.submit(release.wait)
+
+    async def busy():
+        await executor.run(lambda: None)
+
+    with pytest.raises(ExecutorBusyError):
+        asyncio.run(busy())
+    assert executor.stats()["rejected"] == 2
+
+    release.set()
+    for future in running:
+        future.result(timeout=5)
+    # El cupo se libera en el callback del future, que puede correr justo después de result()
+    deadline = time.monotonic() + 5
+    while executor.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert executor.submit(lambda: "ok").result(timeout=5) == "ok"
+
+
+def test_failed_job_releases_its_slot(executor):
+    async def main():
+        await executor.run(lambda: 1 / 0)
+
+    for _ in range(3):  # más que max_pending: si no liberara, el tercero saldría rechazado
+        with pytest.raises(ZeroDivisionError):
+            asyncio.run(main())
+
+    stats = executor.stats()
+    assert stats["pending"] == 0 and stats["rejected"] == 0
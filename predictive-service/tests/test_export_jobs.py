@@ -0,0 +1,129 @@
+import io
+import os
+import time
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+from app.routes import export_route, predict_route
+from app.services import export_jobs, export_service
+
+
+@pytest.fixture
+def client(catalog, fake_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_jobs, "EXPORT_JOBS_DIR", str(tmp_path))
+    export_service.excel_cache.clear()
+    export_service.catalog_reports.clear()
+    app = FastAPI()
+    app.include_router(predict_route.router)
+    app.include_router(export_route.router)
+    return TestClient(app)
+
+
+def wait_for(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/export/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"El reporte {job_id} no terminó")
+
+
+def test_catalog_export_job_runs_in_background(client, catalog, tmp_path):
+    response = client.post("/export/jobs", json={"brand": "b", "product": "p", "days": 5})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["products"] == 5 and job["generation"] == catalog.id
+    assert job["download_url"] == f"/export/jobs/{job['job_id']}/download"
+
+    job = wait_for(client, job["job_id"])
+    assert job["status"] == "done" and job["size"] > 0
+    # El estado y el archivo están en disco: cualquier worker puede responderlos
+    assert sorted(os.listdir(tmp_path)) == [f"{job['job_id']}.json", f"{job['job_id']}.xlsx"]
+
+    download = client.get(job["download_url"])
+    assert download.status_code == 200
+    assert download.headers["content-type"] == predict_route.XLSX_MEDIA_TYPE
+    workbook = load_workbook(io.BytesIO(download.content), read_only=True)
+    assert workbook.sheetnames == ["Resumen", "Pronóstico"]
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"days": 0}, 400),
+    ({"days": "siete"}, 400),
+    ({"brand": "otra"}, 404),
+])
+def test_invalid_export_requests(client, body, status):
+    assert client.post("/export/jobs", json=body).status_code == status
+
+
+def test_unknown_and_unfinished_jobs(client):
+    assert client.get("/export/jobs/noexiste").status_code == 404
+    assert client.get("/export/jobs/abc-123").status_code == 404  # ids con otros caracteres no se buscan
+
+    running = {
+        "id": "abc123", "status": "running", "filters": {}, "days": 7, "keys": 1, "generation": "g",
+        "pid": os.getpid(), "created_at": "", "finished_at": None, "size": None, "error": None,
+    }
+    export_jobs._write_status(running)
+    assert client.get("/export/jobs/abc123/download").status_code == 409
+
+    # El worker que lo generaba ya no existe: el trabajo se reporta como fallido
+    export_jobs._write_status({**running, "pid": 2 ** 22 + 1})
+    assert client.get("/export/jobs/abc123").json()["status"] == "failed"
+    assert client.get("/export/jobs/abc123/download").status_code == 500
+
+
+def job_status(job_id, status, finished_at=None, **extra):
+    job = {
+        "id": job_id, "status": status, "filters": {}, "days": 7, "keys": 1, "generation": "g",
+        "pid": os.getpid(), "created_at": "2020-01-01T00:00:00", "finished_at": finished_at,
+        "size": None, "error": None,
+    }
+    export_jobs._write_status({**job, **extra})
+
+
+def test_cleanup_only_removes_finished_jobs(client, tmp_path):
+    recent = datetime.now().isoformat(timespec="seconds")
+    job_status("viejo", "done", "2020-01-01T00:10:00")
+    (tmp_path / "viejo.xlsx").write_bytes(b"xlsx")
+    job_status("fallido", "failed", "2020-01-01T00:10:00")
+    job_status("reciente", "done", recent)
+    (tmp_path / "reciente.xlsx").write_bytes(b"xlsx")
+    # Lleva más que el TTL generándose, pero su worker sigue vivo
+    job_status("largo", "running")
+    os.utime(tmp_path / "largo.json", (0, 0))
+    job_status("huerfano", "running", pid=2 ** 22 + 1)  # su worker murió: queda como fallido
+    (tmp_path / "cortado.xlsx.tmp").write_bytes(b"")
+    os.utime(tmp_path / "cortado.xlsx.tmp", (0, 0))
+
+    export_jobs.cleanup_jobs(max_age=60)
+
+    assert sorted(os.listdir(tmp_path)) == ["largo.json", "reciente.json", "reciente.xlsx"]
+    assert client.get("/export/jobs/largo").json()["status"] == "running"
+
+
+def test_download_of_a_cleaned_file_is_404(client, tmp_path):
+    job_status("abc123", "done", datetime.now().isoformat(timespec="seconds"))
+
+    response = client.get("/export/jobs/abc123/download")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Reporte no encontrado o expirado."
+
+
+def test_sku_export_computes_forecasts_on_the_server(client):
+    response = client.get("/predict/export", params={"product_name": "p2", "brand": "b", "unit": "u", "days": 3})
+
+    assert response.status_code == 200
+    workbook = load_workbook(io.BytesIO(response.content), read_only=True)
+    assert {"Resumen General", "Linear", "Arima"} <= set(workbook.sheetnames)
+    arima = [list(row) for row in workbook["Arima"].iter_rows(values_only=True)]
+    assert [row[1] for row in arima[1:4]] == [3.0, 3.0, 3.0]
+
+    missing = client.get("/predict/export", params={"product_name": "nada", "brand": "b", "unit": "u"})
+    assert missing.status_code == 404
@@ -0,0 +1,74 @@
+import pytest
+from openpyxl import load_workbook
+
+from app.services import export_service
+from app.services.cache_service import stock_cache
+from app.services.export_service import create_catalog_excel, create_forecast_excel_multi
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    export_service.excel_cache.clear()
+    export_service.catalog_reports.clear()
+    yield
+    export_service.excel_cache.clear()
+    export_service.catalog_reports.clear()
+
+
+def rows(data, sheet):
+    return [list(row) for row in load_workbook(data, read_only=True)[sheet].iter_rows(values_only=True)]
+
+
+def test_catalog_report_writes_one_row_per_product_and_model(catalog, fake_db):
+    data = create_catalog_excel(list(catalog.models), 7, catalog, batch_size=2)
+
+    summary = rows(data, "Resumen")
+    assert summary[1] == ["Generación de modelos", catalog.id]
+    products = [row for row in summary[4:] if row[0]]
+    assert len(products) == 10  # 5 productos x 2 modelos
+    # p0 tiene mejor RMSE en arima, p1 en linear
+    selected = {(row[0], row[3]): row[-1] for row in products}
+    assert selected[("p0", "arima")] == "Sí" and selected[("p0", "linear")] == "No"
+    assert selected[("p1", "linear")] == "Sí"
+
+    forecast = rows(data, "Pronóstico")
+    assert forecast[0][:5] == ["Producto", "Marca", "Unidad", "Modelo", "Desde"]
+    assert len(forecast[0]) == 5 + 7
+    p4_arima = next(row for row in forecast if row[0] == "p4" and row[3] == "arima")
+    assert p4_arima[5:] == [5.0] * 7
+
+    # Lotes de 2 keys: 3 consultas de stock para 5 productos
+    assert fake_db.count("stock") == 3
+
+
+def test_repeated_catalog_report_is_served_from_cache(catalog, fake_db):
+    keys = list(catalog.models)
+    first = create_catalog_excel(keys, 7, catalog).getvalue()
+    calls = len(fake_db.calls)
+
+    assert create_catalog_excel(keys, 7, catalog).getvalue() == first
+    assert len(fake_db.calls) == calls
+
+    # Cambió el stock: se recalcula (el contenido es el mismo, así que no crece el cache)
+    stock_cache.invalidate()
+    assert create_catalog_excel(keys, 7, catalog).getvalue() == first
+    assert fake_db.count("stock") == 2
+    assert len(export_service.excel_cache) == 1
+
+
+def test_sku_report_is_cached_by_content():
+    models = {
+        "linear": {
+            "forecast": [{"ds": "2024-05-01", "yhat": 1.5}, {"ds": "2024-05-02", "yhat": 2.5}],
+            "projected_sales": 4.0, "percent_change": 12.4, "tendency": "creciente",
+            "alert_restock": True, "current_quality": 3, "metrics": {"MAE": 0.4, "RMSE": 0.6},
+        },
+    }
+
+    first = create_forecast_excel_multi(models, "p", "b", "u", 2)
+    second = create_forecast_excel_multi(models, "p", "b", "u", 2)
+
+    assert first.getvalue() == second.getvalue()
+    assert len(export_service.excel_cache) == 1
+    assert rows(first, "Resumen General")[6] == ["linear", "creciente", "Sí", 3, 4, "12%", 0, 1]
+    assert rows(first, "Linear")[1:] == [["2024-05-01", 1.5], ["2024-05-02", 2.5]]
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from app.services.forecasting import ForecastResult, forecast_model, future_dates
+
+
+def dates(start, days):
+    return np.datetime64(start, "D") + np.arange(days)
+
+
+def test_negative_values_are_clipped_and_total_is_float():
+    result = ForecastResult(dates("2024-05-01", 4), [-2.0, 1.5, 2.5, -0.1])
+
+    assert result.yhat.tolist() == [0.0, 1.5, 2.5, 0.0]
+    assert isinstance(result.total, float) and result.total == 4.0
+
+
+@pytest.mark.parametrize("yhat, expected", [
+    ([1.0, 2.0, 3.0], "creciente"),
+    ([3.0, 2.0, 1.0], "decreciente"),
+    ([1.0, 1.1, 1.15], "estable"),  # pendiente 0.075 por día
+    ([5.0], "estable"),
+])
+def test_tendency_uses_average_slope(yhat, expected):
+    assert ForecastResult(dates("2024-05-01", len(yhat)), yhat).tendency() == expected
+
+
+def test_error_metrics_only_use_matching_dates():
+    result = ForecastResult(dates("2024-05-01", 5), [1, 2, 3, 4, 5])
+    # Historial ordenado que coincide con 3 de los 5 días, más días fuera de la predicción
+    history_dates = np.array(["2024-04-29", "2024-05-02", "2024-05-03", "2024-05-05"], dtype="datetime64[D]")
+    history_values = np.array([100.0, 4.0, 3.0, 2.0])
+
+    metrics = result.error_metrics(history_dates, history_values)
+
+    # Lo mismo calculado con pandas, como se hacía antes
+    merged = pd.DataFrame({"ds": result.dates, "yhat": result.yhat}).merge(
+        pd.DataFrame({"ds": history_dates, "y": history_values}), on="ds"
+    )
+    errors = merged["y"] - merged["yhat"]
+    assert metrics == {
+        "MAE": round(float(errors.abs().mean()), 2),
+        "RMSE": round(float(np.sqrt((errors ** 2).mean())), 2),
+    }
+
+
+def test_error_metrics_without_overlap():
+    result = ForecastResult(dates("2024-05-01", 3), [1, 2, 3])
+
+    assert result.error_metrics(np.array([], dtype="datetime64[D]"), np.array([])) == {"MAE": 0.0, "RMSE": 0.0}
+    assert result.error_metrics(np.array(["2023-01-01"], dtype="datetime64[D]"), np.array([1.0])) == {"MAE": 0.0, "RMSE": 0.0}
+
+
+def test_records_head_and_round():
+    result = ForecastResult(dates("2024-05-30", 3), [1.234, 2.345, 3.456]).round(2).head(2)
+
+    assert result.to_records() == [{"ds": "2024-05-30", "yhat": 1.23}, {"ds": "2024-05-31", "yhat": 2.35}]
+    assert all(type(record["yhat"]) is float for record in result.to_records())
+
+
+def test_linear_forecast_starts_tomorrow():
+    tomorrow = date.today() + timedelta(days=1)
+    ordinals = np.array([[tomorrow.toordinal()], [tomorrow.toordinal() + 10]])
+    model = LinearRegression().fit(ordinals, np.array([1.0, 11.0]))  # +1 por día
+
+    result = forecast_model("linear", model, 3)
+
+    assert result.dates.tolist() == future_dates(3).tolist()
+    assert result.dates[0] == np.datetime64(tomorrow, "D")
+    np.testing.assert_allclose(result.yhat, [1.0, 2.0, 3.0])
+    with pytest.raises(ValueError):
+        forecast_model("desconocido", model, 3)
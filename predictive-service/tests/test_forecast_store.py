@@ -0,0 +1,63 @@
+import numpy as np
+
+from app.models.generation import ModelGeneration
+from app.services.forecast_store import get_model_forecast, lookup_forecast, precompute_key_forecasts
+from app.services.forecasting import future_dates
+
+KEY = ("p0", "b", "u")
+
+
+class StubArima:
+    """Responde como pmdarima: predict(n_periods). Puede fallar las primeras llamadas."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def predict(self, n_periods):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("fallo al predecir")
+        return np.arange(n_periods, dtype=np.float64)
+
+
+def _generation(models):
+    return ModelGeneration(
+        models={KEY: models},
+        metrics={KEY: {name: {"MAE": 1.0, "RMSE": 1.0} for name in models}},
+        forecasts={KEY: precompute_key_forecasts(models)},
+    )
+
+
+def test_uses_precomputed_forecast():
+    model = StubArima()
+    generation = _generation({"arima": model})
+    calls = model.calls
+
+    result = get_model_forecast(generation, KEY, "arima", 10)
+
+    assert model.calls == calls  # no se volvió a predecir
+    assert result.yhat.tolist() == list(range(10))
+    assert (result.dates == future_dates(10)).all()
+
+
+def test_falls_back_to_model_when_precompute_failed():
+    model = StubArima(failures=1)
+    generation = _generation({"arima": model})
+    assert "arima" not in generation.forecasts[KEY]
+
+    result = get_model_forecast(generation, KEY, "arima", 10)
+
+    assert result is not None
+    assert result.yhat.tolist() == list(range(10))
+
+
+def test_untrained_model_returns_none():
+    generation = _generation({"arima": StubArima()})
+    assert get_model_forecast(generation, KEY, "prophet", 10) is None
+
+
+def test_lookup_beyond_horizon():
+    entry = precompute_key_forecasts({"arima": StubArima()}, horizon=5)["arima"]
+    assert lookup_forecast(entry, 6) is None
+    assert len(lookup_forecast(entry, 5)) == 5
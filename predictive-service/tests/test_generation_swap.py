@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from app.models import prophet_models
+from app.models.generation import ModelGeneration, get_generation, publish_generation
+
+KEYS = [("p0", "b", "u"), ("p1", "b", "u")]
+
+
+def _series():
+    ds = pd.date_range("2024-01-01", periods=60, freq="D")
+    rng = np.random.default_rng(2)
+    return {key: pd.DataFrame({"ds": ds, "y": rng.poisson(3, 60).astype(float)}) for key in KEYS}
+
+
+def test_new_generation_is_published_only_when_complete(monkeypatch):
+    previous = ModelGeneration(
+        models={key: {"linear": "anterior"} for key in KEYS},
+        metrics={key: {"linear": {"MAE": 1.0, "RMSE": 1.0}} for key in KEYS},
+    )
+    publish_generation(previous)
+    seen = []
+
+    def run_training(dirty, *args):
+        for key in dirty:
+            # Mientras se entrena, las rutas siguen viendo la generación anterior completa
+            seen.append(get_generation())
+            yield key, {"models": {"linear": "nuevo"}, "metrics": {"linear": {"MAE": 0.5, "RMSE": 0.5}},
+                        "forecasts": {}, "arima": None, "timings": {"total": 0.1}}
+
+    monkeypatch.setattr(prophet_models, "load_daily_series", _series)
+    monkeypatch.setattr(prophet_models, "run_training", run_training)
+    monkeypatch.setattr(prophet_models, "save_models_to_store", lambda *args: None)
+
+    report = prophet_models.train_models_from_db()
+
+    assert seen and all(generation is previous for generation in seen)
+    current = get_generation()
+    assert current is not previous
+    assert current.id == report["generation"]
+    assert all(current.models[key]["linear"] == "nuevo" for key in KEYS)
+    # La generación anterior no se modifica: quien la tomó antes sigue leyendo lo mismo
+    assert all(previous.models[key] == {"linear": "anterior"} for key in KEYS)
+
+
+def test_generation_ids_are_unique():
+    assert ModelGeneration().id != ModelGeneration().id
+    assert ModelGeneration(version="v1").id == "v1"
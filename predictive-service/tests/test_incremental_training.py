@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from app.models import prophet_models
+from app.models.generation import ModelGeneration, get_generation, publish_generation
+from app.models.model_store import fingerprint_series
+
+UNCHANGED = ("p0", "b", "u")
+CHANGED = ("p1", "b", "u")
+REMOVED = ("p2", "b", "u")
+
+
+def _df(values):
+    ds = pd.date_range("2024-01-01", periods=len(values), freq="D")
+    return pd.DataFrame({"ds": ds, "y": np.asarray(values, dtype=float)})
+
+
+def _result():
+    return {"models": {"linear": "nuevo"}, "metrics": {"linear": {"MAE": 1.0, "RMSE": 1.0}}, "forecasts": {},
+            "arima": None, "timings": {"total": 0.1, "linear": 0.1}}
+
+
+def test_only_changed_series_are_retrained(monkeypatch):
+    rng = np.random.default_rng(1)
+    series = {UNCHANGED: _df(rng.poisson(4, 60)), CHANGED: _df(rng.poisson(4, 60))}
+    publish_generation(ModelGeneration(
+        models={key: {"linear": "anterior"} for key in (UNCHANGED, CHANGED, REMOVED)},
+        metrics={key: {"linear": {"MAE": 2.0, "RMSE": 2.0}} for key in (UNCHANGED, CHANGED, REMOVED)},
+        fingerprints={UNCHANGED: fingerprint_series(series[UNCHANGED]), CHANGED: "viejo", REMOVED: "viejo"},
+    ))
+    requested = []
+
+    def run_training(dirty, *args):
+        requested.extend(dirty)
+        return iter([(key, _result()) for key in dirty])
+
+    monkeypatch.setattr(prophet_models, "load_daily_series", lambda: series)
+    monkeypatch.setattr(prophet_models, "run_training", run_training)
+    monkeypatch.setattr(prophet_models, "save_models_to_store", lambda *args: None)
+
+    report = prophet_models.train_models_from_db(incremental=True)
+
+    assert requested == [CHANGED]
+    assert (report["retrained"], report["reused"], report["removed"]) == (1, 1, 1)
+    generation = get_generation()
+    assert generation.models[UNCHANGED] == {"linear": "anterior"}
+    assert generation.models[CHANGED]["linear"] == "nuevo"
+    assert REMOVED not in generation.models
+    assert generation.fingerprints[CHANGED] == fingerprint_series(series[CHANGED])
+
+
+def test_fingerprint_ignores_float_noise():
+    assert fingerprint_series(_df([0.1 + 0.2, 1.0, 2.0])) == fingerprint_series(_df([0.3, 1.0, 2.0]))
+    assert fingerprint_series(_df([0.3, 1.0, 2.0])) != fingerprint_series(_df([0.3, 1.0, 3.0]))
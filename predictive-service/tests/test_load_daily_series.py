@@ -0,0 +1,105 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.prophet_models import aggregate_daily
+from app.services import sales_service
+
+EPOCH = date(1970, 1, 1)
+
+# (product, brand, unit, fecha, cantidad): varias ventas por día y keys de distinto largo
+SALES = [
+    ("arroz", "Sin marca", "kg", date(2024, 1, 2), 3.0),
+    ("arroz", "Sin marca", "kg", date(2024, 1, 1), 1.0),
+    ("arroz", "Sin marca", "kg", date(2024, 1, 1), 2.0),
+    ("arroz", "Sin marca", "kg", date(2024, 1, 5), 4.0),
+    ("azucar", "Dulce", "kg", date(2024, 1, 3), 5.0),
+    ("leche", "Vaca", "Sin unidad", date(2024, 1, 1), 1.5),
+    ("leche", "Vaca", "Sin unidad", date(2024, 1, 2), 2.5),
+    ("leche", "Vaca", "Sin unidad", date(2024, 1, 2), 1.0),
+]
+
+
+class FakeCursor:
+    """Cursor del lado del servidor: devuelve lo que daría la consulta agregada, en bloques."""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.itersize = None
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        # GROUP BY key, día ... ORDER BY key, día
+        totals = defaultdict(float)
+        for product, brand, unit, day, quantity in SALES:
+            totals[(product, brand, unit, (day - EPOCH).days)] += quantity
+        self.rows = [(*group, total) for group, total in sorted(totals.items())]
+
+    def fetchmany(self, size):
+        self.owner.fetches.append(size)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class FakeConnection:
+    def __init__(self):
+        self.fetches = []
+        self.cursor_names = []
+
+    def cursor(self, name=None, cursor_factory=None):
+        self.cursor_names.append(name)
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    conn = FakeConnection()
+
+    @contextmanager
+    def db_connection():
+        yield conn
+
+    monkeypatch.setattr(sales_service, "db_connection", db_connection)
+    return conn
+
+
+def per_sale_series():
+    # Lo que se hacía antes: un DataFrame con todas las ventas y aggregate_daily por key
+    df = pd.DataFrame(SALES, columns=["product", "brand", "unit", "ds", "y"])
+    df["ds"] = pd.to_datetime(df["ds"])
+    return {
+        key: aggregate_daily(group[["ds", "y"]])
+        for key, group in df.groupby(["product", "brand", "unit"])
+    }
+
+
+@pytest.mark.parametrize("itersize", [2, 3, 50000])
+def test_matches_per_sale_aggregation(connection, itersize):
+    # Con bloques chicos las filas de una key quedan repartidas entre bloques
+    series = sales_service.load_daily_series(itersize=itersize)
+
+    expected = per_sale_series()
+    assert list(series) == sorted(expected)
+    for key, df in series.items():
+        assert df["ds"].dtype == "datetime64[ns]" and df["y"].dtype == np.float64
+        pd.testing.assert_frame_equal(df, expected[key])
+
+    # Cursor con nombre (del lado del servidor) leído en bloques de itersize
+    assert connection.cursor_names == ["training_daily_sales"]
+    assert set(connection.fetches) == {itersize}
+
+
+def test_empty_table(connection, monkeypatch):
+    monkeypatch.setattr(FakeCursor, "execute", lambda self, query: None)
+
+    assert sales_service.load_daily_series() == {}
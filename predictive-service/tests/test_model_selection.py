@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models import model_selection, prophet_models
+from app.models.model_selection import LIGHT_MODELS, TIER_MODELS, classify_series, plan_training, profile_series
+
+
+def sales(days, every=1, values=None, start="2024-01-01"):
+    # Solo los días con ventas, como los devuelve load_daily_series
+    ds = pd.date_range(start, periods=days, freq="D")[::every]
+    y = np.asarray(values, float)[:len(ds)] if values is not None else np.random.default_rng(0).poisson(5, len(ds)) + 1.0
+    return pd.DataFrame({"ds": ds, "y": y})
+
+
+@pytest.mark.parametrize("df, tier", [
+    (sales(120), "regular"),
+    (sales(30), "short"),  # menos de TIER_MIN_DAYS días
+    (sales(120, every=5), "short"),  # pocos días con ventas
+    (sales(200, every=3), "intermittent"),  # vende uno de cada 3 días
+    (sales(120, values=[4.0] * 120), "flat"),
+])
+def test_series_tiers(df, tier):
+    assert classify_series(profile_series(df)) == tier
+
+
+def test_profile_counts_days_without_sales():
+    profile = profile_series(sales(10, every=2, values=[2.0] * 5))
+
+    assert profile["days"] == 9  # de la primera a la última venta
+    assert profile["points"] == 5
+    assert profile["adi"] == 1.8
+    # Demanda diaria con los días sin ventas en 0: [2, 0, 2, 0, ...]
+    assert profile["cv"] == round(float(np.std([2, 0] * 4 + [2]) / np.mean([2, 0] * 4 + [2])), 3)
+
+
+def test_empty_series_is_short():
+    profile = profile_series(pd.DataFrame({"ds": pd.to_datetime([]), "y": []}))
+
+    assert classify_series(profile) == "short"
+
+
+def test_tiering_can_be_disabled(monkeypatch):
+    series = {"a": sales(30), "b": sales(120, values=[4.0] * 120)}
+
+    assert plan_training(series) == {"a": "short", "b": "flat"}
+    monkeypatch.setattr(model_selection, "MODEL_TIERING", False)
+    assert plan_training(series) == {"a": "regular", "b": "regular"}
+
+
+def test_light_tiers_skip_expensive_models(monkeypatch):
+    def expensive(*args, **kwargs):
+        raise AssertionError("no se debe entrenar un modelo caro")
+
+    monkeypatch.setattr(prophet_models, "train_prophet", expensive)
+    monkeypatch.setattr(prophet_models, "train_arima", expensive)
+
+    result = prophet_models.train_series(("p", "b", "u"), sales(30), models=TIER_MODELS["short"])
+
+    assert TIER_MODELS["short"] == LIGHT_MODELS
+    assert set(result["models"]) == {"linear"}
+    assert set(result["forecasts"]) == {"linear"}
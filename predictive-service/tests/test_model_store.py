@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from app.models import model_store as store
+from app.models.model_store import LazyModels, load_latest, read_latest_version, save_generation
+
+KEY = ("p0", "b", "u")
+SHORT_KEY = ("p1", "b", "u")
+
+
+def _linear():
+    model = LinearRegression()
+    model.fit(np.arange(10).reshape(-1, 1), np.arange(10) * 2.0)
+    return model
+
+
+def _save():
+    return save_generation(
+        models={KEY: {"linear": _linear()}},
+        metrics={KEY: {"linear": {"MAE": np.float64(1.5), "RMSE": 2}}},
+        fingerprints={KEY: "abc", SHORT_KEY: "pocos-datos"},
+    )
+
+
+def test_save_and_load_roundtrip(model_store):
+    version = _save()
+
+    assert read_latest_version() == version
+    stored = load_latest()
+    assert stored["version"] == version
+    assert stored["metrics"][KEY] == {"linear": {"MAE": 1.5, "RMSE": 2.0}}
+    # Las series sin modelo conservan su fingerprint para no reintentarlas
+    assert stored["fingerprints"] == {KEY: "abc", SHORT_KEY: "pocos-datos"}
+    assert set(stored["models"]) == {KEY}
+
+    models = stored["models"][KEY]
+    assert isinstance(models, LazyModels) and not models.loaded
+    assert models["linear"].predict([[20]])[0] == pytest.approx(40.0)
+    assert models.loaded
+
+
+def test_empty_store(model_store):
+    assert read_latest_version() is None
+    assert load_latest() is None
+
+
+def test_keeps_only_recent_versions(model_store, monkeypatch):
+    monkeypatch.setattr(store, "MODEL_STORE_KEEP", 2)
+    versions = [_save() for _ in range(4)]
+
+    assert sorted(os.listdir(model_store / "versions")) == versions[-2:]
+
+
+def test_unchanged_models_are_linked(model_store):
+    _save()
+    previous = load_latest()
+
+    version = save_generation(previous["models"], previous["metrics"], previous["fingerprints"])
+
+    # Los modelos sin cargar se enlazan desde la versión anterior en vez de reescribirse
+    path = model_store / "versions" / version / "models" / f"{store.key_id(KEY)}.joblib"
+    assert os.path.samefile(path, previous["models"][KEY].path)
+    assert load_latest()["models"][KEY]["linear"].predict([[1]])[0] == pytest.approx(2.0)
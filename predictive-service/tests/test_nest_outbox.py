@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.nest_client import PredictionOutbox
+
+
+class StubNest(ThreadingHTTPServer):
+    """NestJS de prueba: responde `status` y guarda lo que recibe."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.status = 201
+        self.received = []
+        self.requests = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/predictions"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        if self.server.status == 201:
+            self.server.received.append(body)
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def nest():
+    server = StubNest()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _outbox(url, dead_letter_path):
+    return PredictionOutbox(
+        url, max_retries=2, backoff_base=0.01, flush_interval=0.05, timeout=2, dead_letter_path=str(dead_letter_path)
+    )
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "tiempo de espera agotado"
+        time.sleep(0.02)
+
+
+def _prediction(i):
+    return {"product": f"p{i}", "brand": "b", "unit": "u", "days": 7, "generation": "no va a NestJS"}
+
+
+def test_retry_dead_letter_and_replay(nest, tmp_path):
+    dead_letter = tmp_path / "nest_dead_letter.jsonl"
+
+    # NestJS caído: cada predicción se intenta 1 + max_retries veces y va al dead letter
+    nest.status = 503
+    outbox = _outbox(nest.url, dead_letter)
+    for i in range(3):
+        assert outbox.enqueue(_prediction(i))
+    _wait_for(lambda: outbox.stats()["dead_lettered"] == 3)
+    outbox.stop()
+
+    stats = outbox.stats()
+    assert nest.requests == 9
+    assert stats["retried"] == 6
+    assert stats["sent"] == 0
+    entries = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [entry["payload"]["product"] for entry in entries] == ["p0", "p1", "p2"]
+    assert entries[0]["error"].startswith("HTTP 503")
+
+    # NestJS de vuelta: el siguiente arranque reenvía el dead letter
+    nest.status = 201
+    outbox = _outbox(nest.url, dead_letter)
+    outbox.start()
+    _wait_for(lambda: outbox.stats()["sent"] == 3)
+    outbox.stop()
+
+    assert outbox.stats()["replayed"] == 3
+    assert [body["product"] for body in nest.received] == ["p0", "p1", "p2"]
+    assert all("generation" not in body for body in nest.received)
+    assert dead_letter.read_text() == ""
+    assert not (tmp_path / "nest_dead_letter.jsonl.replay").exists()
+
+
+def test_rejected_predictions_are_not_replayed(nest, tmp_path):
+    dead_letter = tmp_path / "nest_dead_letter.jsonl"
+    dead_letter.write_text(
+        json.dumps({"error": "HTTP 400: campo inválido", "payload": {"product": "malo"}}) + "\n"
+        + json.dumps({"error": "HTTP 429: demasiadas", "payload": {"product": "bueno"}}) + "\n"
+    )
+
+    outbox = _outbox(nest.url, dead_letter)
+    assert outbox.replay_dead_letter() == 1
+
+    assert [body["product"] for body in nest.received] == ["bueno"]
+    assert json.loads(dead_letter.read_text())["payload"]["product"] == "malo"
+
+
+def test_stats_are_thread_safe(tmp_path):
+    outbox = _outbox(None, tmp_path / "dead.jsonl")
+
+    def count():
+        for _ in range(10000):
+            outbox._count("sent")
+
+    threads = [threading.Thread(target=count) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outbox.stats()["sent"] == 80000
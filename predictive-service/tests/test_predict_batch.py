@@ -0,0 +1,74 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import predict_route
+from app.services import prediction_service
+from app.services.cache_service import prediction_cache, stock_cache, sales_cache
+
+ITEMS = [
+    {"product_name": "p1", "brand": "b", "unit": "u", "days": 7},
+    ["p2", "b", "u", 14],
+    {"product_name": "p1", "brand": "b", "unit": "u", "days": 3},
+    {"product_name": "nada", "brand": "b", "unit": "u"},
+    {"product_name": "p3", "brand": "b", "unit": "u", "days": 0},
+    "p4",
+]
+
+
+@pytest.fixture
+def client(catalog, fake_db, monkeypatch):
+    saved = []
+    # La cola real copia los datos al encolar (to_nest_payload)
+    monkeypatch.setattr(prediction_service.prediction_outbox, "enqueue", lambda data: saved.append(dict(data)))
+    app = FastAPI()
+    app.include_router(predict_route.router)
+    client = TestClient(app)
+    client.saved = saved
+    return client
+
+
+def test_batch_matches_single_predictions(client, fake_db):
+    response = client.post("/predict/batch", json={"items": ITEMS})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["count"], body["failed"]) == (6, 3)
+
+    results = body["results"]
+    assert [result["index"] for result in results] == list(range(6))
+    assert [result["success"] for result in results] == [True, True, True, False, False, False]
+    assert [result.get("status") for result in results[3:]] == [404, 400, 400]
+    batch_saved = list(client.saved)
+
+    # Mismos datos que /predict elemento por elemento, sin caches de por medio
+    for cache in (prediction_cache, stock_cache, sales_cache):
+        cache.clear()
+    client.saved.clear()
+    for result, item in zip(results[:3], [("p1", "b", "u", 7), ("p2", "b", "u", 14), ("p1", "b", "u", 3)]):
+        single = prediction_service.generar_prediccion(*item)
+        single["model_used"] = single.pop("model_type")
+        assert single == {
+            name: value for name, value in result.items() if name not in ("index", "success")
+        }
+    # A NestJS se envía lo mismo que con /predict
+    assert batch_saved == client.saved
+
+
+def test_batch_queries_the_db_once(client, fake_db):
+    client.post("/predict/batch", json={"items": ITEMS})
+
+    # Una consulta por tipo para todo el batch, con las keys sin repetir
+    assert [(name, sorted(keys)) for name, keys in fake_db.calls] == [
+        ("stock", [("p1", "b", "u"), ("p2", "b", "u")]),
+        ("last_month", [("p1", "b", "u"), ("p2", "b", "u")]),
+        ("history", [("p1", "b", "u"), ("p2", "b", "u")]),
+    ]
+
+
+@pytest.mark.parametrize("body, status", [
+    ({}, 400),
+    ({"items": []}, 400),
+    ({"items": [["p1", "b", "u"]] * (predict_route.PREDICT_BATCH_MAX_ITEMS + 1)}, 413),
+])
+def test_invalid_batches(client, body, status):
+    assert client.post("/predict/batch", json=body).status_code == status
@@ -0,0 +1,121 @@
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services import prediction_service
+from app.services.cache_service import AggregateCache, ModelOutputCache
+
+KEY = ("p1", "b", "u")
+OTHER = ("p2", "b", "u")
+
+
+@pytest.fixture
+def scope():
+    # Cada prueba con su propio marcador en MODEL_STORE_DIR
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_model_output_is_keyed_by_generation():
+    cache = ModelOutputCache(maxsize=10)
+    cache.set("g1", KEY, 7, "salida g1")
+
+    assert cache.get("g1", KEY, 7) == "salida g1"
+    assert cache.get("g2", KEY, 7) is None
+    assert cache.get("g1", KEY, 14) is None
+
+    # La primera entrada de una generación nueva descarta las anteriores
+    cache.set("g2", KEY, 7, "salida g2")
+    assert len(cache) == 1
+
+
+def test_aggregate_invalidate_one_key(scope):
+    cache = AggregateCache(scope, ttl=60)
+    loads = []
+
+    def loader(value):
+        return lambda: loads.append(value) or value
+
+    assert cache.get_or_load(KEY, (), loader(10)) == 10
+    assert cache.get_or_load(KEY, (), loader(99)) == 10  # desde el cache
+    cache.get_or_load(OTHER, (), loader(20))
+
+    assert cache.invalidate(KEY) == 1
+    assert cache.get_or_load(KEY, (), loader(11)) == 11
+    assert cache.get_or_load(OTHER, (), loader(99)) == 20
+    assert loads == [10, 20, 11]
+
+
+def test_get_or_load_many_only_loads_missing(scope):
+    cache = AggregateCache(scope, ttl=60)
+    cache.get_or_load(KEY, (), lambda: 1)
+    requested = []
+
+    def loader(missing):
+        requested.append(missing)
+        return {request: 2 for request in missing}
+
+    values = cache.get_or_load_many([(KEY, ()), (OTHER, ())], loader)
+
+    assert values == {(KEY, ()): 1, (OTHER, ()): 2}
+    assert requested == [[(OTHER, ())]]
+
+
+def test_invalidation_reaches_other_workers(scope):
+    # Dos instancias con el mismo scope hacen de dos workers que comparten MODEL_STORE_DIR
+    worker_a = AggregateCache(scope, ttl=60)
+    worker_b = AggregateCache(scope, ttl=60)
+    worker_b.get_or_load(KEY, (), lambda: "viejo")
+    version = worker_b.version
+
+    worker_a.invalidate(KEY)
+
+    assert worker_b.get_or_load(KEY, (), lambda: "nuevo") == "nuevo"
+    assert worker_b.version > version
+
+
+def test_value_loaded_during_invalidation_is_not_cached(scope):
+    cache = AggregateCache(scope, ttl=60)
+
+    def slow_load():
+        cache.invalidate()  # llega una venta mientras se consultaba la BD
+        return "anterior al cambio"
+
+    assert cache.get_or_load(KEY, (), slow_load) == "anterior al cambio"
+    assert len(cache) == 0
+
+
+def test_predict_reuses_cached_aggregates_until_invalidated(catalog, fake_db):
+    from app.routes import predict_route
+
+    app = FastAPI()
+    app.include_router(predict_route.router)
+    client = TestClient(app)
+
+    first = prediction_service.generar_prediccion(*KEY, 7)
+    prediction_service.generar_prediccion(*KEY, 7)
+    assert (fake_db.count("stock"), fake_db.count("last_month"), fake_db.count("history")) == (1, 1, 1)
+    assert first["current_quality"] == fake_db.stock
+
+    response = client.post("/cache/invalidate", json={"scope": "stock", "product_name": "p1", "brand": "b", "unit": "u"})
+    assert response.status_code == 200
+    assert response.json()["removed"] == {"stock": 1}
+
+    # El stock cambió en NestJS: se vuelve a consultar y la alerta usa el valor nuevo
+    fake_db.stock = 1000.0
+    second = prediction_service.generar_prediccion(*KEY, 7)
+    assert (fake_db.count("stock"), fake_db.count("last_month")) == (2, 1)
+    assert second["current_quality"] == 1000.0
+    assert not second["alert_restock"]
+
+
+def test_invalidate_route_rejects_unknown_scope():
+    from app.routes import predict_route
+
+    app = FastAPI()
+    app.include_router(predict_route.router)
+
+    response = TestClient(app).post("/cache/invalidate", json={"scope": "modelos"})
+
+    assert response.status_code == 400
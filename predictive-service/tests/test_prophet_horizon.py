@@ -0,0 +1,54 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.forecasting import predict_prophet_horizon, predict_prophet_dates, forecast_model
+
+prophet = pytest.importorskip("prophet")
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+
+@pytest.fixture(scope="module")
+def prophet_model():
+    # Mismo tipo de modelo que train_prophet, con 90 días de ventas semanales
+    ds = pd.date_range("2024-01-01", periods=90, freq="D")
+    rng = np.random.default_rng(0)
+    y = 10 + 3 * np.sin(2 * np.pi * np.arange(90) / 7) + rng.normal(0, 1, 90)
+    df = pd.DataFrame({"ds": ds, "y": y, "cap": 30.0, "floor": 0})
+    model = prophet.Prophet(growth="logistic", seasonality_mode="multiplicative", yearly_seasonality=False)
+    return model.fit(df)
+
+
+def test_horizon_matches_full_prophet_predict(prophet_model):
+    forecast = predict_prophet_horizon(prophet_model, 14)
+
+    # Lo que hacía antes: make_future_dataframe + predict de todo el historial
+    future = prophet_model.make_future_dataframe(periods=14)
+    future["cap"] = 30.0
+    future["floor"] = 0
+    expected = prophet_model.predict(future).tail(14).reset_index(drop=True)
+
+    assert list(forecast.columns) == ["ds", "yhat"]
+    assert forecast["ds"].iloc[0] == pd.Timestamp("2024-03-31")  # día siguiente al historial
+    pd.testing.assert_series_equal(forecast["ds"].reset_index(drop=True), expected["ds"])
+    np.testing.assert_allclose(forecast["yhat"].values, expected["yhat"].values)
+
+
+def test_dates_with_uncertainty_keeps_intervals(prophet_model):
+    dates = pd.date_range("2024-04-10", periods=3, freq="D")
+
+    plain = predict_prophet_dates(prophet_model, dates)
+    full = predict_prophet_dates(prophet_model, dates, include_uncertainty=True)
+
+    assert "yhat_lower" not in plain and "yhat_lower" in full
+    np.testing.assert_allclose(plain["yhat"].values, full["yhat"].values)
+
+
+def test_forecast_model_prophet_returns_horizon(prophet_model):
+    result = forecast_model("prophet", prophet_model, 5)
+
+    assert len(result) == 5
+    assert str(result.dates[0]) == "2024-03-31"
+    assert (result.yhat >= 0).all()
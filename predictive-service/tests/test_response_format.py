@@ -0,0 +1,77 @@
+import json
+
+import msgpack
+import numpy as np
+
+from app.utils.response_format import (
+    COLUMNAR_JSON, JSON, MSGPACK, columnar_response, negotiate, to_columnar,
+)
+
+
+def _row(product, start, models, days=30):
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + days).astype(str)
+    return {
+        "product": product,
+        "brand": "b",
+        "unit": "u",
+        "forecasts": {
+            name: {
+                "forecast": [{"ds": ds, "yhat": round(float(i) * 1.5, 2)} for i, ds in enumerate(dates)],
+                "metrics": {"MAE": 1.0, "RMSE": 2.0},
+            }
+            for name in models
+        },
+    }
+
+
+def _mixed_rows(count=200):
+    # Como en producción: cada SKU termina su historia en otra fecha, así que las
+    # predicciones de Prophet/ARIMA empiezan en fechas distintas
+    base = np.datetime64("2024-01-01")
+    return [
+        _row(f"p{i}", str(base + (i * 7) % 400), ("prophet", "arima", "linear", "baseline"))
+        for i in range(count)
+    ]
+
+
+def test_negotiate():
+    assert negotiate(None) == JSON
+    assert negotiate("*/*") == JSON
+    assert negotiate(f"{JSON};q=0.5, {MSGPACK}") == MSGPACK
+    assert negotiate(f"{COLUMNAR_JSON};q=0.2, {JSON};q=0.9") == JSON
+
+
+def test_columnar_roundtrip():
+    rows = [_row("a", "2024-01-01", ("prophet", "linear")), _row("b", "2024-03-10", ("linear",), days=5)]
+    data = to_columnar({"success": True}, rows)
+
+    assert data["models"] == ["prophet", "linear"]
+    assert data["starts"] == [["2024-01-01", "2024-01-01"], [None, "2024-03-10"]]
+    assert data["lengths"] == [[30, 30], [0, 5]]
+    assert data["fields"]["RMSE"] == [[2.0, 2.0], [None, 2.0]]
+
+    offset = 0
+    for i, row in enumerate(rows):
+        for j, name in enumerate(data["models"]):
+            length = data["lengths"][i][j]
+            values = data["yhat"][offset:offset + length].tolist()
+            offset += length
+            expected = [record["yhat"] for record in row["forecasts"].get(name, {}).get("forecast", [])]
+            assert values == expected
+    assert offset == len(data["yhat"])
+
+
+def test_columnar_smaller_than_json_with_mixed_starts():
+    rows = _mixed_rows()
+    meta = {"success": True, "days": 30}
+    plain = len(json.dumps({**meta, "comparison": rows}).encode("utf-8"))
+
+    columnar = columnar_response(meta, rows, COLUMNAR_JSON).body
+    packed = columnar_response(meta, rows, MSGPACK).body
+
+    assert len(columnar) < plain / 2
+    assert len(packed) < plain / 3
+
+    data = msgpack.unpackb(packed, raw=False)
+    yhat = np.frombuffer(data["yhat"]["data"], dtype=data["yhat"]["dtype"])
+    assert len(yhat) == sum(map(sum, data["lengths"])) == 200 * 4 * 30
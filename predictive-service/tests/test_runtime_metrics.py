@@ -0,0 +1,72 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import runtime_metrics
+from app.utils.runtime_metrics import Counter, Gauge, Histogram, render
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Las métricas se registran al crearse: las de la prueba no quedan en el registro global
+    registry = []
+    monkeypatch.setattr(runtime_metrics, "_registry", registry)
+    return registry
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = Histogram("test_seconds", "Prueba", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, stage="db")
+
+    assert render().splitlines() == [
+        "# HELP test_seconds Prueba",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="db",le="0.1"} 1',
+        'test_seconds_bucket{stage="db",le="1.0"} 3',
+        'test_seconds_bucket{stage="db",le="+Inf"} 4',
+        'test_seconds_sum{stage="db"} 4.05',
+        'test_seconds_count{stage="db"} 4',
+    ]
+
+
+def test_histogram_time_records_failed_stages(registry):
+    histogram = Histogram("test_seconds", "Prueba", ("stage",))
+
+    with pytest.raises(RuntimeError):
+        with histogram.time(stage="falla"):
+            raise RuntimeError("boom")
+
+    assert 'test_seconds_count{stage="falla"} 1' in render()
+
+
+def test_counter_and_gauge_rendering(registry):
+    counter = Counter("test_total", "Prueba", ("layer", "result"))
+    counter.inc(layer="model", result="hit")
+    counter.inc(2, layer='say "hi"\n', result="miss")
+    Gauge("test_keys", "Prueba", lambda: 7)
+    Gauge("test_broken", "Prueba", lambda: 1 / 0)
+
+    lines = render().splitlines()
+
+    assert 'test_total{layer="model",result="hit"} 1' in lines
+    assert 'test_total{layer="say \\"hi\\"\\n",result="miss"} 2' in lines
+    assert "test_keys 7" in lines
+    # Un gauge que falla no rompe el scrape: solo queda su encabezado
+    assert lines[-2:] == ["# HELP test_broken Prueba", "# TYPE test_broken gauge"]
+
+
+def test_runtime_endpoint_reports_request_stages(catalog, fake_db):
+    from app.routes import predict_route
+    from app.services.prediction_service import get_forecast_all_models_bulk
+
+    get_forecast_all_models_bulk(list(catalog.models)[:2], 7, catalog, operation="compare")
+
+    app = FastAPI()
+    app.include_router(predict_route.router)
+    response = TestClient(app).get("/metrics/runtime")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for name in ("db_history", "db_stock", "db_last_month", "summarize"):
+        assert f'predictive_stage_seconds_count{{operation="compare",stage="{name}"}}' in response.text
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.models import model_store as store
+from app.models.generation import get_generation, publish_generation, ModelGeneration
+from app.models.prophet_models import reload_models_if_changed
+from app.services.forecast_store import lookup_forecast
+from conftest import make_catalog
+
+pytest.importorskip("fcntl")
+
+# Toma el flock de trainer.lock y espera hasta que se cierre su stdin
+HOLD_LOCK = """
+import fcntl, os, sys
+fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT, 0o644)
+fcntl.flock(fd, fcntl.LOCK_EX)
+print("locked", flush=True)
+sys.stdin.read()
+"""
+
+
+def _save(generation):
+    return store.save_generation(
+        generation.models, generation.metrics, generation.fingerprints, generation.forecasts, generation.arima,
+    )
+
+
+def test_forecasts_are_shared_through_mmap(model_store):
+    catalog = make_catalog(3)
+    version = _save(catalog)
+
+    stored = store.load_version(version)
+
+    key = ("p2", "b", "u")
+    arima = stored["forecasts"][key]["arima"]
+    # Vista de solo lectura sobre forecasts.npy, compartida por los workers vía page cache
+    assert isinstance(arima["yhat"].base, np.memmap)
+    assert not arima["yhat"].flags.writeable
+    for model_name, entry in catalog.forecasts[key].items():
+        expected = lookup_forecast(entry, 30)
+        loaded = lookup_forecast(stored["forecasts"][key][model_name], 30)
+        assert loaded.dates.tolist() == expected.dates.tolist()
+        np.testing.assert_allclose(loaded.yhat, expected.yhat)
+
+
+def test_only_one_process_trains(model_store):
+    lock_file = str(model_store / "trainer.lock")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLD_LOCK, lock_file], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        assert not store.acquire_trainer_lock()
+    finally:
+        holder.kill()
+        holder.wait()
+
+    # Si el entrenador muere, el sistema libera el lock y otro worker lo toma
+    assert store.acquire_trainer_lock()
+    assert store.acquire_trainer_lock()  # ya es el entrenador
+    with open(lock_file) as f:
+        assert f.read() == str(os.getpid())
+
+
+def test_reload_picks_up_new_versions(model_store):
+    publish_generation(ModelGeneration())
+    assert reload_models_if_changed() is None  # almacén vacío
+
+    version = _save(make_catalog(2))
+    assert reload_models_if_changed() == version
+    assert get_generation().version == version
+    assert set(get_generation().models) == {("p0", "b", "u"), ("p1", "b", "u")}
+
+    # Sin versión nueva no se vuelve a publicar
+    current = get_generation()
+    assert reload_models_if_changed() is None
+    assert get_generation() is current
+
+
+def test_version_without_forecast_index_uses_the_models(model_store):
+    from app.services.forecast_store import get_model_forecast
+
+    version = _save(make_catalog(1))
+    os.remove(model_store / "versions" / version / "forecasts_index.json")
+
+    stored = store.load_version(version)
+    generation = ModelGeneration(stored["models"], stored["metrics"], forecasts=stored["forecasts"])
+
+    assert stored["forecasts"] == {}
+    assert get_model_forecast(generation, ("p0", "b", "u"), "arima", 3).yhat.tolist() == [1.0, 1.0, 1.0]
@@ -0,0 +1,118 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models import prophet_models
+from app.models.generation import ModelGeneration, get_generation, publish_generation
+from app.models.model_selection import FULL_MODELS, LIGHT_MODELS
+
+
+def _series(keys, days=60):
+    ds = pd.date_range("2024-01-01", periods=days, freq="D")
+    rng = np.random.default_rng(0)
+    return {key: pd.DataFrame({"ds": ds, "y": rng.poisson(5, days).astype(float)}) for key in keys}
+
+
+def _result(name="linear"):
+    return {"models": {name: "nuevo"}, "metrics": {name: {"MAE": 1.0, "RMSE": 1.0}}, "forecasts": {},
+            "arima": None, "timings": {"total": 0.1, name: 0.1}}
+
+
+class InlinePool:
+    """Ejecuta los trabajos al enviarlos; `broken_after` simula un worker muerto."""
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=(), broken_after=None):
+        self.submitted = 0
+        self.broken_after = broken_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.submitted += 1
+        if self.broken_after is not None and self.submitted > self.broken_after:
+            # Como ProcessPoolExecutor: los trabajos en curso fallan y los envíos siguientes también
+            if self.submitted > self.broken_after + 1:
+                raise BrokenProcessPool("pool caído")
+            future.set_exception(BrokenProcessPool("pool caído"))
+            return future
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@pytest.fixture
+def fake_train(monkeypatch):
+    def train_series(key, df, timeout, arima_previous=None, models=FULL_MODELS):
+        if key == "falla":
+            raise MemoryError("sin memoria")
+        return _result()
+
+    monkeypatch.setattr(prophet_models, "train_series", train_series)
+
+
+def test_worker_exception_is_reported(monkeypatch, fake_train):
+    monkeypatch.setattr(prophet_models, "ProcessPoolExecutor", InlinePool)
+    keys = ["a", "falla", "b"]
+
+    results = dict(prophet_models.run_training(_series(keys), 2, order=keys))
+
+    assert set(results) == set(keys)
+    assert results["falla"] is None
+    assert results["a"]["models"] == {"linear": "nuevo"}
+
+
+def test_broken_pool_fails_remaining_heavy_series(monkeypatch, fake_train):
+    monkeypatch.setattr(
+        prophet_models, "ProcessPoolExecutor", lambda *args, **kwargs: InlinePool(*args, broken_after=1, **kwargs)
+    )
+    keys = ["h0", "h1", "h2", "l0", "h3"]
+    plan = {key: LIGHT_MODELS if key.startswith("l") else FULL_MODELS for key in keys}
+
+    results = dict(prophet_models.run_training(_series(keys), 2, model_plan=plan, order=keys))
+
+    assert set(results) == set(keys)  # ninguna se pierde
+    assert results["h0"] is not None
+    assert results["l0"] is not None  # las livianas se entrenan en este proceso
+    assert [key for key in keys if results[key] is None] == ["h1", "h2", "h3"]
+
+
+@pytest.fixture
+def previous_generation():
+    original = get_generation()
+    keys = [("p0", "b", "u"), ("p1", "b", "u")]
+    previous = ModelGeneration(
+        models={key: {"linear": "anterior"} for key in keys},
+        metrics={key: {"linear": {"MAE": 2.0, "RMSE": 2.0}} for key in keys},
+        fingerprints={key: "viejo" for key in keys},
+    )
+    publish_generation(previous)
+    yield keys
+    publish_generation(original)
+
+
+def test_failed_series_keep_previous_models(monkeypatch, previous_generation):
+    failed_key, trained_key = previous_generation
+    monkeypatch.setattr(prophet_models, "load_daily_series", lambda: _series(previous_generation))
+    monkeypatch.setattr(prophet_models, "save_models_to_store", lambda *args: None)
+    monkeypatch.setattr(prophet_models, "run_training", lambda *args: iter([(failed_key, None), (trained_key, _result())]))
+
+    report = prophet_models.train_models_from_db(incremental=True)
+
+    assert report["failed"] == 1
+    assert report["retrained"] == 1
+    generation = get_generation()
+    assert generation.models[failed_key] == {"linear": "anterior"}
+    assert failed_key not in generation.fingerprints  # se reintenta en el próximo entrenamiento
+    assert generation.models[trained_key]["linear"] == "nuevo"
+    assert "baseline" in generation.models[trained_key]
+    assert trained_key in generation.fingerprints
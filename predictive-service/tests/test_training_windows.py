@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import scheduler
+from app.models import prophet_models, training_schedule
+from app.models.generation import ModelGeneration
+from app.models.model_selection import FULL_MODELS, LIGHT_MODELS
+
+
+def _series(keys, days=30):
+    ds = pd.date_range("2024-01-01", periods=days, freq="D")
+    return {key: pd.DataFrame({"ds": ds, "y": np.ones(days)}) for key in keys}
+
+
+class ThreadPool(ThreadPoolExecutor):
+    # Mismo contrato que el ProcessPoolExecutor de run_training, pero con hilos: los
+    # workers ven los monkeypatch de este proceso
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers)
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    events = []
+    lock = threading.Lock()
+
+    def train_series(key, df, timeout, arima_previous=None, models=FULL_MODELS):
+        with lock:
+            events.append(key)
+        if models != LIGHT_MODELS:
+            time.sleep(0.02)
+        return {"models": {}, "metrics": {}, "forecasts": {}, "arima": None, "timings": {"total": 0.0}}
+
+    monkeypatch.setattr(prophet_models, "train_series", train_series)
+    monkeypatch.setattr(prophet_models, "ProcessPoolExecutor", ThreadPool)
+    return events
+
+
+def test_sequential_training_follows_priority_order(recorded):
+    order = ["h0", "l0", "h1", "l1"]
+    plan = {"h0": FULL_MODELS, "h1": FULL_MODELS, "l0": LIGHT_MODELS, "l1": LIGHT_MODELS}
+
+    keys = [key for key, _ in prophet_models.run_training(_series(order), 1, model_plan=plan, order=order)]
+
+    assert keys == recorded == order
+
+
+def test_light_series_interleave_with_pool(recorded):
+    # Antes las livianas se entrenaban todas al principio, aunque tuvieran menos prioridad
+    order = ["h0", "l0", "h1", "h2", "h3", "h4", "h5", "l1"]
+    plan = {key: LIGHT_MODELS if key.startswith("l") else FULL_MODELS for key in order}
+
+    keys = [key for key, _ in prophet_models.run_training(_series(order), 2, model_plan=plan, order=order)]
+
+    assert sorted(keys) == sorted(order)
+    assert recorded.index("l0") < recorded.index("h4")
+    assert recorded.index("l1") > recorded.index("h0")
+
+
+def test_deadline_stops_new_series(recorded):
+    order = ["h0", "h1", "h2"]
+    expired = time.monotonic() - 1
+
+    assert list(prophet_models.run_training(_series(order), 1, order=order, deadline=expired)) == []
+
+
+def test_skipped_training_returns_none():
+    with prophet_models._training_lock:
+        assert prophet_models.train_models_from_db() is None
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.jobs = []
+
+    def add_job(self, func, trigger, **kwargs):
+        self.jobs.append(kwargs["id"])
+
+
+@pytest.mark.parametrize("report, jobs", [
+    (None, []),  # otro entrenamiento tenía el lock: no se agenda nada
+    ({"schedule": {"deferred": 0}}, []),
+    ({"schedule": {"deferred": 3}}, ["training_continuation"]),
+])
+def test_window_job_schedules_continuation_from_its_own_run(monkeypatch, report, jobs):
+    fake = FakeScheduler()
+    monkeypatch.setattr(scheduler, "scheduler", fake)
+    monkeypatch.setattr(scheduler, "train_models_from_db", lambda **kwargs: report)
+
+    scheduler.training_window_job()
+
+    assert fake.jobs == jobs
+
+
+def test_prioritize_series(monkeypatch):
+    monkeypatch.setattr(training_schedule, "restock_alerts", lambda keys, previous: {"alert"})
+    series = _series(["alert", "new", "waiting", "big", "small"])
+    series["big"]["y"] = 50.0
+    trained = {"linear": {"RMSE": 1.0}}
+    previous = ModelGeneration(metrics={
+        "alert": trained, "new": {"baseline": {"RMSE": 1.0}}, "waiting": trained, "big": trained, "small": trained,
+    })
+    pending = {"waiting": "2024-01-01T00:00:00"}
+
+    assert training_schedule.prioritize_series(series, previous, pending) == ["alert", "new", "waiting", "big", "small"]
+
+
+def test_pending_keeps_first_date(monkeypatch, tmp_path):
+    monkeypatch.setattr(training_schedule, "MODEL_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(training_schedule, "PENDING_FILE", str(tmp_path / "training-pending.json"))
+
+    training_schedule.save_pending([("p0", "b", "u")], {})
+    since = training_schedule.load_pending()[("p0", "b", "u")]
+    training_schedule.save_pending([("p0", "b", "u"), ("p1", "b", "u")], training_schedule.load_pending())
+
+    pending = training_schedule.load_pending()
+    assert pending[("p0", "b", "u")] == since
+    assert set(pending) == {("p0", "b", "u"), ("p1", "b", "u")}